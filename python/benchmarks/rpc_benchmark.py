@@ -0,0 +1,418 @@
+"""
+Latency and throughput benchmarks for the Manager and Capture methods.
+
+Each benchmark calls a single method repeatedly, and records the latency of every call. Setup and cleanup (for
+example, loading a capture before benchmarking close()) is not included in the measurement.
+
+Results can be saved to a JSON file, and compared against a previously saved baseline. A method is reported as a
+regression if its latency (the median, by default) increased by more than the threshold.
+
+Run against Logic 2 (launched automatically, or an existing instance with --port), or against the fake server from
+saleae.automation.fake_server with --fake:
+
+    python -m benchmarks.rpc_benchmark --fake --output baseline.json
+    python -m benchmarks.rpc_benchmark --fake --baseline baseline.json --threshold 0.2
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import argparse
+import datetime
+import json
+import math
+import os
+import pathlib
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import saleae.automation as automation
+
+_DEFAULT_CAPTURE_PATH = pathlib.Path(__file__).parent.parent.resolve() / 'tests' / 'assets' / 'large_async_capture.sal'
+
+# Version of the JSON results format
+_RESULTS_VERSION = 1
+
+_METRICS = ['mean', 'min', 'p50', 'p90', 'p99', 'max']
+
+# Simulation device, and a configuration that is valid for it
+_DEVICE_ID = 'F4244'
+_DEVICE_CONFIGURATION = automation.LogicDeviceConfiguration(
+    enabled_digital_channels=[0, 1, 2, 3],
+    digital_sample_rate=500_000_000,
+    digital_threshold_volts=3.3,
+)
+
+_ASYNC_SERIAL_SETTINGS = {
+    'Input Channel': 0,
+    'Bit Rate (Bits/s)': 115200,
+}
+
+
+class _Timer:
+    """
+    Context manager that records the duration of each `with` block.
+    """
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self._start: Optional[float] = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.samples.append(time.perf_counter() - self._start)
+
+
+@dataclass
+class _BenchmarkContext:
+    manager: automation.Manager
+    capture_path: str
+    output_dir: str
+
+    #: A capture loaded once, and shared by all benchmarks that don't change the set of open captures
+    capture: Optional[automation.Capture] = None
+
+    #: Analyzer added to `capture`, used by the data table benchmarks
+    analyzer: Optional[automation.AnalyzerHandle] = None
+
+    #: Captures to close at the end of the run
+    cleanup: List[Callable[[], None]] = field(default_factory=list)
+
+    def shared_capture(self) -> automation.Capture:
+        if self.capture is None:
+            self.capture = self.manager.load_capture(self.capture_path)
+            self.cleanup.append(self.capture.close)
+        return self.capture
+
+    def shared_analyzer(self) -> automation.AnalyzerHandle:
+        if self.analyzer is None:
+            self.analyzer = self.shared_capture().add_analyzer('Async Serial', label='Benchmark', settings=_ASYNC_SERIAL_SETTINGS)
+        return self.analyzer
+
+    def output_path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def start_capture(self, capture_mode: Optional[automation.CaptureMode] = None) -> automation.Capture:
+        return self.manager.start_capture(
+            device_id=_DEVICE_ID,
+            device_configuration=_DEVICE_CONFIGURATION,
+            capture_configuration=automation.CaptureConfiguration(capture_mode=capture_mode or automation.ManualCaptureMode()),
+        )
+
+
+# Benchmarks, by name, in the order they are run
+_BENCHMARKS: Dict[str, Callable[[_BenchmarkContext, _Timer], None]] = {}
+
+
+def _benchmark(name: str):
+    def register(fn: Callable[[_BenchmarkContext, _Timer], None]):
+        _BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+@_benchmark('start_capture')
+def _bench_start_capture(ctx: _BenchmarkContext, timer: _Timer):
+    with timer:
+        capture = ctx.start_capture()
+    capture.stop()
+    capture.close()
+
+
+@_benchmark('stop')
+def _bench_stop(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.start_capture()
+    with timer:
+        capture.stop()
+    capture.close()
+
+
+@_benchmark('wait')
+def _bench_wait(ctx: _BenchmarkContext, timer: _Timer):
+    # The capture has already completed by the time wait() is called, so this measures the overhead of wait() itself,
+    # rather than the length of the capture
+    duration_seconds = 0.05
+    capture = ctx.start_capture(automation.TimedCaptureMode(duration_seconds=duration_seconds))
+    time.sleep(duration_seconds * 2)
+    with timer:
+        capture.wait()
+    capture.close()
+
+
+@_benchmark('load_capture')
+def _bench_load_capture(ctx: _BenchmarkContext, timer: _Timer):
+    with timer:
+        capture = ctx.manager.load_capture(ctx.capture_path)
+    capture.close()
+
+
+@_benchmark('close')
+def _bench_close(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.manager.load_capture(ctx.capture_path)
+    with timer:
+        capture.close()
+
+
+@_benchmark('save_capture')
+def _bench_save_capture(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.shared_capture()
+    with timer:
+        capture.save_capture(ctx.output_path('saved.sal'))
+
+
+@_benchmark('add_analyzer')
+def _bench_add_analyzer(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.shared_capture()
+    with timer:
+        analyzer = capture.add_analyzer('Async Serial', label='Benchmark', settings=_ASYNC_SERIAL_SETTINGS)
+    capture.remove_analyzer(analyzer)
+
+
+@_benchmark('export_raw_data_csv')
+def _bench_export_raw_data_csv(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.shared_capture()
+    with timer:
+        capture.export_raw_data_csv(directory=ctx.output_path('csv'), digital_channels=[0])
+
+
+@_benchmark('export_raw_data_binary')
+def _bench_export_raw_data_binary(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.shared_capture()
+    with timer:
+        capture.export_raw_data_binary(directory=ctx.output_path('binary'), digital_channels=[0])
+
+
+@_benchmark('export_data_table')
+def _bench_export_data_table(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.shared_capture()
+    analyzer = ctx.shared_analyzer()
+    with timer:
+        capture.export_data_table(
+            filepath=ctx.output_path('data_table.csv'),
+            analyzers=[automation.DataTableExportConfiguration(analyzer, automation.RadixType.HEXADECIMAL)])
+
+
+@_benchmark('legacy_export_analyzer')
+def _bench_legacy_export_analyzer(ctx: _BenchmarkContext, timer: _Timer):
+    capture = ctx.shared_capture()
+    analyzer = ctx.shared_analyzer()
+    with timer:
+        capture.legacy_export_analyzer(ctx.output_path('legacy.txt'), analyzer, automation.RadixType.HEXADECIMAL)
+
+
+def benchmark_names() -> List[str]:
+    """
+    Names of all benchmarks, in the order they are run.
+    """
+    return list(_BENCHMARKS)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    Returns the q-th percentile (0 <= q <= 100) of `samples`, interpolating linearly between samples.
+    """
+    if len(samples) == 0:
+        raise ValueError('percentile() requires at least one sample')
+
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize the latencies of a benchmark, in seconds.
+
+    throughput_per_second is the number of calls per second, if the calls are made back to back.
+    """
+    total = sum(samples)
+    return {
+        'count': len(samples),
+        'mean': total / len(samples),
+        'min': min(samples),
+        'p50': percentile(samples, 50),
+        'p90': percentile(samples, 90),
+        'p99': percentile(samples, 99),
+        'max': max(samples),
+        'throughput_per_second': len(samples) / total if total > 0 else math.inf,
+    }
+
+
+def run_benchmarks(manager: automation.Manager,
+                   *,
+                   capture_path: str = str(_DEFAULT_CAPTURE_PATH),
+                   iterations: int = 10,
+                   warmup: int = 1,
+                   names: Optional[List[str]] = None,
+                   log: Callable[[str], None] = lambda message: None) -> Dict[str, Dict[str, float]]:
+    """
+    Run the benchmarks, and return the summary of each one, keyed by benchmark name.
+
+    :param manager: Manager to benchmark.
+    :param capture_path: Capture to load for the benchmarks that need an existing capture.
+    :param iterations: Number of measured calls per benchmark.
+    :param warmup: Number of calls per benchmark before measurement starts.
+    :param names: Benchmarks to run. Defaults to all benchmarks.
+    :param log: Called with a line of progress output after each benchmark.
+    """
+    names = benchmark_names() if names is None else names
+    unknown = [name for name in names if name not in _BENCHMARKS]
+    if unknown:
+        raise ValueError(f'Unknown benchmarks: {", ".join(unknown)}')
+
+    output_dir = tempfile.mkdtemp(prefix='logic2_benchmark_')
+    ctx = _BenchmarkContext(manager=manager, capture_path=capture_path, output_dir=output_dir)
+
+    results = {}
+    try:
+        for name in names:
+            for _ in range(warmup):
+                _BENCHMARKS[name](ctx, _Timer())
+
+            timer = _Timer()
+            for _ in range(iterations):
+                _BENCHMARKS[name](ctx, timer)
+
+            results[name] = summarize(timer.samples)
+            log(_format_result(name, results[name]))
+    finally:
+        for cleanup in reversed(ctx.cleanup):
+            cleanup()
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return results
+
+
+def _format_result(name: str, summary: Dict[str, float]) -> str:
+    return (f'{name:<24} p50 {summary["p50"] * 1000:9.3f}ms  p90 {summary["p90"] * 1000:9.3f}ms  '
+            f'p99 {summary["p99"] * 1000:9.3f}ms  {summary["throughput_per_second"]:9.1f}/s')
+
+
+@dataclass
+class Regression:
+    #: Name of the benchmark
+    name: str
+
+    #: Metric that was compared, e.g. "p50"
+    metric: str
+
+    #: Value of the metric in the baseline, in seconds
+    baseline: float
+
+    #: Value of the metric in the current run, in seconds
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline > 0 else math.inf
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]],
+                        baseline: Dict[str, Dict[str, float]],
+                        *,
+                        threshold: float = 0.2,
+                        metric: str = 'p50') -> List[Regression]:
+    """
+    Returns the benchmarks whose `metric` increased by more than `threshold` (0.2 = 20%) relative to the baseline.
+
+    Benchmarks that are missing from either set of results are ignored.
+    """
+    if metric not in _METRICS:
+        raise ValueError(f'Unknown metric "{metric}", expected one of: {", ".join(_METRICS)}')
+
+    regressions = []
+    for name, summary in results.items():
+        if name not in baseline:
+            continue
+        regression = Regression(name=name, metric=metric, baseline=baseline[name][metric], current=summary[metric])
+        if regression.current > regression.baseline * (1 + threshold):
+            regressions.append(regression)
+    return regressions
+
+
+def save_results(filepath: str, results: Dict[str, Dict[str, float]], metadata: Dict[str, object]):
+    """
+    Save benchmark results to a JSON file, which can later be used as a baseline.
+    """
+    with open(filepath, 'w') as f:
+        json.dump({'version': _RESULTS_VERSION, 'metadata': metadata, 'results': results}, f, indent=2)
+
+
+def load_results(filepath: str) -> Dict[str, Dict[str, float]]:
+    """
+    Load benchmark results saved with save_results().
+    """
+    with open(filepath) as f:
+        data = json.load(f)
+
+    if data.get('version') != _RESULTS_VERSION:
+        raise RuntimeError(f'"{filepath}" has unsupported benchmark results version {data.get("version")}')
+    return data['results']
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the latency of Manager and Capture methods.')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--fake', action='store_true', help='Benchmark against an in-process fake Logic 2 server')
+    target.add_argument('--port', type=int, help='Connect to an existing Logic 2 instance on this port')
+    target.add_argument('--app-path', help='Path of the Logic 2 application to launch')
+    parser.add_argument('--capture', default=str(_DEFAULT_CAPTURE_PATH), help='Capture to load for the capture benchmarks')
+    parser.add_argument('--iterations', type=int, default=10, help='Measured calls per benchmark')
+    parser.add_argument('--warmup', type=int, default=1, help='Unmeasured calls per benchmark, before measuring')
+    parser.add_argument('--only', nargs='+', choices=benchmark_names(), help='Benchmarks to run')
+    parser.add_argument('--output', help='Save results to this JSON file')
+    parser.add_argument('--baseline', help='Compare results against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed increase relative to the baseline (0.2 = 20%%)')
+    parser.add_argument('--metric', default='p50', choices=_METRICS, help='Metric to compare against the baseline')
+    args = parser.parse_args(argv)
+
+    fake_server = None
+    if args.fake:
+        from saleae.automation.fake_server import FakeLogic2Server
+        fake_server = FakeLogic2Server().start()
+        manager = automation.Manager.connect(port=fake_server.port)
+    elif args.port is not None:
+        manager = automation.Manager.connect(port=args.port)
+    else:
+        manager = automation.Manager.launch(args.app_path)
+
+    try:
+        app_info = manager.get_app_info()
+        results = run_benchmarks(manager, capture_path=args.capture, iterations=args.iterations, warmup=args.warmup,
+                                 names=args.only, log=print)
+    finally:
+        manager.close()
+        if fake_server is not None:
+            fake_server.stop()
+
+    if args.output:
+        save_results(args.output, results, {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'server': 'fake' if args.fake else 'logic2',
+            'app_version': app_info.app_version,
+            'capture': args.capture,
+            'iterations': args.iterations,
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+        })
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, load_results(args.baseline), threshold=args.threshold, metric=args.metric)
+        for regression in regressions:
+            print(f'REGRESSION {regression.name}: {regression.metric} {regression.baseline * 1000:.3f}ms -> '
+                  f'{regression.current * 1000:.3f}ms ({(regression.ratio - 1) * 100:+.1f}%)')
+        if regressions:
+            return 1
+        print(f'No regressions beyond {args.threshold * 100:.0f}% ({args.metric})')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
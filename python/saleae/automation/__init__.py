@@ -1,16 +1,32 @@
-try:
-    from saleae.grpc import saleae_pb2, saleae_pb2_grpc
-except Exception as exc:
-    import sys
-    sys.stderr.write('''There was an error that occurred while importing grpc/pb modules.
-This can be caused by pb files that were generated using an incompatible version of protobuf.
-You can regenerate these files by reinstalling logic2-automation:
+import importlib
 
-     pip install logic2-automation --force-reinstall
-
- ''')
-    raise exc from None
+# grpc and the generated protobuf modules are imported on first use, see _lazy.py
+from ._lazy import saleae_pb2, saleae_pb2_grpc
 
 from .manager import *
 from .capture import *
+from .capture_group import *
+from .manager_pool import *
+from .export_cache import *
 from .errors import *
+
+# These modules are imported on first use, so that scripts that don't use them don't pay for importing asyncio or grpc
+_LAZY_ATTRIBUTE_MODULES = {
+    'AsyncManager': '.async_manager',
+    'AsyncCapture': '.async_capture',
+    'ClientMetrics': '.metrics',
+    'MethodMetrics': '.metrics',
+    'Tracer': '.tracing',
+    'TraceJob': '.tracing',
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name, __name__), name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTE_MODULES))
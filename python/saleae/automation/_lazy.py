@@ -0,0 +1,58 @@
+"""
+Deferred imports of grpc and the generated protobuf modules.
+
+Importing grpc and the generated modules makes up most of the time it takes to import saleae.automation, which matters
+for short-lived scripts. The modules are instead imported the first time one of their attributes is accessed, which
+in practice is when the first Manager is constructed.
+
+Because of this, module-level code in saleae.automation must not access attributes of these modules. Enum values are
+written out as literals (tests/lazy_import_test.py checks that they match saleae.proto), and annotations that refer to
+generated types are quoted.
+"""
+import importlib
+import sys
+
+_PB_IMPORT_ERROR_MESSAGE = '''There was an error that occurred while importing grpc/pb modules.
+This can be caused by pb files that were generated using an incompatible version of protobuf.
+You can regenerate these files by reinstalling logic2-automation:
+
+     pip install logic2-automation --force-reinstall
+
+ '''
+
+
+class _LazyModule:
+    """
+    Stand-in for a module, which imports the real module on first attribute access.
+    """
+
+    def __init__(self, name: str, *, show_import_error_message: bool = False):
+        self._name = name
+        self._show_import_error_message = show_import_error_message
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self._name)
+            except Exception as exc:
+                if self._show_import_error_message:
+                    sys.stderr.write(_PB_IMPORT_ERROR_MESSAGE)
+                raise exc from None
+        return self._module
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+grpc = _LazyModule('grpc')
+grpc_aio = _LazyModule('grpc.aio')
+saleae_pb2 = _LazyModule('saleae.grpc.saleae_pb2', show_import_error_message=True)
+saleae_pb2_grpc = _LazyModule('saleae.grpc.saleae_pb2_grpc', show_import_error_message=True)
@@ -0,0 +1,424 @@
+from .capture import (AnalyzerConfiguration, AnalyzerHandle, CaptureProgress, CaptureSegment,
+                      DataTableExportConfiguration, DataTableExportFormat, DataTableFilter, DataTableRow, Export,
+                      ExportResult, ExportTime, HighLevelAnalyzerConfiguration, RadixType, RawDataChunk,
+                      _add_analyzer_request, _add_analyzers_request, _add_high_level_analyzer_request,
+                      _capture_progress_from_reply, _capture_segment_from_reply, _data_table_analyzer_configs,
+                      _data_table_filter, _data_table_rows, _export_many_request, _export_results_from_reply,
+                      _logic_channels, _raw_data_chunk_from_reply, _time_range)
+from .errors import _error_handler, _wait_error_handler
+
+import saleae.automation
+from ._lazy import saleae_pb2
+
+from typing import AsyncIterator, List, Optional, Union, Dict
+
+
+class AsyncCapture:
+    """
+    This class represents a single capture in the Logic 2 software, for use with asyncio.
+
+    This class is returned from AsyncManager.start_capture() and from AsyncManager.load_capture(). It mirrors the Capture
+    class, except that every method is a coroutine, so many captures and exports can be driven concurrently from a
+    single event loop.
+
+    Be sure to close() when you're finished! Otherwise, they will remain in the application as tabs, and will continue to consume memory in the background.
+    """
+
+    def __init__(self, manager: 'saleae.automation.AsyncManager', capture_id: int):
+        """
+        This class cannot be constructed by the user, and is only returned from the AsyncManager class.
+        """
+        self.manager = manager
+        self.capture_id = capture_id
+
+    async def add_analyzer(
+        self,
+        name: str,
+        *,
+        label: Optional[str] = None,
+        settings: Optional[Dict[str, Union[str, int, float, bool]]] = None,
+    ) -> AnalyzerHandle:
+        """Add an analyzer to the capture
+
+        See Capture.add_analyzer()
+
+        :param name: The name of the Analyzer, as shown in the Logic 2 application add analyzer list. This must match exactly.
+        :param label: The user editable display string for the analyzer. This will be shown in the analyzer data table export, defaults to None
+        :param settings: All settings for the analyzer. The keys and values here must exactly match the Analyzer settings as shown in the UI, defaults to None
+        :return: Returns an AnalyzerHandle
+        """
+        request = _add_analyzer_request(self.capture_id, name, label=label, settings=settings)
+
+        with _error_handler():
+            reply = await self.manager.stub.AddAnalyzer(request)
+
+        return AnalyzerHandle(analyzer_id=reply.analyzer_id)
+
+    async def add_high_level_analyzer(
+        self,
+        extension_directory: str,
+        name: str,
+        *,
+        input_analyzer: AnalyzerHandle,
+        settings: Optional[Dict[str, Union[str, float]]] = None,
+        label: Optional[str] = None,
+    ) -> AnalyzerHandle:
+        """Add a high level analyzer to the capture.
+
+        See Capture.add_high_level_analyzer()
+
+        :param extension_directory: The directory of the extension that the HLA is in.
+        :param name: The name of the HLA, as specifiied in the extension.json of the extension.
+        :param input_analyzer: Handle to analyzer (added via add_analyzer) to use as input to this HLA.
+        :param settings: All settings for the analyzer. The keys and values here must match the HLA settings as shown in the HLA class.
+        :param label: The user editable display string for the high level analyzer. This will be shown in the analyzer data table export.
+        :return: Returns an AnalyzerHandle
+        """
+        request = _add_high_level_analyzer_request(
+            self.capture_id, extension_directory, name, input_analyzer=input_analyzer, settings=settings, label=label)
+
+        with _error_handler():
+            reply = await self.manager.stub.AddHighLevelAnalyzer(request)
+
+        return AnalyzerHandle(analyzer_id=reply.analyzer_id)
+
+    async def add_analyzers(
+        self,
+        analyzers: List[Union[AnalyzerConfiguration, HighLevelAnalyzerConfiguration]],
+    ) -> List[AnalyzerHandle]:
+        """Add several analyzers and high level analyzers to the capture in a single request.
+
+        See Capture.add_analyzers()
+
+        :param analyzers: AnalyzerConfiguration and HighLevelAnalyzerConfiguration objects describing the analyzers to add.
+        :return: Returns an AnalyzerHandle for each entry, in the same order as `analyzers`
+        """
+        request = _add_analyzers_request(self.capture_id, analyzers)
+
+        with _error_handler():
+            reply = await self.manager.stub.AddAnalyzers(request)
+
+        return [AnalyzerHandle(analyzer_id=analyzer_id) for analyzer_id in reply.analyzer_ids]
+
+    async def remove_analyzer(self, analyzer: AnalyzerHandle):
+        """
+        Removes an analyzer from the capture.
+
+        :param analyzer: AnalyzerHandle returned by add_analyzer()
+        """
+        request = saleae_pb2.RemoveAnalyzerRequest(
+            capture_id=self.capture_id, analyzer_id=analyzer.analyzer_id
+        )
+        with _error_handler():
+            await self.manager.stub.RemoveAnalyzer(request)
+
+    async def remove_high_level_analyzer(self, high_level_analyzer: AnalyzerHandle):
+        """
+        Removes a high level analyzer from the capture.
+
+        :param high_level_analyzer: AnalyzerHandle returned by add_analyzer()
+        """
+        request = saleae_pb2.RemoveHighLevelAnalyzerRequest(
+            capture_id=self.capture_id, analyzer_id=high_level_analyzer.analyzer_id
+        )
+        with _error_handler():
+            await self.manager.stub.RemoveHighLevelAnalyzer(request)
+
+    async def save_capture(self, filepath: str):
+        """
+        Saves the capture to a .sal file. See Capture.save_capture()
+
+        :param filepath: path to the .sal file. Can be absolute, or relative to the Logic 2 software current working directory.
+        """
+        request = saleae_pb2.SaveCaptureRequest(
+            capture_id=self.capture_id, filepath=filepath
+        )
+
+        with _error_handler():
+            await self.manager.stub.SaveCapture(request)
+
+    async def legacy_export_analyzer(
+        self, filepath: str, analyzer: AnalyzerHandle, radix: RadixType, *,
+        start_time: Optional[ExportTime] = None, end_time: Optional[ExportTime] = None,
+    ):
+        """
+        Exports the specified analyzer using the analyzer plugin export format. See Capture.legacy_export_analyzer()
+
+        :param filepath: file name and path to export to. Should include the file name and extension, typically .csv or .txt.
+        :param analyzer: AnalyzerHandle returned from add_analyzer()
+        :param radix: Display Radix, from the RadixType enumeration.
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
+        """
+        request = saleae_pb2.LegacyExportAnalyzerRequest(
+            capture_id=self.capture_id,
+            filepath=filepath,
+            analyzer_id=analyzer.analyzer_id,
+            radix_type=radix.value,
+            time_range=_time_range(start_time, end_time),
+        )
+
+        with _error_handler():
+            await self.manager.stub.LegacyExportAnalyzer(request)
+
+    async def export_data_table(
+        self,
+        filepath: str,
+        analyzers: List[Union[AnalyzerHandle, DataTableExportConfiguration]],
+        *,
+        columns: Optional[List[str]] = None,
+        filter: Optional[DataTableFilter] = None,
+        iso8601_timestamp: bool = False,
+        format: DataTableExportFormat = DataTableExportFormat.CSV,
+        start_time: Optional[ExportTime] = None,
+        end_time: Optional[ExportTime] = None,
+    ):
+        """
+        Exports the Analyzer Data Table. See Capture.export_data_table()
+
+        :param filepath: The specified output file, including extension, .csv, .arrow or .parquet.
+        :param analyzers: A list of AnalyzerHandles that should be included in the export, returned from add_analyzer()
+        :param columns: Columns to include in export.
+        :param filter: Filter to apply to the exported data.
+        :param iso8601_timestamp: Use this to output wall clock timestamps, instead of capture relative timestamps. Defaults to False.
+        :param format: File format to export. Defaults to CSV.
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
+        """
+        request = saleae_pb2.ExportDataTableCsvRequest(
+            capture_id=self.capture_id,
+            filepath=filepath,
+            analyzers=_data_table_analyzer_configs(analyzers),
+            export_columns=columns,
+            filter=_data_table_filter(filter),
+            iso8601_timestamp=iso8601_timestamp,
+            format=format.value,
+            time_range=_time_range(start_time, end_time),
+        )
+
+        with _error_handler():
+            await self.manager.stub.ExportDataTableCsv(request)
+
+    async def export_many(self, exports: List[Export], *, max_parallel_exports: Optional[int] = None) -> List[ExportResult]:
+        """
+        Runs several exports in a single request. See Capture.export_many()
+
+        :param exports: RawDataCsvExport, RawDataBinaryExport, DataTableCsvExport and LegacyAnalyzerExport objects, in any combination.
+        :param max_parallel_exports: Maximum number of exports to run at the same time. If unspecified, the Logic 2 software will choose.
+        :return: The result of each export, in the same order as `exports`.
+        """
+        request = _export_many_request(self.capture_id, exports, max_parallel_exports)
+
+        with _error_handler():
+            reply = await self.manager.stub.ExportMany(request)
+
+        return _export_results_from_reply(exports, reply)
+
+    async def iter_data_table(
+        self,
+        analyzers: List[Union[AnalyzerHandle, DataTableExportConfiguration]],
+        *,
+        columns: Optional[List[str]] = None,
+        filter: Optional[DataTableFilter] = None,
+        max_rows_per_reply: Optional[int] = None,
+    ) -> AsyncIterator[DataTableRow]:
+        """
+        Streams the Analyzer Data Table, without writing a CSV file. See Capture.iter_data_table()
+
+        Use with `async for`.
+
+        :param analyzers: A list of AnalyzerHandles that should be included, returned from add_analyzer()
+        :param columns: Columns to include.
+        :param filter: Filter to apply to the data.
+        :param max_rows_per_reply: maximum number of rows received per gRPC message. If unspecified, the Logic 2 software will choose.
+        """
+        request = saleae_pb2.StreamDataTableRequest(
+            capture_id=self.capture_id,
+            analyzers=_data_table_analyzer_configs(analyzers),
+            export_columns=columns,
+            filter=_data_table_filter(filter),
+            max_rows_per_reply=max_rows_per_reply,
+        )
+
+        call = self.manager.stub.StreamDataTable(request)
+        try:
+            column_names: List[str] = []
+            with _error_handler():
+                async for reply in call:
+                    for row in _data_table_rows(reply, column_names):
+                        yield row
+        finally:
+            call.cancel()
+
+    async def export_raw_data_csv(
+        self,
+        directory: str,
+        *,
+        analog_channels: Optional[List[int]] = None,
+        digital_channels: Optional[List[int]] = None,
+        analog_downsample_ratio: int = 1,
+        iso8601_timestamp: bool = False,
+        start_time: Optional[ExportTime] = None,
+        end_time: Optional[ExportTime] = None,
+    ):
+        """Exports raw data to CSV file(s). See Capture.export_raw_data_csv()
+
+        :param directory: directory path (not including a filename) to where analog.csv and/or digital.csv will be saved.
+        :param analog_channels: list of analog channels to export, defaults to None
+        :param digital_channels: list of digital channels to export, defaults to None
+        :param analog_downsample_ratio: optional analog downsample ratio, useful to help reduce export file sizes where extra analog resolution isn't needed, defaults to 1
+        :param iso8601_timestamp: Use this to output wall clock timestamps, instead of capture relative timestamps. Defaults to False.
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
+        """
+        request = saleae_pb2.ExportRawDataCsvRequest(
+            capture_id=self.capture_id,
+            directory=directory,
+            logic_channels=_logic_channels(analog_channels, digital_channels),
+            analog_downsample_ratio=analog_downsample_ratio,
+            iso8601_timestamp=iso8601_timestamp,
+            time_range=_time_range(start_time, end_time),
+        )
+
+        with _error_handler():
+            await self.manager.stub.ExportRawDataCsv(request)
+
+    async def export_raw_data_binary(
+        self,
+        directory: str,
+        *,
+        analog_channels: Optional[List[int]] = None,
+        digital_channels: Optional[List[int]] = None,
+        analog_downsample_ratio: int = 1,
+        start_time: Optional[ExportTime] = None,
+        end_time: Optional[ExportTime] = None,
+    ):
+        """
+        Exports raw data to binary files. See Capture.export_raw_data_binary()
+
+        :param directory: directory path (not including a filename) to where .bin files will be saved
+        :param analog_channels: list of analog channels to export, defaults to None
+        :param digital_channels: list of digital channels to export, defaults to None
+        :param analog_downsample_ratio: optional analog downsample ratio, useful to help reduce export file sizes where extra analog resolution isn't needed, defaults to 1
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
+        """
+        request = saleae_pb2.ExportRawDataBinaryRequest(
+            capture_id=self.capture_id,
+            directory=directory,
+            logic_channels=_logic_channels(analog_channels, digital_channels),
+            analog_downsample_ratio=analog_downsample_ratio,
+            time_range=_time_range(start_time, end_time),
+        )
+
+        with _error_handler():
+            await self.manager.stub.ExportRawDataBinary(request)
+
+    async def iter_raw_data(
+        self,
+        *,
+        analog_channels: Optional[List[int]] = None,
+        digital_channels: Optional[List[int]] = None,
+        analog_downsample_ratio: int = 1,
+        max_chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[RawDataChunk]:
+        """
+        Streams raw data from the capture, without writing any files. See Capture.iter_raw_data()
+
+        Use with `async for`.
+
+        :param analog_channels: list of analog channels to stream, defaults to None
+        :param digital_channels: list of digital channels to stream, defaults to None
+        :param analog_downsample_ratio: optional analog downsample ratio, defaults to 1
+        :param max_chunk_size: maximum number of transitions or samples in a single chunk. If unspecified, the Logic 2 software will choose.
+        """
+        request = saleae_pb2.StreamRawDataRequest(
+            capture_id=self.capture_id,
+            logic_channels=_logic_channels(analog_channels, digital_channels),
+            analog_downsample_ratio=analog_downsample_ratio,
+            max_chunk_size=max_chunk_size,
+        )
+
+        call = self.manager.stub.StreamRawData(request)
+        try:
+            with _error_handler():
+                async for reply in call:
+                    yield _raw_data_chunk_from_reply(reply)
+        finally:
+            call.cancel()
+
+    async def progress(self, interval_seconds: Optional[float] = None) -> AsyncIterator[CaptureProgress]:
+        """
+        Streams progress updates of the capture while it is recording. See Capture.progress()
+
+        Stopping iteration early cancels the stream, but not the capture.
+
+        :param interval_seconds: Interval between updates, in seconds. If unspecified, the Logic 2 software will choose.
+        """
+        request = saleae_pb2.StreamCaptureProgressRequest(
+            capture_id=self.capture_id,
+            interval_seconds=interval_seconds,
+        )
+
+        call = self.manager.stub.StreamCaptureProgress(request)
+        try:
+            with _error_handler():
+                async for reply in call:
+                    yield _capture_progress_from_reply(reply)
+        finally:
+            call.cancel()
+
+    async def iter_segments(self) -> AsyncIterator[CaptureSegment]:
+        """
+        Yields each segment of a capture in SegmentedCaptureMode once it has been saved. See Capture.iter_segments()
+
+        Stopping iteration early cancels the stream, but not the capture.
+        """
+        request = saleae_pb2.StreamCaptureSegmentsRequest(capture_id=self.capture_id)
+
+        call = self.manager.stub.StreamCaptureSegments(request)
+        try:
+            with _error_handler():
+                async for reply in call:
+                    yield _capture_segment_from_reply(reply)
+        finally:
+            call.cancel()
+
+    async def close(self):
+        """
+        Closes the capture. Once called, do not use this instance.
+        """
+        request = saleae_pb2.CloseCaptureRequest(capture_id=self.capture_id)
+        with _error_handler():
+            await self.manager.stub.CloseCapture(request)
+
+    async def stop(self):
+        """
+        Stops the capture. See Capture.stop()
+
+        Be sure to catch DeviceError exceptions raised by this function, and handle them accordingly. See the error section of the library documentation.
+        """
+        request = saleae_pb2.StopCaptureRequest(capture_id=self.capture_id)
+        with _error_handler():
+            await self.manager.stub.StopCapture(request)
+
+    async def wait(self, timeout: Optional[float] = None):
+        """
+        Waits for the capture to complete. See Capture.wait()
+
+        Unlike Capture.wait(), this does not block a thread while waiting, so it is safe to wait on many captures at
+        once, for example with asyncio.gather().
+
+        Be sure to catch DeviceError exceptions raised by this function, and handle them accordingly. See the error section of the library documentation.
+
+        :param timeout: See Capture.wait()
+        """
+        request = saleae_pb2.WaitCaptureRequest(capture_id=self.capture_id)
+        with _wait_error_handler(timeout):
+            await self.manager.stub.WaitCapture(request, timeout=timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
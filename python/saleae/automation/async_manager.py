@@ -0,0 +1,217 @@
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+import asyncio
+import logging
+import subprocess
+import time
+
+from . import errors
+
+from .async_capture import AsyncCapture
+from .manager import (AppInfo, CaptureConfiguration, DeviceConfiguration, DeviceDesc,
+                      _DEFAULT_GRPC_ADDRESS, _DEFAULT_GRPC_PORT, _app_info_from_reply, _channel_arguments, _check_app_info,
+                      _devices_from_reply, _launch_logic2_process, _start_capture_request)
+
+from ._lazy import grpc_aio, saleae_pb2, saleae_pb2_grpc
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncManager:
+    """
+    AsyncManager is the asyncio equivalent of the Manager class, built on grpc.aio.
+
+    All methods that communicate with the Logic 2 software are coroutines, and captures are returned as AsyncCapture
+    objects. Because no thread is blocked while a request is in flight, a single event loop can drive many captures and
+    exports concurrently.
+
+    Instances must be created with AsyncManager.launch() or AsyncManager.connect(), and must be closed on the same event
+    loop that created them.
+    """
+
+    def __init__(self, *, port: int, address: str = _DEFAULT_GRPC_ADDRESS,
+                 grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None,
+                 logic2_process: Optional[subprocess.Popen] = None,
+                 ):
+        """
+        Use AsyncManager.launch() or AsyncManager.connect() instead of using __init__ directly.
+
+        This creates the gRPC channel, but does not wait for the Logic 2 software to be available.
+
+        :param port: Port number. By default, Logic 2 uses port 10430.
+        :param address: Address to connect to.
+        :param grpc_channel_arguments: A set of arguments to pass through to gRPC.
+        :param logic2_process: Process object for Logic2 if launched from Python. The process will be shutdown automatically when
+                               AsyncManager.close() is called.
+        """
+        self.logic2_process = logic2_process
+        self.channel = grpc_aio.insecure_channel(f"{address}:{port}", options=_channel_arguments(grpc_channel_arguments))
+        self._stub = saleae_pb2_grpc.ManagerStub(self.channel)
+
+        #: See Manager.connect_latency_seconds. Set once the connection is established.
+        self.connect_latency_seconds: Optional[float] = None
+
+        #: See Manager.launch_latency_seconds
+        self.launch_latency_seconds: Optional[float] = None
+
+    async def _connect(self, connect_timeout_seconds: Optional[float]):
+        connect_timeout_seconds = 20.0 if connect_timeout_seconds is None else connect_timeout_seconds
+
+        start_time = time.monotonic()
+        try:
+            # wait_for_ready lets gRPC hold the request until the server is reachable, instead of polling
+            with errors._error_handler():
+                reply: saleae_pb2.GetAppInfoReply = await self.stub.GetAppInfo(
+                    saleae_pb2.GetAppInfoRequest(), wait_for_ready=True, timeout=connect_timeout_seconds)
+
+            _check_app_info(_app_info_from_reply(reply), self.logic2_process)
+        except BaseException:
+            await self.close()
+            raise
+
+        self.connect_latency_seconds = time.monotonic() - start_time
+
+    @classmethod
+    async def launch(cls,
+                     application_path: Optional[Union[Path, str]] = None,
+                     connect_timeout_seconds: Optional[float] = None,
+                     grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None,
+                     port: Optional[int] = None) -> 'AsyncManager':
+        """
+        Launch the Logic2 application and shut it down when the returned AsyncManager is closed.
+
+        :param application_path: The path to the Logic2 binary to run. If not specified,
+                                 a locally installed copy of Logic2 will be searched for.
+        :param connect_timeout_seconds: See Manager.__init__
+        :param grpc_channel_arguments: See Manager.__init__
+        :param port: Port to use for the gRPC server. If not specified, 10430 will be used.
+        """
+        if port is None:
+            port = _DEFAULT_GRPC_PORT
+
+        launch_time = time.monotonic()
+        process = _launch_logic2_process(application_path, port)
+
+        manager = cls(
+            address=_DEFAULT_GRPC_ADDRESS,
+            port=port,
+            logic2_process=process,
+            grpc_channel_arguments=grpc_channel_arguments)
+        await manager._connect(connect_timeout_seconds)
+        manager.launch_latency_seconds = time.monotonic() - launch_time
+        return manager
+
+    @classmethod
+    async def connect(cls,
+                      *,
+                      address: str = _DEFAULT_GRPC_ADDRESS,
+                      port: int = _DEFAULT_GRPC_PORT,
+                      connect_timeout_seconds: Optional[float] = None,
+                      grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None) -> 'AsyncManager':
+        """Connect to an existing instance of Logic 2.
+
+        :param port: Port number. By default, Logic 2 uses port 10430.
+        :param address: Address to connect to.
+        :param connect_timeout_seconds: See Manager.__init__
+        :param grpc_channel_arguments: See Manager.__init__
+        """
+        manager = cls(address=address,
+                      port=port,
+                      grpc_channel_arguments=grpc_channel_arguments)
+        await manager._connect(connect_timeout_seconds)
+        return manager
+
+    async def get_app_info(self) -> AppInfo:
+        """Get information about the connected Logic 2 instance.
+
+        :return: AppInfo object for the connected Logic 2 instance.
+        """
+        with errors._error_handler():
+            reply: saleae_pb2.GetAppInfoReply = await self.stub.GetAppInfo(saleae_pb2.GetAppInfoRequest())
+
+        return _app_info_from_reply(reply)
+
+    async def close(self):
+        """
+        Close connection to Saleae backend, and shut it down if it was created by AsyncManager.
+        """
+        if self.channel is not None:
+            await self.channel.close()
+        self.channel = None
+        self._stub = None
+
+        if self.logic2_process:
+            process = self.logic2_process
+            self.logic2_process = None
+
+            try:
+                process.terminate()
+                await asyncio.get_running_loop().run_in_executor(None, process.wait, 2.0)
+            except:
+                pass
+
+    @property
+    def stub(self) -> 'saleae_pb2_grpc.ManagerStub':
+        """
+        :meta private:
+        """
+        if self._stub is None:
+            raise RuntimeError("Cannot use AsyncManager after it has been closed")
+        return self._stub
+
+    async def get_devices(self, *, include_simulation_devices: bool = False) -> List[DeviceDesc]:
+        """
+        Returns a list of connected devices. See Manager.get_devices()
+
+        :param include_simulation_devices: If True, the return value will also include simulation devices. This can be useful for testing without a physical device.
+        """
+        request = saleae_pb2.GetDevicesRequest(include_simulation_devices=include_simulation_devices)
+        with errors._error_handler():
+            reply: saleae_pb2.GetDevicesReply = await self.stub.GetDevices(request)
+
+        return _devices_from_reply(reply)
+
+    async def start_capture(
+        self,
+        *,
+        device_configuration: DeviceConfiguration,
+        device_id: Optional[str] = None,
+        capture_configuration: Optional[CaptureConfiguration] = None,
+    ) -> AsyncCapture:
+        """Start a new capture. See Manager.start_capture()
+
+        Be sure to catch DeviceError exceptions raised by this function, and handle them accordingly. See the error section of the library documentation.
+
+        :param device_configuration: An instance of LogicDeviceConfiguration, complete with enabled channels, sample rates, and more.
+        :param device_id: The id of device to record with.
+        :param capture_configuration: The capture configuration, which selects the capture mode: timer, digital trigger, or manual., defaults to None, indicating manual mode.
+        :return: AsyncCapture instance class. Be sure to call either wait() or stop() before trying to save, export, or close the capture.
+        """
+        request = _start_capture_request(
+            device_configuration=device_configuration,
+            device_id=device_id,
+            capture_configuration=capture_configuration,
+        )
+
+        with errors._error_handler():
+            reply: saleae_pb2.StartCaptureReply = await self.stub.StartCapture(request)
+
+        return AsyncCapture(self, reply.capture_info.capture_id)
+
+    async def load_capture(self, filepath: str) -> AsyncCapture:
+        """
+        Load a capture. See Manager.load_capture()
+
+        :return: AsyncCapture instance class.
+        """
+        request = saleae_pb2.LoadCaptureRequest(filepath=filepath)
+        with errors._error_handler():
+            reply: saleae_pb2.LoadCaptureReply = await self.stub.LoadCapture(request)
+
+        return AsyncCapture(self, reply.capture_info.capture_id)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -0,0 +1,711 @@
+"""
+Readers for the files produced by Capture.export_raw_data_binary().
+
+The format is documented here: https://support.saleae.com/faq/technical-faq/binary-export-format-logic-2
+
+Sample data is exposed as read-only, memory-mapped NumPy arrays. Nothing beyond the file header is read until the
+arrays are accessed, so even multi-gigabyte exports can be opened instantly and processed with bounded memory usage.
+
+To answer many time-window queries on a large digital export, use open_transition_index(). It keeps the first and last
+transition time of each block of transitions in a small sidecar file, so each query only reads a single block of the
+export. Similarly, open_envelope_pyramid() keeps the minimum and maximum voltage of an analog export at several levels of
+detail, so that any time range can be plotted with a bounded number of points, without losing spikes.
+
+This module requires NumPy, which is not installed by default: `pip install logic2-automation[numpy]`
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+import math
+import os
+import re
+import struct
+import threading
+
+import numpy as np
+
+_IDENTIFIER = b'<SALEAE>'
+
+# identifier, version, type
+_HEADER = struct.Struct('<8sii')
+
+# initial_state, begin_time, end_time, num_transitions
+_DIGITAL_HEADER_V0 = struct.Struct('<IddQ')
+
+# begin_time, sample_rate, downsample, num_samples
+_ANALOG_HEADER_V0 = struct.Struct('<dQQQ')
+
+_DIGITAL_EXPORT_TYPE = 0
+_ANALOG_EXPORT_TYPE = 1
+
+_SUPPORTED_VERSIONS = (0,)
+
+_FILENAME_RE = re.compile(r'^(digital|analog)_(\d+)\.bin$')
+
+_INDEX_IDENTIFIER = b'<SALIDX>'
+_INDEX_VERSION = 0
+
+# identifier, version, block_size, num_transitions, size and modification time (ns) of the export file
+_INDEX_HEADER = struct.Struct('<8siIQQq')
+
+#: Default number of transitions per block of a DigitalTransitionIndex
+DEFAULT_INDEX_BLOCK_SIZE = 4096
+
+_PYRAMID_IDENTIFIER = b'<SALLOD>'
+_PYRAMID_VERSION = 0
+
+# identifier, version, base_block_size, factor, num_levels, num_samples, size and modification time (ns) of the export file
+_PYRAMID_HEADER = struct.Struct('<8siIIIQQq')
+
+#: Default number of samples in each point of the finest level of an AnalogEnvelopePyramid
+DEFAULT_PYRAMID_BASE_BLOCK_SIZE = 64
+
+#: Default ratio between the number of samples in each point of consecutive levels of an AnalogEnvelopePyramid
+DEFAULT_PYRAMID_FACTOR = 4
+
+# Number of samples read at a time while building an AnalogEnvelopePyramid, as a multiple of the base block size
+_PYRAMID_BUILD_CHUNK_BLOCKS = 16384
+
+
+@dataclass
+class DigitalExport:
+    """
+    The contents of a single `digital_N.bin` file.
+    """
+
+    #: Path of the exported file
+    filepath: str
+
+    #: State of the channel (0 or 1) at begin_time
+    initial_state: int
+
+    #: Time of the first sample, in seconds
+    begin_time: float
+
+    #: Time of the last sample, in seconds
+    end_time: float
+
+    #: Time of every transition, in seconds, as a read-only memory-mapped float64 array.
+    #: The channel state toggles at each transition, starting from initial_state.
+    transition_times: np.ndarray = field(repr=False)
+
+    @property
+    def num_transitions(self) -> int:
+        return len(self.transition_times)
+
+
+@dataclass
+class AnalogExport:
+    """
+    The contents of a single `analog_N.bin` file.
+    """
+
+    #: Path of the exported file
+    filepath: str
+
+    #: Time of the first sample, in seconds
+    begin_time: float
+
+    #: Sample rate of the capture, in samples per second, before downsampling
+    sample_rate: int
+
+    #: Downsample ratio used for the export (analog_downsample_ratio)
+    downsample: int
+
+    #: Voltage of every sample, as a read-only memory-mapped float32 array
+    samples: np.ndarray = field(repr=False)
+
+    @property
+    def num_samples(self) -> int:
+        return len(self.samples)
+
+    @property
+    def effective_sample_rate(self) -> float:
+        """
+        Rate of the exported samples, in samples per second, after downsampling.
+        """
+        return self.sample_rate / self.downsample
+
+    def sample_times(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Compute the time, in seconds, of samples[start:stop].
+
+        The times are computed on demand rather than stored in the file, so keep the range small for large exports.
+
+        :param start: Index of the first sample.
+        :param stop: Index one past the last sample. Defaults to the end of the export.
+        """
+        start, stop, _ = slice(start, stop).indices(self.num_samples)
+        return self.begin_time + np.arange(start, stop, dtype=np.float64) / self.effective_sample_rate
+
+
+BinaryExport = Union[DigitalExport, AnalogExport]
+
+
+@dataclass
+class BinaryExportDirectory:
+    """
+    All binary export files found in an export directory, keyed by channel index.
+    """
+
+    #: Digital channel exports, keyed by channel index
+    digital: Dict[int, DigitalExport] = field(default_factory=dict)
+
+    #: Analog channel exports, keyed by channel index
+    analog: Dict[int, AnalogExport] = field(default_factory=dict)
+
+
+def _read_header(f, filepath: str):
+    data = f.read(_HEADER.size)
+    if len(data) < _HEADER.size:
+        raise RuntimeError(f'"{filepath}" is too short to be a Saleae binary export')
+
+    identifier, version, export_type = _HEADER.unpack(data)
+    if identifier != _IDENTIFIER:
+        raise RuntimeError(f'"{filepath}" is not a Saleae binary export')
+
+    if version not in _SUPPORTED_VERSIONS:
+        raise RuntimeError(f'"{filepath}" uses unsupported binary export version {version}')
+
+    return export_type
+
+
+def _read_struct(f, s: struct.Struct, filepath: str):
+    data = f.read(s.size)
+    if len(data) < s.size:
+        raise RuntimeError(f'"{filepath}" is truncated')
+    return s.unpack(data)
+
+
+def _memmap(filepath: str, dtype: str, offset: int, count: int) -> np.ndarray:
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+
+    required_size = offset + count * np.dtype(dtype).itemsize
+    if os.path.getsize(filepath) < required_size:
+        raise RuntimeError(f'"{filepath}" is truncated')
+
+    return np.memmap(filepath, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def read_binary_export(filepath: str) -> BinaryExport:
+    """
+    Open a single file produced by Capture.export_raw_data_binary().
+
+    :param filepath: Path to a `digital_N.bin` or `analog_N.bin` file.
+    :return: DigitalExport or AnalogExport, depending on the contents of the file.
+    """
+    filepath = str(filepath)
+
+    with open(filepath, 'rb') as f:
+        export_type = _read_header(f, filepath)
+
+        if export_type == _DIGITAL_EXPORT_TYPE:
+            initial_state, begin_time, end_time, num_transitions = _read_struct(f, _DIGITAL_HEADER_V0, filepath)
+            return DigitalExport(
+                filepath=filepath,
+                initial_state=initial_state,
+                begin_time=begin_time,
+                end_time=end_time,
+                transition_times=_memmap(filepath, '<f8', f.tell(), num_transitions),
+            )
+        elif export_type == _ANALOG_EXPORT_TYPE:
+            begin_time, sample_rate, downsample, num_samples = _read_struct(f, _ANALOG_HEADER_V0, filepath)
+            return AnalogExport(
+                filepath=filepath,
+                begin_time=begin_time,
+                sample_rate=sample_rate,
+                downsample=downsample,
+                samples=_memmap(filepath, '<f4', f.tell(), num_samples),
+            )
+        else:
+            raise RuntimeError(f'"{filepath}" has unknown binary export type {export_type}')
+
+
+def read_digital_export(filepath: str) -> DigitalExport:
+    """
+    Open a `digital_N.bin` file produced by Capture.export_raw_data_binary().
+
+    :param filepath: Path to the exported file.
+    """
+    export = read_binary_export(filepath)
+    if not isinstance(export, DigitalExport):
+        raise RuntimeError(f'"{filepath}" is not a digital binary export')
+    return export
+
+
+def read_analog_export(filepath: str) -> AnalogExport:
+    """
+    Open an `analog_N.bin` file produced by Capture.export_raw_data_binary().
+
+    :param filepath: Path to the exported file.
+    """
+    export = read_binary_export(filepath)
+    if not isinstance(export, AnalogExport):
+        raise RuntimeError(f'"{filepath}" is not an analog binary export')
+    return export
+
+
+def read_binary_export_directory(directory: str) -> BinaryExportDirectory:
+    """
+    Open every `digital_N.bin` and `analog_N.bin` file in a directory passed to Capture.export_raw_data_binary().
+
+    :param directory: The export directory.
+    """
+    result = BinaryExportDirectory()
+
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME_RE.match(filename)
+        if match is None:
+            continue
+
+        filepath = os.path.join(directory, filename)
+        channel_index = int(match.group(2))
+        if match.group(1) == 'digital':
+            result.digital[channel_index] = read_digital_export(filepath)
+        else:
+            result.analog[channel_index] = read_analog_export(filepath)
+
+    return result
+
+
+def _write_sidecar(path: str, header: bytes, arrays):
+    """
+    Atomically replace the file at `path` with `header` followed by the contents of each array.
+    """
+    # Unique per thread, so concurrent writers of the same sidecar never share a temp file
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            for array in arrays:
+                array.tofile(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class DigitalTransitionIndex:
+    """
+    An index over the transition times of a DigitalExport, for fast time-window queries.
+
+    The transitions are split into blocks of `block_size`, and the index holds the first and last transition time of
+    each block. A query binary searches these in memory, and then only reads the single block of the export that
+    contains the answer, so its cost is O(log n) and it reads at most one block from disk.
+
+    Use open_transition_index() to load the index from its sidecar file, or build and save it if it doesn't exist.
+    """
+
+    def __init__(self, export: DigitalExport, block_size: int, block_start_times: np.ndarray, block_end_times: np.ndarray):
+        """
+        It is recommended that you use open_transition_index() or DigitalTransitionIndex.build() instead of using
+        __init__ directly.
+        """
+        #: The indexed export
+        self.export = export
+
+        #: Number of transitions in each block. The last block may be shorter.
+        self.block_size = block_size
+
+        #: Time of the first transition of each block, in seconds
+        self.block_start_times = block_start_times
+
+        #: Time of the last transition of each block, in seconds
+        self.block_end_times = block_end_times
+
+    @classmethod
+    def build(cls, export: DigitalExport, block_size: int = DEFAULT_INDEX_BLOCK_SIZE) -> 'DigitalTransitionIndex':
+        """
+        Build the index of an export. This reads every transition once.
+
+        :param export: The export to index.
+        :param block_size: Number of transitions in each block.
+        """
+        if block_size < 1:
+            raise ValueError('block_size must be at least 1')
+
+        times = export.transition_times
+        block_start_times = np.array(times[::block_size], dtype=np.float64)
+        block_end_times = np.array(times[block_size - 1::block_size], dtype=np.float64)
+        if len(block_end_times) < len(block_start_times):
+            block_end_times = np.append(block_end_times, times[-1])
+
+        return cls(export, block_size, block_start_times, block_end_times)
+
+    @classmethod
+    def load(cls, export: DigitalExport, index_path: str) -> 'DigitalTransitionIndex':
+        """
+        Load an index saved with save().
+
+        :param export: The indexed export.
+        :param index_path: Path of the index file.
+        :raises RuntimeError: The file is not an index, or it does not match the current contents of the export.
+        """
+        with open(index_path, 'rb') as f:
+            data = f.read(_INDEX_HEADER.size)
+            if len(data) < _INDEX_HEADER.size:
+                raise RuntimeError(f'"{index_path}" is too short to be a transition index')
+
+            identifier, version, block_size, num_transitions, file_size, mtime_ns = _INDEX_HEADER.unpack(data)
+            if identifier != _INDEX_IDENTIFIER:
+                raise RuntimeError(f'"{index_path}" is not a transition index')
+            if version != _INDEX_VERSION:
+                raise RuntimeError(f'"{index_path}" uses unsupported transition index version {version}')
+
+            stat = os.stat(export.filepath)
+            if (num_transitions, file_size, mtime_ns) != (export.num_transitions, stat.st_size, stat.st_mtime_ns):
+                raise RuntimeError(f'"{index_path}" is out of date with "{export.filepath}"')
+
+            num_blocks = -(-num_transitions // block_size)
+            block_times = np.fromfile(f, dtype='<f8', count=2 * num_blocks)
+            if len(block_times) < 2 * num_blocks:
+                raise RuntimeError(f'"{index_path}" is truncated')
+
+        return cls(export, block_size, block_times[:num_blocks], block_times[num_blocks:])
+
+    def save(self, index_path: str):
+        """
+        Save the index, so that it can be loaded with load() instead of being built again.
+
+        The file is replaced atomically, so concurrent readers never see a partially written index.
+
+        :param index_path: Path of the index file.
+        """
+        stat = os.stat(self.export.filepath)
+        header = _INDEX_HEADER.pack(_INDEX_IDENTIFIER, _INDEX_VERSION, self.block_size, self.export.num_transitions,
+                                    stat.st_size, stat.st_mtime_ns)
+        _write_sidecar(index_path, header, [self.block_start_times.astype('<f8'), self.block_end_times.astype('<f8')])
+
+    @property
+    def num_blocks(self) -> int:
+        return len(self.block_start_times)
+
+    def _search(self, time: float, side: str) -> int:
+        # The first block that can contain the position, from the last time of each block
+        block = int(np.searchsorted(self.block_end_times, time, side=side))
+        if block == self.num_blocks:
+            return self.export.num_transitions
+
+        start = block * self.block_size
+        first_time = self.block_start_times[block]
+        if time < first_time or (side == 'left' and time == first_time):
+            return start
+
+        stop = min(start + self.block_size, self.export.num_transitions)
+        return start + int(np.searchsorted(self.export.transition_times[start:stop], time, side=side))
+
+    def count_transitions(self, start_time: float, end_time: float) -> int:
+        """
+        Count the transitions in [start_time, end_time).
+        """
+        if end_time <= start_time:
+            return 0
+        return self._search(end_time, 'left') - self._search(start_time, 'left')
+
+    def transitions_between(self, start_time: float, end_time: float) -> np.ndarray:
+        """
+        Time of every transition in [start_time, end_time), in seconds.
+
+        The result is a view of the memory-mapped export, so only the pages that contain the window are read.
+        """
+        start = self._search(start_time, 'left')
+        stop = max(self._search(end_time, 'left'), start)
+        return self.export.transition_times[start:stop]
+
+    def state_at(self, time: float) -> int:
+        """
+        State of the channel (0 or 1) at `time`. At the time of a transition, this is the state after the transition.
+        """
+        return self.export.initial_state ^ (self._search(time, 'right') & 1)
+
+
+def open_transition_index(export: Union[DigitalExport, str], *, index_path: Optional[str] = None,
+                          block_size: int = DEFAULT_INDEX_BLOCK_SIZE) -> DigitalTransitionIndex:
+    """
+    Open the transition index of a digital export, building it if it doesn't exist or is out of date.
+
+    A newly built index is saved next to the export, so later calls (including from other processes) only read the
+    index file. If the index can't be saved, e.g. because the directory is read-only, it is still returned.
+
+    :param export: A DigitalExport, or the path to a `digital_N.bin` file.
+    :param index_path: Path of the index file. Defaults to the path of the export with `.idx` appended.
+    :param block_size: Number of transitions in each block, if the index is built.
+    """
+    if not isinstance(export, DigitalExport):
+        export = read_digital_export(export)
+
+    if index_path is None:
+        index_path = export.filepath + '.idx'
+
+    if os.path.exists(index_path):
+        try:
+            return DigitalTransitionIndex.load(export, index_path)
+        except RuntimeError:
+            pass
+
+    index = DigitalTransitionIndex.build(export, block_size)
+    try:
+        index.save(index_path)
+    except OSError:
+        pass
+    return index
+
+
+@dataclass
+class AnalogEnvelope:
+    """
+    The minimum and maximum voltage of an analog export over consecutive time buckets. Returned by
+    AnalogEnvelopePyramid.envelope().
+    """
+
+    #: Start time of each bucket, in seconds
+    times: np.ndarray = field(repr=False)
+
+    #: Minimum voltage in each bucket
+    min_values: np.ndarray = field(repr=False)
+
+    #: Maximum voltage in each bucket
+    max_values: np.ndarray = field(repr=False)
+
+    #: Average number of exported samples in each bucket. 1 if the buckets are the samples themselves.
+    samples_per_point: float
+
+    @property
+    def num_points(self) -> int:
+        return len(self.times)
+
+
+class AnalogEnvelopePyramid:
+    """
+    Minimum and maximum voltage of an AnalogExport, at several levels of detail.
+
+    Each point of level 0 covers `base_block_size` samples, and each point of level `k + 1` covers `factor` points of
+    level `k`, up to a level with a single point. Unlike analog_downsample_ratio, which drops samples, every sample
+    contributes to the minimum and maximum of its point, so short spikes are never lost.
+
+    envelope() reads the coarsest level that still has the requested number of points, so its cost depends only on the
+    number of points, not on the length of the time range. With the default settings, the pyramid is about 1/24th of the size of
+    the export.
+
+    Use open_envelope_pyramid() to load the pyramid from its sidecar file, or build and save it if it doesn't exist.
+    """
+
+    def __init__(self, export: AnalogExport, base_block_size: int, factor: int,
+                 min_levels: List[np.ndarray], max_levels: List[np.ndarray]):
+        """
+        It is recommended that you use open_envelope_pyramid() or AnalogEnvelopePyramid.build() instead of using
+        __init__ directly.
+        """
+        #: The export the pyramid was built from
+        self.export = export
+
+        #: Number of samples in each point of level 0
+        self.base_block_size = base_block_size
+
+        #: Ratio between the number of samples in each point of consecutive levels
+        self.factor = factor
+
+        #: Minimum voltage of each point, for each level
+        self.min_levels = min_levels
+
+        #: Maximum voltage of each point, for each level
+        self.max_levels = max_levels
+
+    @classmethod
+    def build(cls, export: AnalogExport, base_block_size: int = DEFAULT_PYRAMID_BASE_BLOCK_SIZE,
+              factor: int = DEFAULT_PYRAMID_FACTOR) -> 'AnalogEnvelopePyramid':
+        """
+        Build the pyramid of an export. This reads every sample once, a chunk at a time, so memory usage is bounded.
+
+        :param export: The export to summarize.
+        :param base_block_size: Number of samples in each point of level 0.
+        :param factor: Ratio between the number of samples in each point of consecutive levels. Must be at least 2.
+        """
+        if base_block_size < 1:
+            raise ValueError('base_block_size must be at least 1')
+        if factor < 2:
+            raise ValueError('factor must be at least 2')
+
+        min_levels = [_reduce_blocks(export.samples, base_block_size, np.minimum, _PYRAMID_BUILD_CHUNK_BLOCKS)]
+        max_levels = [_reduce_blocks(export.samples, base_block_size, np.maximum, _PYRAMID_BUILD_CHUNK_BLOCKS)]
+        while len(min_levels[-1]) > 1:
+            min_levels.append(_reduce_blocks(min_levels[-1], factor, np.minimum))
+            max_levels.append(_reduce_blocks(max_levels[-1], factor, np.maximum))
+
+        return cls(export, base_block_size, factor, min_levels, max_levels)
+
+    @classmethod
+    def load(cls, export: AnalogExport, pyramid_path: str) -> 'AnalogEnvelopePyramid':
+        """
+        Load a pyramid saved with save().
+
+        :param export: The export the pyramid was built from.
+        :param pyramid_path: Path of the pyramid file.
+        :raises RuntimeError: The file is not a pyramid, or it does not match the current contents of the export.
+        """
+        with open(pyramid_path, 'rb') as f:
+            data = f.read(_PYRAMID_HEADER.size)
+            if len(data) < _PYRAMID_HEADER.size:
+                raise RuntimeError(f'"{pyramid_path}" is too short to be an envelope pyramid')
+
+            identifier, version, base_block_size, factor, num_levels, num_samples, file_size, mtime_ns = \
+                _PYRAMID_HEADER.unpack(data)
+            if identifier != _PYRAMID_IDENTIFIER:
+                raise RuntimeError(f'"{pyramid_path}" is not an envelope pyramid')
+            if version != _PYRAMID_VERSION:
+                raise RuntimeError(f'"{pyramid_path}" uses unsupported envelope pyramid version {version}')
+
+            stat = os.stat(export.filepath)
+            if (num_samples, file_size, mtime_ns) != (export.num_samples, stat.st_size, stat.st_mtime_ns):
+                raise RuntimeError(f'"{pyramid_path}" is out of date with "{export.filepath}"')
+
+        # The levels are memory-mapped, since level 0 alone is 1/32nd of the size of the export with the default settings
+        min_levels = []
+        max_levels = []
+        offset = _PYRAMID_HEADER.size
+        num_points = -(-num_samples // base_block_size)
+        for _ in range(num_levels):
+            min_levels.append(_memmap(pyramid_path, '<f4', offset, num_points))
+            max_levels.append(_memmap(pyramid_path, '<f4', offset + 4 * num_points, num_points))
+            offset += 8 * num_points
+            num_points = -(-num_points // factor)
+
+        return cls(export, base_block_size, factor, min_levels, max_levels)
+
+    def save(self, pyramid_path: str):
+        """
+        Save the pyramid, so that it can be loaded with load() instead of being built again.
+
+        The file is replaced atomically, so concurrent readers never see a partially written pyramid.
+
+        :param pyramid_path: Path of the pyramid file.
+        """
+        stat = os.stat(self.export.filepath)
+        header = _PYRAMID_HEADER.pack(_PYRAMID_IDENTIFIER, _PYRAMID_VERSION, self.base_block_size, self.factor,
+                                      self.num_levels, self.export.num_samples, stat.st_size, stat.st_mtime_ns)
+        arrays = []
+        for min_values, max_values in zip(self.min_levels, self.max_levels):
+            arrays.append(min_values.astype('<f4'))
+            arrays.append(max_values.astype('<f4'))
+        _write_sidecar(pyramid_path, header, arrays)
+
+    @property
+    def num_levels(self) -> int:
+        return len(self.min_levels)
+
+    def samples_per_point(self, level: int) -> int:
+        """
+        Number of exported samples covered by each point of `level`.
+        """
+        return self.base_block_size * self.factor ** level
+
+    def envelope(self, start_time: Optional[float] = None, end_time: Optional[float] = None,
+                 max_points: int = 2000) -> AnalogEnvelope:
+        """
+        The minimum and maximum voltage over [start_time, end_time), with at most `max_points` points.
+
+        If the range contains at most `max_points` samples, the samples themselves are returned. Otherwise exactly
+        `max_points` points are returned, each reduced from the samples or from the coarsest level that has at least
+        `max_points` points in the range, so the resolution changes smoothly with the length of the range. When a level
+        is used, the first and last points may extend slightly beyond the range.
+
+        :param start_time: Start of the range, in seconds. Defaults to the start of the export.
+        :param end_time: End of the range, in seconds. Defaults to the end of the export.
+        :param max_points: Maximum number of points to return, e.g. the width of the plot in pixels.
+        """
+        if max_points < 1:
+            raise ValueError('max_points must be at least 1')
+
+        export = self.export
+        rate = export.effective_sample_rate
+        start = 0 if start_time is None else math.floor((start_time - export.begin_time) * rate)
+        stop = export.num_samples if end_time is None else math.ceil((end_time - export.begin_time) * rate)
+        start = min(max(start, 0), export.num_samples)
+        stop = min(max(stop, start), export.num_samples)
+
+        if stop - start <= max_points:
+            samples = export.samples[start:stop]
+            return AnalogEnvelope(times=export.sample_times(start, stop), min_values=samples, max_values=samples,
+                                  samples_per_point=1)
+
+        # Start from the samples, and move to coarser levels while they still have enough points. Since the next level
+        # has fewer than max_points points, at most `factor * max_points` values are read.
+        min_values = max_values = export.samples
+        first, last, source_samples_per_point = start, stop, 1
+        for level in range(self.num_levels):
+            samples_per_point = self.samples_per_point(level)
+            level_first = start // samples_per_point
+            level_last = -(-stop // samples_per_point)
+            if level_last - level_first < max_points:
+                break
+            min_values, max_values = self.min_levels[level], self.max_levels[level]
+            first, last, source_samples_per_point = level_first, level_last, samples_per_point
+
+        # Split the source points into max_points buckets, whose sizes differ by at most one point
+        num_source_points = last - first
+        bucket_starts = np.arange(max_points, dtype=np.int64) * num_source_points // max_points
+        times = export.begin_time + (first + bucket_starts) * source_samples_per_point / rate
+        return AnalogEnvelope(
+            times=times,
+            min_values=np.minimum.reduceat(np.asarray(min_values[first:last]), bucket_starts),
+            max_values=np.maximum.reduceat(np.asarray(max_values[first:last]), bucket_starts),
+            samples_per_point=num_source_points * source_samples_per_point / max_points)
+
+
+def _reduce_blocks(values: np.ndarray, block_size: int, reduce, chunk_blocks: Optional[int] = None) -> np.ndarray:
+    """
+    Reduce each block of `block_size` values with `reduce` (np.minimum or np.maximum). The last block may be shorter.
+
+    If chunk_blocks is set, the values are read that many blocks at a time, so that memory-mapped input is not loaded
+    all at once.
+    """
+    num_values = len(values)
+    num_blocks = -(-num_values // block_size)
+    result = np.empty(num_blocks, dtype=np.float32)
+    num_full_blocks = num_values // block_size
+
+    step = chunk_blocks if chunk_blocks is not None else max(num_full_blocks, 1)
+    for first in range(0, num_full_blocks, step):
+        last = min(first + step, num_full_blocks)
+        chunk = np.asarray(values[first * block_size:last * block_size])
+        result[first:last] = reduce.reduce(chunk.reshape(last - first, block_size), axis=1)
+
+    if num_full_blocks < num_blocks:
+        result[-1] = reduce.reduce(np.asarray(values[num_full_blocks * block_size:]))
+
+    return result
+
+
+def open_envelope_pyramid(export: Union[AnalogExport, str], *, pyramid_path: Optional[str] = None,
+                          base_block_size: int = DEFAULT_PYRAMID_BASE_BLOCK_SIZE,
+                          factor: int = DEFAULT_PYRAMID_FACTOR) -> AnalogEnvelopePyramid:
+    """
+    Open the envelope pyramid of an analog export, building it if it doesn't exist or is out of date.
+
+    A newly built pyramid is saved next to the export, so later calls (including from other processes) only read the
+    pyramid file. If the pyramid can't be saved, e.g. because the directory is read-only, it is still returned.
+
+    :param export: An AnalogExport, or the path to an `analog_N.bin` file.
+    :param pyramid_path: Path of the pyramid file. Defaults to the path of the export with `.lod` appended.
+    :param base_block_size: Number of samples in each point of level 0, if the pyramid is built.
+    :param factor: Ratio between the number of samples in each point of consecutive levels, if the pyramid is built.
+    """
+    if not isinstance(export, AnalogExport):
+        export = read_analog_export(export)
+
+    if pyramid_path is None:
+        pyramid_path = export.filepath + '.lod'
+
+    if os.path.exists(pyramid_path):
+        try:
+            return AnalogEnvelopePyramid.load(export, pyramid_path)
+        except RuntimeError:
+            pass
+
+    pyramid = AnalogEnvelopePyramid.build(export, base_block_size, factor)
+    try:
+        pyramid.save(pyramid_path)
+    except OSError:
+        pass
+    return pyramid
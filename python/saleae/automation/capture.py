@@ -1,18 +1,55 @@
+from concurrent.futures import Future
+from contextlib import contextmanager
 from enum import Enum
-from .errors import _error_handler
+import datetime
+import functools
+import inspect
+from .errors import SaleaeError, _error_code_to_exception, _error_handler, _wait_error_handler, _wait_error_to_exception
 
 import saleae.automation
-from saleae.grpc import saleae_pb2, saleae_pb2_grpc
+from ._lazy import saleae_pb2, saleae_pb2_grpc
 
-from typing import List, Optional, Union, Dict
+from typing import Callable, Iterator, List, Optional, Sequence, Union, Dict
 from dataclasses import dataclass
 
 
 class RadixType(Enum):
-    BINARY = saleae_pb2.RADIX_TYPE_BINARY
-    DECIMAL = saleae_pb2.RADIX_TYPE_DECIMAL
-    HEXADECIMAL = saleae_pb2.RADIX_TYPE_HEXADECIMAL
-    ASCII = saleae_pb2.RADIX_TYPE_ASCII
+    # Values match the RadixType enum in saleae.proto
+    BINARY = 1
+    DECIMAL = 2
+    HEXADECIMAL = 3
+    ASCII = 4
+
+
+class DataTableExportFormat(Enum):
+    # Values match the DataTableExportFormat enum in saleae.proto
+
+    #: Comma separated text. Numeric values are formatted with the radix of their analyzer.
+    CSV = 1
+
+    #: Arrow IPC file, with typed columns. Load it with saleae.automation.data_table.read_data_table()
+    ARROW_IPC = 2
+
+    #: Parquet file, with typed columns. Load it with saleae.automation.data_table.read_data_table()
+    PARQUET = 3
+
+
+class CaptureTriggerState(Enum):
+    # Values match the CaptureTriggerState enum in saleae.proto
+
+    #: The trigger condition has not been found yet
+    WAITING = 1
+
+    #: The trigger condition has been found, and the data after the trigger is being recorded
+    TRIGGERED = 2
+
+
+#: A point in time within a capture, for the start_time and end_time of exports. A float is the number of seconds since
+#: the start of the capture, the same timebase as exported files. A datetime is an absolute wall clock time, and naive
+#: datetimes are interpreted as local time, like datetime.timestamp().
+ExportTime = Union[float, datetime.datetime]
+
+_UNIX_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
 
 
 @dataclass
@@ -21,6 +58,45 @@ class AnalyzerHandle:
     analyzer_id: int
 
 
+@dataclass
+class AnalyzerConfiguration:
+    """
+    An analyzer to add with add_analyzers(). See add_analyzer() for details on each field.
+    """
+
+    #: The name of the Analyzer, as shown in the Logic 2 application add analyzer list. This must match exactly.
+    name: str
+
+    #: The user editable display string for the analyzer.
+    label: Optional[str] = None
+
+    #: All settings for the analyzer. The keys and values here must exactly match the Analyzer settings as shown in the UI.
+    settings: Optional[Dict[str, Union[str, int, float, bool]]] = None
+
+
+@dataclass
+class HighLevelAnalyzerConfiguration:
+    """
+    A high level analyzer to add with add_analyzers(). See add_high_level_analyzer() for details on each field.
+    """
+
+    #: The directory of the extension that the HLA is in.
+    extension_directory: str
+
+    #: The name of the HLA, as specifiied in the extension.json of the extension.
+    name: str
+
+    #: Analyzer to use as input to this HLA. This is either the AnalyzerHandle of an analyzer that was already added,
+    #: or the index of an AnalyzerConfiguration that appears earlier in the same add_analyzers() call.
+    input_analyzer: Union[AnalyzerHandle, int]
+
+    #: All settings for the analyzer. The keys and values here must match the HLA settings as shown in the HLA class.
+    settings: Optional[Dict[str, Union[str, float]]] = None
+
+    #: The user editable display string for the high level analyzer.
+    label: Optional[str] = None
+
+
 @dataclass
 class DataTableExportConfiguration:
     #: Analyzer to export
@@ -39,6 +115,574 @@ class DataTableFilter:
     query: str
 
 
+@dataclass
+class DigitalDataChunk:
+    """
+    A contiguous block of digital data for a single channel, returned by iter_raw_data().
+
+    Chunks of a single channel are returned in time order, and the end_time of a chunk is the begin_time of the next.
+    """
+
+    #: Digital channel index
+    channel_index: int
+
+    #: State of the channel (0 or 1) at begin_time
+    initial_state: int
+
+    #: Start of the time span covered by this chunk, in seconds
+    begin_time: float
+
+    #: End of the time span covered by this chunk, in seconds
+    end_time: float
+
+    #: Time of every transition within this chunk, in seconds
+    transition_times: Sequence[float]
+
+
+@dataclass
+class AnalogDataChunk:
+    """
+    A contiguous block of analog samples for a single channel, returned by iter_raw_data().
+
+    Chunks of a single channel are returned in time order.
+    """
+
+    #: Analog channel index
+    channel_index: int
+
+    #: Time of the first sample in this chunk, in seconds
+    begin_time: float
+
+    #: Sample rate of the capture, in samples per second, before downsampling
+    sample_rate: int
+
+    #: Downsample ratio applied to the samples
+    downsample: int
+
+    #: Sample values, in volts
+    samples: Sequence[float]
+
+
+RawDataChunk = Union[DigitalDataChunk, AnalogDataChunk]
+
+DataTableValue = Union[str, int, float, bool, bytes, None]
+
+
+@dataclass
+class DataTableRow:
+    """
+    A single row of the analyzer data table, returned by iter_data_table().
+    """
+
+    #: Analyzer that produced this row
+    analyzer: AnalyzerHandle
+
+    #: Frame type
+    type: str
+
+    #: Start time of the frame, in seconds, relative to the start of the capture
+    start_time: float
+
+    #: Duration of the frame, in seconds
+    duration: float
+
+    #: Value of each column, keyed by column name. Empty cells are None.
+    #: Numeric values are returned as strings when a radix was specified with DataTableExportConfiguration.
+    values: Dict[str, DataTableValue]
+
+
+@dataclass
+class CaptureProgress:
+    """
+    A progress update of a running capture, returned by progress().
+    """
+
+    #: Seconds of data recorded so far
+    elapsed_seconds: float
+
+    #: Number of samples recorded so far, summed over all enabled channels
+    samples_captured: int
+
+    #: Number of bytes of the capture buffer in use
+    bytes_captured: int
+
+    #: Size of the capture buffer, in bytes
+    buffer_size_bytes: int
+
+    #: State of the trigger, or None if the capture does not use DigitalTriggerCaptureMode
+    trigger_state: Optional[CaptureTriggerState]
+
+    #: Time of the trigger, in seconds from the start of the capture, or None if the trigger has not been found
+    trigger_time_seconds: Optional[float]
+
+    #: True if the capture has ended. This is always the last update.
+    is_complete: bool
+
+    @property
+    def buffer_fill(self) -> Optional[float]:
+        """
+        Fraction of the capture buffer in use, from 0.0 to 1.0, or None if the buffer size is not known.
+        """
+        if self.buffer_size_bytes == 0:
+            return None
+        return self.bytes_captured / self.buffer_size_bytes
+
+
+@dataclass
+class CaptureSegment:
+    """
+    A segment of a capture in SegmentedCaptureMode that has been saved, returned by iter_segments().
+    """
+
+    #: Index of the segment, starting at 0
+    index: int
+
+    #: Path of the saved .sal file. It can be loaded with Manager.load_capture().
+    filepath: str
+
+    #: Start of the segment, in seconds from the start of the capture
+    begin_time: float
+
+    #: End of the segment, in seconds from the start of the capture
+    end_time: float
+
+    #: Size of the saved file, in bytes
+    size_bytes: int
+
+
+@dataclass
+class RawDataCsvExport:
+    """
+    A raw data CSV export, for use with export_many(). See export_raw_data_csv() for details on each field.
+    """
+
+    #: Directory to create analog.csv and/or digital.csv in
+    directory: str
+
+    #: Analog channels to export
+    analog_channels: Optional[List[int]] = None
+
+    #: Digital channels to export
+    digital_channels: Optional[List[int]] = None
+
+    #: Analog downsample ratio
+    analog_downsample_ratio: int = 1
+
+    #: Use wall clock timestamps, instead of capture relative timestamps
+    iso8601_timestamp: bool = False
+
+    #: Start of the range of time to export, in seconds from the start of the capture, or as a datetime
+    start_time: Optional[ExportTime] = None
+
+    #: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime
+    end_time: Optional[ExportTime] = None
+
+
+@dataclass
+class RawDataBinaryExport:
+    """
+    A raw data binary export, for use with export_many(). See export_raw_data_binary() for details on each field.
+    """
+
+    #: Directory to create the .bin files in
+    directory: str
+
+    #: Analog channels to export
+    analog_channels: Optional[List[int]] = None
+
+    #: Digital channels to export
+    digital_channels: Optional[List[int]] = None
+
+    #: Analog downsample ratio
+    analog_downsample_ratio: int = 1
+
+    #: Start of the range of time to export, in seconds from the start of the capture, or as a datetime
+    start_time: Optional[ExportTime] = None
+
+    #: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime
+    end_time: Optional[ExportTime] = None
+
+
+@dataclass
+class DataTableCsvExport:
+    """
+    An analyzer data table export, for use with export_many(). See export_data_table() for details on each field.
+    """
+
+    #: The output file, including extension
+    filepath: str
+
+    #: Analyzers to include in the export
+    analyzers: List[Union[AnalyzerHandle, DataTableExportConfiguration]]
+
+    #: Columns to include in the export
+    columns: Optional[List[str]] = None
+
+    #: Filter to apply to the exported data
+    filter: Optional[DataTableFilter] = None
+
+    #: Use wall clock timestamps, instead of capture relative timestamps
+    iso8601_timestamp: bool = False
+
+    #: File format to export
+    format: DataTableExportFormat = DataTableExportFormat.CSV
+
+    #: Start of the range of time to export, in seconds from the start of the capture, or as a datetime
+    start_time: Optional[ExportTime] = None
+
+    #: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime
+    end_time: Optional[ExportTime] = None
+
+
+@dataclass
+class LegacyAnalyzerExport:
+    """
+    An analyzer export in the analyzer plugin export format, for use with export_many(). See legacy_export_analyzer().
+    """
+
+    #: The output file, including extension
+    filepath: str
+
+    #: Analyzer to export
+    analyzer: AnalyzerHandle
+
+    #: Display radix
+    radix: RadixType
+
+    #: Start of the range of time to export, in seconds from the start of the capture, or as a datetime
+    start_time: Optional[ExportTime] = None
+
+    #: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime
+    end_time: Optional[ExportTime] = None
+
+
+Export = Union[RawDataCsvExport, RawDataBinaryExport, DataTableCsvExport, LegacyAnalyzerExport]
+
+
+@dataclass
+class ExportResult:
+    """
+    The outcome of a single export of export_many().
+    """
+
+    #: The export this result is for
+    export: Export
+
+    #: The error that the corresponding single export function would have raised, or None if the export succeeded
+    error: Optional[SaleaeError]
+
+    #: Seconds from the start of the request until this export started running, as measured by the Logic 2 software
+    queued_seconds: float
+
+    #: Seconds this export took to run, as measured by the Logic 2 software
+    duration_seconds: float
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        True if the export succeeded.
+        """
+        return self.error is None
+
+
+def _analyzer_settings(settings: Optional[Dict[str, Union[str, int, float, bool]]]) -> 'Dict[str, saleae_pb2.AnalyzerSettingValue]':
+    analyzer_settings = {}
+
+    if settings is not None:
+        for key, value in settings.items():
+            if isinstance(value, bool):
+                v = saleae_pb2.AnalyzerSettingValue(bool_value=value)
+            elif isinstance(value, str):
+                v = saleae_pb2.AnalyzerSettingValue(string_value=value)
+            elif isinstance(value, int):
+                v = saleae_pb2.AnalyzerSettingValue(int64_value=value)
+            elif isinstance(value, float):
+                v = saleae_pb2.AnalyzerSettingValue(double_value=value)
+            else:
+                raise RuntimeError(
+                    "Unsupported analyzer setting value type")
+
+            analyzer_settings[key] = v
+
+    return analyzer_settings
+
+
+def _high_level_analyzer_settings(settings: Optional[Dict[str, Union[str, float]]]) -> 'Dict[str, saleae_pb2.HighLevelAnalyzerSettingValue]':
+    analyzer_settings = {}
+
+    if settings is not None:
+        for key, value in settings.items():
+            if isinstance(value, str):
+                v = saleae_pb2.HighLevelAnalyzerSettingValue(string_value=value)
+            elif isinstance(value, int):
+                v = saleae_pb2.HighLevelAnalyzerSettingValue(number_value=value)
+            else:
+                raise RuntimeError(
+                    "Unsupported high level analyzer setting value type")
+
+            analyzer_settings[key] = v
+
+    return analyzer_settings
+
+
+def _add_analyzer_request(
+    capture_id: int,
+    name: str,
+    *,
+    label: Optional[str],
+    settings: Optional[Dict[str, Union[str, int, float, bool]]],
+) -> 'saleae_pb2.AddAnalyzerRequest':
+    return saleae_pb2.AddAnalyzerRequest(
+        capture_id=capture_id,
+        analyzer_name=name,
+        analyzer_label=label,
+        settings=_analyzer_settings(settings),
+    )
+
+
+def _add_high_level_analyzer_request(
+    capture_id: int,
+    extension_directory: str,
+    name: str,
+    *,
+    input_analyzer: AnalyzerHandle,
+    settings: Optional[Dict[str, Union[str, float]]],
+    label: Optional[str],
+) -> 'saleae_pb2.AddHighLevelAnalyzerRequest':
+    return saleae_pb2.AddHighLevelAnalyzerRequest(
+        capture_id=capture_id,
+        extension_directory=extension_directory,
+        hla_name=name,
+        input_analyzer_id=input_analyzer.analyzer_id,
+        settings=_high_level_analyzer_settings(settings),
+        hla_label=label,
+    )
+
+
+def _add_analyzers_request(
+    capture_id: int,
+    analyzers: List[Union[AnalyzerConfiguration, HighLevelAnalyzerConfiguration]],
+) -> 'saleae_pb2.AddAnalyzersRequest':
+    entries = []
+    for index, a in enumerate(analyzers):
+        if isinstance(a, AnalyzerConfiguration):
+            entries.append(saleae_pb2.AnalyzerBatchEntry(analyzer=saleae_pb2.AnalyzerConfiguration(
+                analyzer_name=a.name,
+                analyzer_label=a.label,
+                settings=_analyzer_settings(a.settings),
+            )))
+        elif isinstance(a, HighLevelAnalyzerConfiguration):
+            entry = saleae_pb2.HighLevelAnalyzerConfiguration(
+                extension_directory=a.extension_directory,
+                hla_name=a.name,
+                hla_label=a.label,
+                settings=_high_level_analyzer_settings(a.settings),
+            )
+            if isinstance(a.input_analyzer, AnalyzerHandle):
+                entry.input_analyzer_id = a.input_analyzer.analyzer_id
+            elif isinstance(a.input_analyzer, int):
+                if not 0 <= a.input_analyzer < index:
+                    raise RuntimeError(
+                        f"input_analyzer index {a.input_analyzer} must refer to an earlier entry in the list")
+                entry.input_analyzer_index = a.input_analyzer
+            else:
+                raise RuntimeError(f"Unexpected type for input_analyzer: {type(a.input_analyzer)}")
+            entries.append(saleae_pb2.AnalyzerBatchEntry(high_level_analyzer=entry))
+        else:
+            raise RuntimeError(f"Unexpected type for analyzer: {type(a)}")
+
+    return saleae_pb2.AddAnalyzersRequest(capture_id=capture_id, analyzers=entries)
+
+
+def _data_table_analyzer_configs(
+        analyzers: List[Union[AnalyzerHandle, DataTableExportConfiguration]]) -> 'List[saleae_pb2.DataTableAnalyzerConfiguration]':
+    analyzer_configs = []
+    for a in analyzers:
+        if isinstance(a, AnalyzerHandle):
+            analyzer_configs.append(saleae_pb2.DataTableAnalyzerConfiguration(analyzer_id=a.analyzer_id))
+        elif isinstance(a, DataTableExportConfiguration):
+            analyzer_configs.append(saleae_pb2.DataTableAnalyzerConfiguration(
+                analyzer_id=a.analyzer.analyzer_id, radix_type=a.radix.value))
+        else:
+            raise RuntimeError(f"Unexpected type for analyzer: {type(a)}")
+
+    return analyzer_configs
+
+
+def _data_table_filter(filter: Optional[DataTableFilter]) -> 'Optional[saleae_pb2.DataTableFilter]':
+    return None if filter is None else saleae_pb2.DataTableFilter(query=filter.query, columns=filter.columns)
+
+
+def _logic_channels(analog_channels: Optional[List[int]], digital_channels: Optional[List[int]]) -> 'saleae_pb2.LogicChannels':
+    return saleae_pb2.LogicChannels(
+        analog_channels=[] if analog_channels is None else analog_channels,
+        digital_channels=[] if digital_channels is None else digital_channels,
+    )
+
+
+def _capture_time(time: ExportTime) -> 'saleae_pb2.CaptureTime':
+    if isinstance(time, datetime.datetime):
+        if time.tzinfo is None:
+            time = time.astimezone()
+        delta = time - _UNIX_EPOCH
+        seconds = delta.days * 86400 + delta.seconds
+        return saleae_pb2.CaptureTime(absolute_time_ns=seconds * 1_000_000_000 + delta.microseconds * 1000)
+    return saleae_pb2.CaptureTime(relative_seconds=time)
+
+
+def _time_range(start_time: Optional[ExportTime], end_time: Optional[ExportTime]) -> Optional['saleae_pb2.TimeRange']:
+    if start_time is None and end_time is None:
+        return None
+    return saleae_pb2.TimeRange(
+        start=_capture_time(start_time) if start_time is not None else None,
+        end=_capture_time(end_time) if end_time is not None else None,
+    )
+
+
+def _raw_data_chunk_from_reply(reply: 'saleae_pb2.StreamRawDataReply') -> RawDataChunk:
+    if reply.HasField('digital_chunk'):
+        chunk = reply.digital_chunk
+        return DigitalDataChunk(
+            channel_index=chunk.channel_index,
+            initial_state=chunk.initial_state,
+            begin_time=chunk.begin_time,
+            end_time=chunk.end_time,
+            transition_times=chunk.transition_times,
+        )
+    elif reply.HasField('analog_chunk'):
+        chunk = reply.analog_chunk
+        return AnalogDataChunk(
+            channel_index=chunk.channel_index,
+            begin_time=chunk.begin_time,
+            sample_rate=chunk.sample_rate,
+            downsample=chunk.downsample,
+            samples=chunk.samples,
+        )
+    else:
+        raise RuntimeError("Unexpected raw data chunk type")
+
+
+def _export_many_request(capture_id: int, exports: List[Export],
+                         max_parallel_exports: Optional[int]) -> 'saleae_pb2.ExportManyRequest':
+    entries = []
+    for export in exports:
+        if isinstance(export, RawDataCsvExport):
+            entries.append(saleae_pb2.ExportManyEntry(raw_data_csv=saleae_pb2.ExportRawDataCsvRequest(
+                directory=export.directory,
+                logic_channels=_logic_channels(export.analog_channels, export.digital_channels),
+                analog_downsample_ratio=export.analog_downsample_ratio,
+                iso8601_timestamp=export.iso8601_timestamp,
+                time_range=_time_range(export.start_time, export.end_time),
+            )))
+        elif isinstance(export, RawDataBinaryExport):
+            entries.append(saleae_pb2.ExportManyEntry(raw_data_binary=saleae_pb2.ExportRawDataBinaryRequest(
+                directory=export.directory,
+                logic_channels=_logic_channels(export.analog_channels, export.digital_channels),
+                analog_downsample_ratio=export.analog_downsample_ratio,
+                time_range=_time_range(export.start_time, export.end_time),
+            )))
+        elif isinstance(export, DataTableCsvExport):
+            entries.append(saleae_pb2.ExportManyEntry(data_table_csv=saleae_pb2.ExportDataTableCsvRequest(
+                filepath=export.filepath,
+                analyzers=_data_table_analyzer_configs(export.analyzers),
+                export_columns=export.columns,
+                filter=_data_table_filter(export.filter),
+                iso8601_timestamp=export.iso8601_timestamp,
+                format=export.format.value,
+                time_range=_time_range(export.start_time, export.end_time),
+            )))
+        elif isinstance(export, LegacyAnalyzerExport):
+            entries.append(saleae_pb2.ExportManyEntry(legacy_analyzer=saleae_pb2.LegacyExportAnalyzerRequest(
+                filepath=export.filepath,
+                analyzer_id=export.analyzer.analyzer_id,
+                radix_type=export.radix.value,
+                time_range=_time_range(export.start_time, export.end_time),
+            )))
+        else:
+            raise TypeError(f"Unexpected export type: {type(export)}")
+
+    return saleae_pb2.ExportManyRequest(
+        capture_id=capture_id,
+        exports=entries,
+        max_parallel_exports=max_parallel_exports,
+    )
+
+
+def _export_results_from_reply(exports: List[Export], reply: 'saleae_pb2.ExportManyReply') -> List[ExportResult]:
+    return [
+        ExportResult(
+            export=export,
+            error=_error_code_to_exception(result.error_code, result.error_message) if result.error_code != 0 else None,
+            queued_seconds=result.queued_seconds,
+            duration_seconds=result.duration_seconds,
+        )
+        for export, result in zip(exports, reply.results)
+    ]
+
+
+def _capture_progress_from_reply(reply: 'saleae_pb2.StreamCaptureProgressReply') -> CaptureProgress:
+    progress = reply.progress
+    trigger_state = CaptureTriggerState(progress.trigger_state) if progress.trigger_state != 0 else None
+    return CaptureProgress(
+        elapsed_seconds=progress.elapsed_seconds,
+        samples_captured=progress.samples_captured,
+        bytes_captured=progress.bytes_captured,
+        buffer_size_bytes=progress.buffer_size_bytes,
+        trigger_state=trigger_state,
+        trigger_time_seconds=progress.trigger_time_seconds if trigger_state == CaptureTriggerState.TRIGGERED else None,
+        is_complete=progress.is_complete,
+    )
+
+
+def _capture_segment_from_reply(reply: 'saleae_pb2.StreamCaptureSegmentsReply') -> CaptureSegment:
+    segment = reply.segment
+    return CaptureSegment(
+        index=segment.index,
+        filepath=segment.filepath,
+        begin_time=segment.begin_time,
+        end_time=segment.end_time,
+        size_bytes=segment.size_bytes,
+    )
+
+
+def _data_table_value(value: 'saleae_pb2.DataTableValue') -> DataTableValue:
+    kind = value.WhichOneof('value')
+    return None if kind is None else getattr(value, kind)
+
+
+def _data_table_rows(reply: 'saleae_pb2.StreamDataTableReply', column_names: List[str]) -> Iterator[DataTableRow]:
+    # Column names are only sent in the first reply of a stream, so `column_names` is carried between calls
+    if reply.columns:
+        column_names[:] = reply.columns
+
+    for row in reply.rows:
+        yield DataTableRow(
+            analyzer=AnalyzerHandle(analyzer_id=row.analyzer_id),
+            type=row.type,
+            start_time=row.start_time,
+            duration=row.duration,
+            values={column: _data_table_value(value) for column, value in zip(column_names, row.values)},
+        )
+
+
+def _uses_capture(method):
+    """
+    Mark the capture as in use while `method` runs, or while its results are streamed, so that the Manager does not
+    close it to stay within its capture budget.
+    """
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._in_use():
+                yield from method(self, *args, **kwargs)
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._in_use():
+                return method(self, *args, **kwargs)
+    return wrapper
+
+
 class Capture:
     """
     This class represents a single capture in the Logic 2 software.
@@ -55,8 +699,47 @@ class Capture:
         This class cannot be constructed by the user, and is only returned from the Manager class.
         """
         self.manager = manager
-        self.capture_id = capture_id
+        self._capture_id = capture_id
+
+        # Set if this capture is shared by several load_capture() calls, see Manager.load_capture()
+        self._loaded_capture_key = None
+        self._loaded_capture_released = False
+
+        # Set once the Manager has closed this capture, see Manager.enforce_capture_budget() and Manager.close_all()
+        self._closed_message: Optional[str] = None
+
+        #: If the Manager closed this capture to stay within its capture budget, the file it was saved to first
+        self.evicted_filepath: Optional[str] = None
+
+    @property
+    def capture_id(self) -> int:
+        """
+        Id of the capture in the Logic 2 software. Using the capture marks it as recently used, see
+        Manager.enforce_capture_budget()
+        """
+        if self._closed_message is not None:
+            raise RuntimeError(self._closed_message)
+        self.manager._touch_capture(self._capture_id)
+        return self._capture_id
+
+    @contextmanager
+    def _in_use(self):
+        if self._closed_message is not None:
+            raise RuntimeError(self._closed_message)
+        self.manager._acquire_capture(self._capture_id)
+        try:
+            yield
+        finally:
+            self.manager._release_capture(self._capture_id)
+
+    def _closed(self, message: str, saved_filepath: Optional[str]):
+        """
+        Called by the Manager once it has closed this capture.
+        """
+        self._closed_message = message
+        self.evicted_filepath = saved_filepath
 
+    @_uses_capture
     def add_analyzer(
         self,
         name: str,
@@ -73,36 +756,14 @@ class Capture:
         :param settings: All settings for the analyzer. The keys and values here must exactly match the Analyzer settings as shown in the UI, defaults to None
         :return: Returns an AnalyzerHandle
         """
-        analyzer_settings = {}
-
-        if settings is not None:
-            for key, value in settings.items():
-                if isinstance(value, bool):
-                    v = saleae_pb2.AnalyzerSettingValue(bool_value=value)
-                elif isinstance(value, str):
-                    v = saleae_pb2.AnalyzerSettingValue(string_value=value)
-                elif isinstance(value, int):
-                    v = saleae_pb2.AnalyzerSettingValue(int64_value=value)
-                elif isinstance(value, float):
-                    v = saleae_pb2.AnalyzerSettingValue(double_value=value)
-                else:
-                    raise RuntimeError(
-                        "Unsupported analyzer setting value type")
-
-                analyzer_settings[key] = v
-
-        request = saleae_pb2.AddAnalyzerRequest(
-            capture_id=self.capture_id,
-            analyzer_name=name,
-            analyzer_label=label,
-            settings=analyzer_settings,
-        )
+        request = _add_analyzer_request(self.capture_id, name, label=label, settings=settings)
 
         with _error_handler():
             reply = self.manager.stub.AddAnalyzer(request)
 
         return AnalyzerHandle(analyzer_id=reply.analyzer_id)
 
+    @_uses_capture
     def add_high_level_analyzer(
         self,
         extension_directory: str,
@@ -123,34 +784,40 @@ class Capture:
         :param label: The user editable display string for the high level analyzer. This will be shown in the analyzer data table export.
         :return: Returns an AnalyzerHandle
         """
-        analyzer_settings = {}
+        request = _add_high_level_analyzer_request(
+            self.capture_id, extension_directory, name, input_analyzer=input_analyzer, settings=settings, label=label)
 
-        if settings is not None:
-            for key, value in settings.items():
-                if isinstance(value, str):
-                    v = saleae_pb2.HighLevelAnalyzerSettingValue(string_value=value)
-                elif isinstance(value, int):
-                    v = saleae_pb2.HighLevelAnalyzerSettingValue(number_value=value)
-                else:
-                    raise RuntimeError(
-                        "Unsupported high level analyzer setting value type")
+        with _error_handler():
+            reply = self.manager.stub.AddHighLevelAnalyzer(request)
 
-                analyzer_settings[key] = v
+        return AnalyzerHandle(analyzer_id=reply.analyzer_id)
 
-        request = saleae_pb2.AddHighLevelAnalyzerRequest(
-            capture_id=self.capture_id,
-            extension_directory=extension_directory,
-            hla_name=name,
-            input_analyzer_id=input_analyzer.analyzer_id,
-            settings=analyzer_settings,
-            hla_label=label,
-        )
+    @_uses_capture
+    def add_analyzers(
+        self,
+        analyzers: List[Union[AnalyzerConfiguration, HighLevelAnalyzerConfiguration]],
+    ) -> List[AnalyzerHandle]:
+        """Add several analyzers and high level analyzers to the capture in a single request.
+
+        This is equivalent to calling add_analyzer() and add_high_level_analyzer() for each entry, but requires a single
+        round trip, and lets the Logic 2 software schedule the decoding of all analyzers together.
+
+        A high level analyzer can use an analyzer from the same call as its input, by setting its input_analyzer to
+        the index of that AnalyzerConfiguration in the list.
+
+        If any of the analyzers are invalid, none of them are added.
+
+        :param analyzers: AnalyzerConfiguration and HighLevelAnalyzerConfiguration objects describing the analyzers to add.
+        :return: Returns an AnalyzerHandle for each entry, in the same order as `analyzers`
+        """
+        request = _add_analyzers_request(self.capture_id, analyzers)
 
         with _error_handler():
-            reply = self.manager.stub.AddHighLevelAnalyzer(request)
+            reply = self.manager.stub.AddAnalyzers(request)
 
-        return AnalyzerHandle(analyzer_id=reply.analyzer_id)
+        return [AnalyzerHandle(analyzer_id=analyzer_id) for analyzer_id in reply.analyzer_ids]
 
+    @_uses_capture
     def remove_analyzer(self, analyzer: AnalyzerHandle):
         """
         Removes an analyzer from the capture.
@@ -163,6 +830,7 @@ class Capture:
         with _error_handler():
             self.manager.stub.RemoveAnalyzer(request)
 
+    @_uses_capture
     def remove_high_level_analyzer(self, high_level_analyzer: AnalyzerHandle):
         """
         Removes a high level analyzer from the capture.
@@ -175,6 +843,7 @@ class Capture:
         with _error_handler():
             self.manager.stub.RemoveHighLevelAnalyzer(request)
 
+    @_uses_capture
     def save_capture(self, filepath: str):
         """
         Saves the capture to a .sal file, which can be loaded later either through the UI or with the load_capture() function.
@@ -188,8 +857,10 @@ class Capture:
         with _error_handler():
             self.manager.stub.SaveCapture(request)
 
+    @_uses_capture
     def legacy_export_analyzer(
-        self, filepath: str, analyzer: AnalyzerHandle, radix: RadixType
+        self, filepath: str, analyzer: AnalyzerHandle, radix: RadixType, *,
+        start_time: Optional[ExportTime] = None, end_time: Optional[ExportTime] = None,
     ):
         """
         Exports the specified analyzer using the analyzer plugin export format, and not the data table format.
@@ -199,17 +870,21 @@ class Capture:
         :param filepath: file name and path to export to. Should include the file name and extension, typically .csv or .txt.
         :param analyzer: AnalyzerHandle returned from add_analyzer()
         :param radix: Display Radix, from the RadixType enumeration.
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
         """
         request = saleae_pb2.LegacyExportAnalyzerRequest(
             capture_id=self.capture_id,
             filepath=filepath,
             analyzer_id=analyzer.analyzer_id,
             radix_type=radix.value,
+            time_range=_time_range(start_time, end_time),
         )
 
         with _error_handler():
             self.manager.stub.LegacyExportAnalyzer(request)
 
+    @_uses_capture
     def export_data_table(
         self,
         filepath: str,
@@ -218,42 +893,102 @@ class Capture:
         columns: Optional[List[str]] = None,
         filter: Optional[DataTableFilter] = None,
         iso8601_timestamp: bool = False,
+        format: DataTableExportFormat = DataTableExportFormat.CSV,
+        start_time: Optional[ExportTime] = None,
+        end_time: Optional[ExportTime] = None,
     ):
         """
         Exports the Analyzer Data Table
 
         We will be adding more options to this in the future, including the query string, specific columns, specific query columns, and more.
 
-        :param filepath: The specified output file, including extension, .csv.
+        The ARROW_IPC and PARQUET formats store each column with its own type, so numeric values are stored as numbers
+        instead of being formatted with the radix of each analyzer. They are much smaller and faster to load than CSV
+        for large tables, see saleae.automation.data_table.read_data_table().
+
+        :param filepath: The specified output file, including extension, .csv, .arrow or .parquet.
         :param analyzers: A list of AnalyzerHandles that should be included in the export, returned from add_analyzer()
         :param columns: Columns to include in export.
         :param filter: Filter to apply to the exported data.
         :param iso8601_timestamp: Use this to output wall clock timestamps, instead of capture relative timestamps. Defaults to False.
+        :param format: File format to export. Defaults to CSV.
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
         """
-        analyzer_configs = []
-        for a in analyzers:
-            if isinstance(a, AnalyzerHandle):
-                analyzer_configs.append(saleae_pb2.DataTableAnalyzerConfiguration(analyzer_id=a.analyzer_id))
-            elif isinstance(a, DataTableExportConfiguration):
-                analyzer_configs.append(saleae_pb2.DataTableAnalyzerConfiguration(
-                    analyzer_id=a.analyzer.analyzer_id, radix_type=a.radix.value))
-            else:
-                raise RuntimeError(f"Unexpected type for analyzer: {type(a)}")
-
-        pb_filter = None if filter is None else saleae_pb2.DataTableFilter(query=filter.query, columns=filter.columns)
-
         request = saleae_pb2.ExportDataTableCsvRequest(
             capture_id=self.capture_id,
             filepath=filepath,
-            analyzers=analyzer_configs,
+            analyzers=_data_table_analyzer_configs(analyzers),
             export_columns=columns,
-            filter=pb_filter,
+            filter=_data_table_filter(filter),
             iso8601_timestamp=iso8601_timestamp,
+            format=format.value,
+            time_range=_time_range(start_time, end_time),
         )
 
         with _error_handler():
             self.manager.stub.ExportDataTableCsv(request)
 
+    @_uses_capture
+    def export_many(self, exports: List[Export], *, max_parallel_exports: Optional[int] = None) -> List[ExportResult]:
+        """
+        Runs several exports in a single request. The Logic 2 software runs them in parallel, which is usually much
+        faster than calling the individual export functions one after another.
+
+        Exports are independent: if one fails, the others still run. Failures are not raised. Instead, the error that the
+        single export function would have raised is set on the ExportResult.
+
+        :param exports: RawDataCsvExport, RawDataBinaryExport, DataTableCsvExport and LegacyAnalyzerExport objects, in any combination.
+        :param max_parallel_exports: Maximum number of exports to run at the same time. If unspecified, the Logic 2 software will choose.
+        :return: The result of each export, in the same order as `exports`.
+        """
+        request = _export_many_request(self.capture_id, exports, max_parallel_exports)
+
+        with _error_handler():
+            reply: saleae_pb2.ExportManyReply = self.manager.stub.ExportMany(request)
+
+        return _export_results_from_reply(exports, reply)
+
+    @_uses_capture
+    def iter_data_table(
+        self,
+        analyzers: List[Union[AnalyzerHandle, DataTableExportConfiguration]],
+        *,
+        columns: Optional[List[str]] = None,
+        filter: Optional[DataTableFilter] = None,
+        max_rows_per_reply: Optional[int] = None,
+    ) -> Iterator[DataTableRow]:
+        """
+        Streams the Analyzer Data Table, without writing a CSV file.
+
+        This returns the same rows as export_data_table(), as DataTableRow objects with typed values. Rows are yielded
+        as they are received, in time order.
+
+        Stopping iteration early cancels the stream.
+
+        :param analyzers: A list of AnalyzerHandles that should be included, returned from add_analyzer()
+        :param columns: Columns to include.
+        :param filter: Filter to apply to the data.
+        :param max_rows_per_reply: maximum number of rows received per gRPC message. If unspecified, the Logic 2 software will choose.
+        """
+        request = saleae_pb2.StreamDataTableRequest(
+            capture_id=self.capture_id,
+            analyzers=_data_table_analyzer_configs(analyzers),
+            export_columns=columns,
+            filter=_data_table_filter(filter),
+            max_rows_per_reply=max_rows_per_reply,
+        )
+
+        replies = self.manager.stub.StreamDataTable(request)
+        try:
+            column_names: List[str] = []
+            with _error_handler():
+                for reply in replies:
+                    yield from _data_table_rows(reply, column_names)
+        finally:
+            replies.cancel()
+
+    @_uses_capture
     def export_raw_data_csv(
         self,
         directory: str,
@@ -262,6 +997,8 @@ class Capture:
         digital_channels: Optional[List[int]] = None,
         analog_downsample_ratio: int = 1,
         iso8601_timestamp: bool = False,
+        start_time: Optional[ExportTime] = None,
+        end_time: Optional[ExportTime] = None,
     ):
         """Exports raw data to CSV file(s)
 
@@ -280,11 +1017,10 @@ class Capture:
         :param digital_channels: list of digital channels to export, defaults to None
         :param analog_downsample_ratio: optional analog downsample ratio, useful to help reduce export file sizes where extra analog resolution isn't needed, defaults to 1
         :param iso8601_timestamp: Use this to output wall clock timestamps, instead of capture relative timestamps. Defaults to False.
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
         """
-        channels = saleae_pb2.LogicChannels(
-            analog_channels=[] if analog_channels is None else analog_channels,
-            digital_channels=[] if digital_channels is None else digital_channels,
-        )
+        channels = _logic_channels(analog_channels, digital_channels)
 
         request = saleae_pb2.ExportRawDataCsvRequest(
             capture_id=self.capture_id,
@@ -292,11 +1028,13 @@ class Capture:
             logic_channels=channels,
             analog_downsample_ratio=analog_downsample_ratio,
             iso8601_timestamp=iso8601_timestamp,
+            time_range=_time_range(start_time, end_time),
         )
 
         with _error_handler():
             self.manager.stub.ExportRawDataCsv(request)
 
+    @_uses_capture
     def export_raw_data_binary(
         self,
         directory: str,
@@ -304,6 +1042,8 @@ class Capture:
         analog_channels: Optional[List[int]] = None,
         digital_channels: Optional[List[int]] = None,
         analog_downsample_ratio: int = 1,
+        start_time: Optional[ExportTime] = None,
+        end_time: Optional[ExportTime] = None,
     ):
         """
         Exports raw data to binary files
@@ -322,29 +1062,137 @@ class Capture:
         :param analog_channels: list of analog channels to export, defaults to None
         :param digital_channels: list of digital channels to export, defaults to None
         :param analog_downsample_ratio: optional analog downsample ratio, useful to help reduce export file sizes where extra analog resolution isn't needed, defaults to 1
+        :param start_time: Start of the range of time to export, in seconds from the start of the capture, or as a datetime. Defaults to the start of the capture.
+        :param end_time: End of the range of time to export (exclusive), in seconds from the start of the capture, or as a datetime. Defaults to the end of the capture.
         """
-        channels = saleae_pb2.LogicChannels(
-            analog_channels=[] if analog_channels is None else analog_channels,
-            digital_channels=[] if digital_channels is None else digital_channels,
-        )
+        channels = _logic_channels(analog_channels, digital_channels)
 
         request = saleae_pb2.ExportRawDataBinaryRequest(
             capture_id=self.capture_id,
             directory=directory,
             logic_channels=channels,
             analog_downsample_ratio=analog_downsample_ratio,
+            time_range=_time_range(start_time, end_time),
         )
 
         with _error_handler():
             self.manager.stub.ExportRawDataBinary(request)
 
+    @_uses_capture
+    def iter_raw_data(
+        self,
+        *,
+        analog_channels: Optional[List[int]] = None,
+        digital_channels: Optional[List[int]] = None,
+        analog_downsample_ratio: int = 1,
+        max_chunk_size: Optional[int] = None,
+    ) -> Iterator[RawDataChunk]:
+        """
+        Streams raw data from the capture, without writing any files.
+
+        This returns the same data as export_raw_data_binary(), split into DigitalDataChunk and AnalogDataChunk objects.
+        Chunks are yielded as they are received, so processing can begin before the whole capture has been transferred.
+        Chunks from different channels may be interleaved, but the chunks of a single channel are always in time order.
+
+        If no channels are specified, all channels will be streamed.
+
+        Stopping iteration early cancels the stream.
+
+        :param analog_channels: list of analog channels to stream, defaults to None
+        :param digital_channels: list of digital channels to stream, defaults to None
+        :param analog_downsample_ratio: optional analog downsample ratio, defaults to 1
+        :param max_chunk_size: maximum number of transitions or samples in a single chunk. If unspecified, the Logic 2 software will choose.
+        """
+        request = saleae_pb2.StreamRawDataRequest(
+            capture_id=self.capture_id,
+            logic_channels=_logic_channels(analog_channels, digital_channels),
+            analog_downsample_ratio=analog_downsample_ratio,
+            max_chunk_size=max_chunk_size,
+        )
+
+        replies = self.manager.stub.StreamRawData(request)
+        try:
+            with _error_handler():
+                for reply in replies:
+                    yield _raw_data_chunk_from_reply(reply)
+        finally:
+            replies.cancel()
+
+    @_uses_capture
+    def progress(self, interval_seconds: Optional[float] = None) -> Iterator[CaptureProgress]:
+        """
+        Streams progress updates of the capture while it is recording: the elapsed time, the number of samples and bytes
+        captured, how full the capture buffer is, and the trigger state.
+
+        Iteration ends after an update with `is_complete` set, once the capture has ended. If the capture ended with an
+        error, for example OutOfMemoryError, that error is raised instead. A capture that has already ended, including
+        a loaded capture, yields a single update.
+
+        This can be used alongside stop() or wait() from another thread, for example to stop a capture before its
+        buffer is full. Stopping iteration early cancels the stream, but not the capture.
+
+        :param interval_seconds: Interval between updates, in seconds. If unspecified, the Logic 2 software will choose.
+        """
+        request = saleae_pb2.StreamCaptureProgressRequest(
+            capture_id=self.capture_id,
+            interval_seconds=interval_seconds,
+        )
+
+        replies = self.manager.stub.StreamCaptureProgress(request)
+        try:
+            with _error_handler():
+                for reply in replies:
+                    progress = _capture_progress_from_reply(reply)
+                    self.manager._update_capture(self._capture_id, memory_bytes=progress.bytes_captured,
+                                                 is_recording=False if progress.is_complete else None)
+                    yield progress
+        finally:
+            replies.cancel()
+
+    @_uses_capture
+    def iter_segments(self) -> Iterator[CaptureSegment]:
+        """
+        Yields each segment of a capture in SegmentedCaptureMode, in order, once it has been saved to disk.
+
+        Segments that were saved before this is called are yielded first. Iteration ends after the last segment, once
+        the capture has been stopped, or has recorded max_segments. If the capture ended with an error, that error is
+        raised instead.
+
+        To end a capture that runs until it is stopped, call stop() from another thread, or break out of the loop and
+        then call stop(). Stopping iteration early cancels the stream, but not the capture.
+        """
+        request = saleae_pb2.StreamCaptureSegmentsRequest(capture_id=self.capture_id)
+
+        replies = self.manager.stub.StreamCaptureSegments(request)
+        try:
+            with _error_handler():
+                for reply in replies:
+                    yield _capture_segment_from_reply(reply)
+        finally:
+            replies.cancel()
+
     def close(self):
         """
         Closes the capture. Once called, do not use this instance.
+
+        If the capture is shared by several calls to Manager.load_capture(), it is only closed once every Capture
+        returned by them has been closed.
         """
+        if self._closed_message is not None:
+            return
+
+        if self._loaded_capture_key is not None:
+            # Closing a shared capture twice must not release the references of the other Capture objects
+            if self._loaded_capture_released:
+                return
+            self._loaded_capture_released = True
+            if not self.manager._release_loaded_capture(self._loaded_capture_key):
+                return
+
         request = saleae_pb2.CloseCaptureRequest(capture_id=self.capture_id)
         with _error_handler():
             self.manager.stub.CloseCapture(request)
+        self.manager._untrack_capture(self._capture_id)
 
     def stop(self):
         """
@@ -361,10 +1209,13 @@ class Capture:
         Be sure to catch DeviceError exceptions raised by this function, and handle them accordingly. See the error section of the library documentation.
         """
         request = saleae_pb2.StopCaptureRequest(capture_id=self.capture_id)
-        with _error_handler():
-            self.manager.stub.StopCapture(request)
+        try:
+            with _error_handler():
+                self.manager.stub.StopCapture(request)
+        finally:
+            self.manager._update_capture(self._capture_id, is_recording=False)
 
-    def wait(self):
+    def wait(self, timeout: Optional[float] = None):
         """
         Waits for the capture to complete. This should only be used with TimedCaptureMode or DigitalTriggerCaptureMode.
 
@@ -374,15 +1225,76 @@ class Capture:
 
         stop() and wait() should never both be used for a single capture.
 
-        Do not call wait() more than once.
+        Do not call wait() more than once, unless it raised WaitTimeoutError.
 
         wait() should never be called for loaded captures.
 
         Be sure to catch DeviceError exceptions raised by this function, and handle them accordingly. See the error section of the library documentation.
+
+        :param timeout: Maximum number of seconds to wait. If the capture has not completed by then, WaitTimeoutError is
+                        raised, and the capture keeps recording. If not specified, waits indefinitely.
         """
         request = saleae_pb2.WaitCaptureRequest(capture_id=self.capture_id)
-        with _error_handler():
-            self.manager.stub.WaitCapture(request)
+        with _wait_error_handler(timeout):
+            self.manager.stub.WaitCapture(request, timeout=timeout)
+        self.manager._update_capture(self._capture_id, is_recording=False)
+
+    def wait_future(self, timeout: Optional[float] = None) -> 'Future[None]':
+        """
+        Like wait(), but returns immediately with a Future that completes when the capture completes.
+
+        This makes it possible to supervise many captures from a single thread, for example with
+        concurrent.futures.wait() or as_completed(). Errors that wait() would raise, including WaitTimeoutError, are set
+        as the exception of the Future. Cancelling the Future cancels the wait, but not the capture.
+
+        :param timeout: See wait()
+        :return: A Future with a result of None once the capture has completed.
+        """
+        request = saleae_pb2.WaitCaptureRequest(capture_id=self.capture_id)
+        future: 'Future[None]' = Future()
+        call = self.manager.stub.WaitCapture.future(request, timeout=timeout)
+
+        def on_call_done(call):
+            if call.cancelled():
+                future.cancel()
+                return
+            exc = call.exception()
+            if not future.set_running_or_notify_cancel():
+                return
+            if exc is None:
+                self.manager._update_capture(self._capture_id, is_recording=False)
+                future.set_result(None)
+            else:
+                future.set_exception(_wait_error_to_exception(exc, timeout))
+
+        def on_future_done(future):
+            if future.cancelled():
+                call.cancel()
+
+        future.add_done_callback(on_future_done)
+        call.add_done_callback(on_call_done)
+        return future
+
+    def add_done_callback(self, fn: Callable[['Capture', Optional[Exception]], None], *,
+                          timeout: Optional[float] = None) -> 'Future[None]':
+        """
+        Call `fn(capture, error)` once the capture completes, without blocking. See wait_future()
+
+        `error` is None if the capture completed successfully, or the exception that wait() would have raised.
+        `fn` is called on a gRPC thread, so it should return quickly, e.g. by handing the capture to a queue.
+
+        :param fn: Function to call.
+        :param timeout: See wait()
+        :return: The Future returned by wait_future(). Cancel it to stop waiting, in which case `fn` is not called.
+        """
+        future = self.wait_future(timeout=timeout)
+
+        def on_done(future: 'Future[None]'):
+            if not future.cancelled():
+                fn(self, future.exception())
+
+        future.add_done_callback(on_done)
+        return future
 
     def __enter__(self):
         return self
@@ -0,0 +1,110 @@
+from .capture import Capture
+from .errors import _error_handler, _wait_error_handler
+
+import saleae.automation
+from ._lazy import saleae_pb2
+
+from typing import Callable, ContextManager, Iterator, List, Optional
+
+
+def _call_all(captures: List[Capture], method: Callable, make_request: Callable[[int], object],
+              error_handler: Callable[[], ContextManager] = _error_handler, timeout: Optional[float] = None):
+    """
+    Issue a unary request for every capture without waiting in between, then wait for all of them to complete.
+
+    If any of the requests fail, the first error (in capture order) is raised once all requests have completed.
+    """
+    futures = [method.future(make_request(capture.capture_id), timeout=timeout) for capture in captures]
+
+    first_error = None
+    for future in futures:
+        try:
+            with error_handler():
+                future.result()
+        except Exception as exc:
+            if first_error is None:
+                first_error = exc
+
+    if first_error is not None:
+        raise first_error
+
+
+class CaptureGroup:
+    """
+    This class represents a set of captures that were started together with Manager.start_capture_group().
+
+    The wait(), stop() and close() functions act on every capture in the group at once. The individual Capture objects
+    can be accessed through the `captures` list, or by iterating over the group, in the same order as the devices passed
+    to start_capture_group().
+    """
+
+    def __init__(self, manager: 'saleae.automation.Manager', device_ids: List[str], captures: List[Capture],
+                 start_offsets_seconds: List[float]):
+        """
+        This class cannot be constructed by the user, and is only returned from the Manager class.
+        """
+        self.manager = manager
+
+        #: Id of the device used for each capture
+        self.device_ids = device_ids
+
+        #: Captures, in the order the devices were specified
+        self.captures = captures
+
+        #: For each capture, the time in seconds between the first StartCapture reply in the group and this capture's reply.
+        #: This is measured by the client, and includes any jitter in the connection to the Logic 2 software.
+        self.start_offsets_seconds = start_offsets_seconds
+
+    def __iter__(self) -> Iterator[Capture]:
+        return iter(self.captures)
+
+    def __len__(self) -> int:
+        return len(self.captures)
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        Waits for every capture in the group to complete. See Capture.wait()
+
+        The captures are waited on concurrently. If any capture raises an error, the first error is raised once all
+        captures have completed.
+
+        :param timeout: See Capture.wait(). The timeout applies to each capture, and they are all waited on at once.
+        """
+        _call_all(self.captures, self.manager.stub.WaitCapture,
+                  lambda capture_id: saleae_pb2.WaitCaptureRequest(capture_id=capture_id),
+                  error_handler=lambda: _wait_error_handler(timeout), timeout=timeout)
+        self._update_captures(is_recording=False)
+
+    def stop(self):
+        """
+        Stops every capture in the group. See Capture.stop()
+
+        The stop requests are sent without waiting for each other, so the captures stop as close together as possible.
+        If any capture raises an error, the first error is raised once all captures have stopped.
+        """
+        try:
+            _call_all(self.captures, self.manager.stub.StopCapture,
+                      lambda capture_id: saleae_pb2.StopCaptureRequest(capture_id=capture_id))
+        finally:
+            self._update_captures(is_recording=False)
+
+    def close(self):
+        """
+        Closes every capture in the group. Once called, do not use this instance or its captures.
+        """
+        try:
+            _call_all(self.captures, self.manager.stub.CloseCapture,
+                      lambda capture_id: saleae_pb2.CloseCaptureRequest(capture_id=capture_id))
+        finally:
+            for capture in self.captures:
+                self.manager._untrack_capture(capture._capture_id)
+
+    def _update_captures(self, *, is_recording: bool):
+        for capture in self.captures:
+            self.manager._update_capture(capture._capture_id, is_recording=is_recording)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,202 @@
+"""
+Readers for the digital.csv and analog.csv files produced by Capture.export_raw_data_csv().
+
+Parsing these files row by row with the csv module is slow, since every value becomes a Python object. Instead, rows are
+read in chunks of a fixed number of rows, and each chunk is parsed into NumPy arrays at once. Only one chunk is held in
+memory at a time, so even multi-gigabyte exports can be processed with bounded memory usage.
+
+    for chunk in csv_export.iter_raw_data_csv('export/digital.csv'):
+        rising_edges = chunk.times[1:][np.diff(chunk.values['Channel 0'].astype(np.int8)) > 0]
+
+Times are float64 seconds from the start of the capture. If the export was made with `iso8601_timestamp=True`, times are
+int64 nanoseconds since the Unix epoch (UTC) instead, which can be viewed as `datetime64[ns]` with
+`chunk.times.view('datetime64[ns]')`.
+
+If the full export is needed at once, and can be processed with the binary reader, prefer
+Capture.export_raw_data_binary() and the binary_export module, which avoid parsing text entirely.
+
+This module requires NumPy, which is not installed by default: `pip install logic2-automation[numpy]`
+"""
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+import os
+
+import numpy as np
+
+#: Default number of rows in each chunk returned by iter_raw_data_csv()
+DEFAULT_CSV_CHUNK_ROWS = 1_000_000
+
+_NS_PER_SECOND = 1_000_000_000
+
+
+@dataclass
+class RawDataCsvChunk:
+    """
+    Consecutive rows of a digital.csv or analog.csv file.
+    """
+
+    #: Index of the first row of the chunk in the file, not counting the header
+    start_row: int
+
+    #: True if the times are ISO8601 timestamps, i.e. the export was made with `iso8601_timestamp=True`
+    iso8601_timestamp: bool
+
+    #: Time of each row: float64 seconds from the start of the capture, or int64 nanoseconds since the Unix epoch (UTC)
+    #: if iso8601_timestamp is set
+    times: np.ndarray = field(repr=False)
+
+    #: Values of each channel, keyed by the column name in the header, e.g. "Channel 0". Digital values are uint8 (0 or
+    #: 1), and analog values are float32 voltages.
+    values: Dict[str, np.ndarray] = field(repr=False)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.times)
+
+
+def _is_digital(filepath: str) -> bool:
+    return os.path.basename(filepath).lower().startswith('digital')
+
+
+def _parse_values(data: bytes, num_rows: int, num_columns: int, filepath: str) -> np.ndarray:
+    """
+    Parse comma and newline separated numbers into a (num_rows, num_columns) float64 array.
+    """
+    try:
+        values = np.fromstring(data.replace(b'\n', b','), dtype=np.float64, sep=',')
+    except ValueError:
+        values = None
+    if values is None or len(values) != num_rows * num_columns:
+        raise RuntimeError(f'"{filepath}" is not a valid raw data CSV export')
+    return values.reshape(num_rows, num_columns)
+
+
+def _iso8601_to_ns(timestamps: np.ndarray, filepath: str) -> np.ndarray:
+    """
+    Convert ISO8601 timestamps (a bytes array), with a "+HH:MM", "-HH:MM" or "Z" suffix, to int64 nanoseconds since the
+    Unix epoch.
+    """
+    num_rows = len(timestamps)
+    if num_rows == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Work on the characters of each timestamp as a 2D array, so the UTC offsets can be parsed and removed at once
+    width = timestamps.dtype.itemsize
+    chars = np.ascontiguousarray(timestamps).view(np.uint8).reshape(num_rows, width).copy()
+    lengths = np.char.str_len(timestamps)
+    rows = np.arange(num_rows)
+
+    offset_start = np.maximum(lengths - 6, 0)
+    sign = chars[rows, offset_start]
+    has_offset = ((sign == ord('+')) | (sign == ord('-'))) & (chars[rows, np.maximum(lengths - 3, 0)] == ord(':'))
+    digit_columns = np.minimum(offset_start[:, None] + [1, 2, 4, 5], width - 1)
+    digits = chars[rows[:, None], digit_columns].astype(np.int64) - ord('0')
+    offset_minutes = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 2] * 10 + digits[:, 3]
+    offset_minutes = np.where(has_offset, np.where(sign == ord('-'), -offset_minutes, offset_minutes), 0)
+    offset_ns = offset_minutes * 60 * _NS_PER_SECOND
+
+    is_utc = chars[rows, np.maximum(lengths - 1, 0)] == ord('Z')
+    end = np.where(has_offset, offset_start, np.where(is_utc, lengths - 1, lengths))
+    chars[np.arange(width)[None, :] >= end[:, None]] = 0
+
+    try:
+        local_ns = chars.view(timestamps.dtype).reshape(num_rows).astype('datetime64[ns]').astype(np.int64)
+    except ValueError:
+        raise RuntimeError(f'"{filepath}" contains an invalid ISO8601 timestamp') from None
+    return local_ns - offset_ns
+
+
+def _parse_chunk(lines: List[bytes], columns: List[str], iso8601_timestamp: bool, digital: bool, start_row: int,
+                 filepath: str) -> RawDataCsvChunk:
+    num_rows = len(lines)
+    if iso8601_timestamp:
+        fields = np.char.partition(np.array(lines, dtype=np.bytes_), b',')
+        times = _iso8601_to_ns(fields[:, 0], filepath)
+        channel_values = _parse_values(b''.join(fields[:, 2]), num_rows, len(columns), filepath)
+    else:
+        parsed = _parse_values(b''.join(lines), num_rows, len(columns) + 1, filepath)
+        times = np.ascontiguousarray(parsed[:, 0])
+        channel_values = parsed[:, 1:]
+
+    dtype = np.uint8 if digital else np.float32
+    values = {column: channel_values[:, index].astype(dtype) for index, column in enumerate(columns)}
+    return RawDataCsvChunk(start_row=start_row, iso8601_timestamp=iso8601_timestamp, times=times, values=values)
+
+
+def iter_raw_data_csv(filepath: str, *, chunk_rows: int = DEFAULT_CSV_CHUNK_ROWS,
+                      digital: Optional[bool] = None) -> Iterator[RawDataCsvChunk]:
+    """
+    Read a digital.csv or analog.csv file produced by Capture.export_raw_data_csv(), a chunk of rows at a time.
+
+    Each chunk contains `chunk_rows` rows, except for the last one. An empty export yields no chunks.
+
+    :param filepath: Path to the digital.csv or analog.csv file.
+    :param chunk_rows: Number of rows in each chunk.
+    :param digital: True if the file contains digital channels, False if it contains analog channels. Defaults to
+                    detecting it from the file name.
+    """
+    filepath = str(filepath)
+    if chunk_rows <= 0:
+        raise ValueError('chunk_rows must be greater than 0')
+    if digital is None:
+        digital = _is_digital(filepath)
+
+    with open(filepath, 'rb') as f:
+        header = f.readline().decode('utf-8-sig').rstrip('\r\n')
+        if not header:
+            raise RuntimeError(f'"{filepath}" is not a valid raw data CSV export')
+        columns = header.split(',')[1:]
+
+        iso8601_timestamp = None
+        start_row = 0
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if lines and not lines[-1].strip():
+                # Trailing blank lines
+                lines = [line for line in lines if line.strip()]
+            if not lines:
+                return
+            if not lines[-1].endswith(b'\n'):
+                # Every row is parsed up to its newline, including the last row of the file
+                lines[-1] += b'\n'
+
+            if iso8601_timestamp is None:
+                # Relative times are plain numbers, and never contain a 'T'
+                iso8601_timestamp = b'T' in lines[0].split(b',', 1)[0]
+
+            yield _parse_chunk(lines, columns, iso8601_timestamp, digital, start_row, filepath)
+            start_row += len(lines)
+
+
+def read_raw_data_csv(filepath: str, *, digital: Optional[bool] = None) -> RawDataCsvChunk:
+    """
+    Read a digital.csv or analog.csv file produced by Capture.export_raw_data_csv() into memory at once.
+
+    The whole file is parsed into a single chunk, so use iter_raw_data_csv() to process large exports with bounded
+    memory usage.
+
+    :param filepath: Path to the digital.csv or analog.csv file.
+    :param digital: See iter_raw_data_csv()
+    """
+    filepath = str(filepath)
+    if digital is None:
+        digital = _is_digital(filepath)
+
+    chunks = list(iter_raw_data_csv(filepath, digital=digital))
+    if len(chunks) == 1:
+        return chunks[0]
+
+    if not chunks:
+        with open(filepath, 'rb') as f:
+            columns = f.readline().decode('utf-8-sig').rstrip('\r\n').split(',')[1:]
+        dtype = np.uint8 if digital else np.float32
+        return RawDataCsvChunk(start_row=0, iso8601_timestamp=False, times=np.zeros(0, dtype=np.float64),
+                               values={column: np.zeros(0, dtype=dtype) for column in columns})
+
+    return RawDataCsvChunk(
+        start_row=0,
+        iso8601_timestamp=chunks[0].iso8601_timestamp,
+        times=np.concatenate([chunk.times for chunk in chunks]),
+        values={column: np.concatenate([chunk.values[column] for chunk in chunks]) for column in chunks[0].values},
+    )
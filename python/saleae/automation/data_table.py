@@ -0,0 +1,64 @@
+"""
+Readers for the Arrow IPC and Parquet files produced by Capture.export_data_table().
+
+Unlike the CSV format, every column has a type: start_time and duration are float64 seconds (start_time is a
+timestamp[ns, UTC] column if iso8601_timestamp was set), and numeric values are stored as numbers, regardless of the
+radix of their analyzer. Empty cells are null.
+
+Arrow IPC files are memory-mapped, so the returned table refers to the file directly instead of copying it. Opening even
+a multi-gigabyte export is instant, and pages are only read from disk when the data is accessed. Parquet files are
+compressed, so they are smaller, but they are decoded into memory when read.
+
+    table = data_table.read_data_table('data_table.arrow')
+    start_times = table.column('start_time').to_numpy()
+
+This module requires PyArrow, which is not installed by default: `pip install logic2-automation[arrow]`
+"""
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet
+
+from .capture import DataTableExportFormat
+
+_ARROW_IPC_MAGIC = b'ARROW1'
+_PARQUET_MAGIC = b'PAR1'
+
+
+def data_table_format(filepath: str) -> DataTableExportFormat:
+    """
+    Detect the format of a file produced by Capture.export_data_table(), from its contents.
+
+    :param filepath: Path to the exported file.
+    """
+    with open(filepath, 'rb') as f:
+        magic = f.read(len(_ARROW_IPC_MAGIC))
+
+    if magic.startswith(_ARROW_IPC_MAGIC):
+        return DataTableExportFormat.ARROW_IPC
+    elif magic.startswith(_PARQUET_MAGIC):
+        return DataTableExportFormat.PARQUET
+    return DataTableExportFormat.CSV
+
+
+def read_data_table(filepath: str, *, columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Open an Arrow IPC or Parquet file produced by Capture.export_data_table().
+
+    :param filepath: Path to the exported file.
+    :param columns: Columns to read. Defaults to all columns.
+    :return: The data table. Use `table.to_pandas()` or `table.column(name).to_numpy()` to convert it.
+    """
+    filepath = str(filepath)
+    export_format = data_table_format(filepath)
+
+    if export_format == DataTableExportFormat.ARROW_IPC:
+        # The record batches refer to the memory map, which stays open for as long as the table does
+        source = pa.memory_map(filepath, 'r')
+        table = pa.ipc.open_file(source).read_all()
+        return table.select(columns) if columns is not None else table
+    elif export_format == DataTableExportFormat.PARQUET:
+        return pa.parquet.read_table(filepath, columns=columns, memory_map=True)
+    else:
+        raise RuntimeError(f'"{filepath}" is not an Arrow IPC or Parquet data table export')
@@ -1,8 +1,8 @@
 from contextlib import contextmanager
-import grpc
+from typing import Optional
 import re
 
-from saleae.grpc import saleae_pb2
+from ._lazy import grpc
 
 class SaleaeError(Exception):
     """
@@ -112,6 +112,15 @@ class OutOfMemoryError(CaptureError):
     pass
 
 
+class WaitTimeoutError(SaleaeError):
+    """
+    The capture did not complete within the timeout passed to wait() or wait_future().
+    The capture is still recording. It can be waited on again, or stopped with stop() and closed with close().
+    """
+
+    pass
+
+
 
 @contextmanager
 def _error_handler():
@@ -121,10 +130,27 @@ def _error_handler():
         raise grpc_error_to_exception(exc) from None
 
 
+@contextmanager
+def _wait_error_handler(timeout: 'Optional[float]'):
+    """
+    Like _error_handler, but raises WaitTimeoutError when the deadline of a WaitCapture request passes.
+    """
+    try:
+        yield
+    except grpc.RpcError as exc:
+        raise _wait_error_to_exception(exc, timeout) from None
+
+
+def _wait_error_to_exception(exc: 'grpc.RpcError', timeout: 'Optional[float]'):
+    if exc.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+        return WaitTimeoutError(f'Capture did not complete within {timeout} seconds')
+    return grpc_error_to_exception(exc)
+
+
 error_message_re = re.compile(r"^(\d+): (.*)$")
 
 
-def grpc_error_to_exception(exc: grpc.RpcError):
+def grpc_error_to_exception(exc: 'grpc.RpcError'):
     if exc.code() == grpc.StatusCode.ABORTED:
         message = exc.details()
         return grpc_error_msg_to_exception(message)
@@ -133,14 +159,15 @@ def grpc_error_to_exception(exc: grpc.RpcError):
 
 
 grpc_error_code_to_exception_type = {
-    saleae_pb2.ERROR_CODE_UNSPECIFIED: UnknownError,
-    saleae_pb2.ERROR_CODE_INTERNAL_EXCEPTION: InternalServerError,
-    saleae_pb2.ERROR_CODE_INVALID_REQUEST: InvalidRequestError,
-    saleae_pb2.ERROR_CODE_LOAD_CAPTURE_FAILED: LoadCaptureFailedError,
-    saleae_pb2.ERROR_CODE_EXPORT_FAILED: ExportError,
-    saleae_pb2.ERROR_CODE_MISSING_DEVICE: MissingDeviceError,
-    saleae_pb2.ERROR_CODE_DEVICE_ERROR: DeviceError,
-    saleae_pb2.ERROR_CODE_OUT_OF_MEMORY: OutOfMemoryError,
+    # Keyed by the values of the ErrorCode enum in saleae.proto
+    0: UnknownError,  # ERROR_CODE_UNSPECIFIED
+    1: InternalServerError,  # ERROR_CODE_INTERNAL_EXCEPTION
+    10: InvalidRequestError,  # ERROR_CODE_INVALID_REQUEST
+    20: LoadCaptureFailedError,  # ERROR_CODE_LOAD_CAPTURE_FAILED
+    21: ExportError,  # ERROR_CODE_EXPORT_FAILED
+    50: MissingDeviceError,  # ERROR_CODE_MISSING_DEVICE
+    51: DeviceError,  # ERROR_CODE_DEVICE_ERROR
+    52: OutOfMemoryError,  # ERROR_CODE_OUT_OF_MEMORY
 }
 
 
@@ -152,6 +179,10 @@ def grpc_error_msg_to_exception(msg: str):
     code = int(match.group(1))
     error_msg = match.group(2)
 
+    return _error_code_to_exception(code, error_msg)
+
+
+def _error_code_to_exception(code: int, error_msg: str) -> SaleaeError:
     exc_type = grpc_error_code_to_exception_type.get(code, UnknownError)
     return exc_type(error_msg)
 
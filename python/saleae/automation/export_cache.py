@@ -0,0 +1,303 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from .capture import Capture, ExportTime, _capture_time
+
+if TYPE_CHECKING:
+    from .manager import Manager
+
+# Changing this invalidates every cache entry, e.g. if the key format changes
+_CACHE_KEY_VERSION = 1
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Temporary export directories older than this were left behind by a process that exited mid-export
+_STALE_TEMP_SECONDS = 24 * 60 * 60
+
+
+class ExportCache:
+    """
+    An on-disk cache of raw data exports, keyed by the contents of the capture file and the export parameters.
+
+    Exporting the same channels of the same .sal file again returns the directory of the earlier export, without loading
+    the capture. Captures are identified by the SHA-256 hash of the file, so a capture that is copied or renamed is still
+    a hit, and a capture that is modified in place is a miss.
+
+    When the cache grows beyond `max_size_bytes` or `max_entries`, the least recently used entries are removed.
+
+        cache = automation.ExportCache('export_cache', max_size_bytes=10 * 1024 ** 3)
+        with automation.Manager.connect() as manager:
+            directory = cache.export_raw_data_csv(manager, 'capture.sal', digital_channels=[0, 1])
+
+    The returned directories belong to the cache, so they should be treated as read-only. Several processes can share a
+    cache directory: entries are created atomically, and a concurrent export of the same entry is only stored once.
+    """
+
+    def __init__(self, directory: Union[Path, str], *, max_size_bytes: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        """
+        :param directory: Directory to store the cache in. It is created if it doesn't exist.
+        :param max_size_bytes: Maximum total size of the cached exports. If not specified, the size is not limited.
+        :param max_entries: Maximum number of cached exports. If not specified, the number is not limited.
+        """
+        self.directory = Path(directory).resolve()
+        self.max_size_bytes = max_size_bytes
+        self.max_entries = max_entries
+
+        self._entries_directory = self.directory / 'entries'
+        self._temp_directory = self.directory / 'tmp'
+        self._entries_directory.mkdir(parents=True, exist_ok=True)
+        self._temp_directory.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_temp_directories()
+
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> SHA-256 of the file, so unchanged captures are only hashed once
+        self._file_digests: Dict[Tuple[str, int, int], str] = {}
+
+        #: Number of exports that were found in the cache
+        self.hits = 0
+
+        #: Number of exports that were not found in the cache, and were exported
+        self.misses = 0
+
+    def _file_digest(self, filepath: str) -> str:
+        stat = os.stat(filepath)
+        memo_key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._file_digests.get(memo_key)
+        if digest is not None:
+            return digest
+
+        sha = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        with self._lock:
+            self._file_digests[memo_key] = digest
+        return digest
+
+    def _key(self, capture_filepath: str, kind: str, params: Dict[str, Any]) -> str:
+        key = {
+            'version': _CACHE_KEY_VERSION,
+            'capture': self._file_digest(capture_filepath),
+            'kind': kind,
+            'params': params,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """
+        Returns the directory of a cached export, or None if it is not in the cache. A hit marks the entry as recently used.
+
+        :param key: Key of the export, see key_raw_data_csv() and key_raw_data_binary().
+        """
+        path = self._entries_directory / key
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _get_or_export(self, key: str, manager: 'Manager', capture_filepath: str,
+                       export: Callable[[Capture, str], None]) -> Path:
+        cached_path = self.lookup(key)
+        if cached_path is not None:
+            with self._lock:
+                self.hits += 1
+            return cached_path
+
+        with self._lock:
+            self.misses += 1
+
+        path = self._entries_directory / key
+        temp_path = self._temp_directory / f'{key}.{uuid.uuid4().hex}'
+        temp_path.mkdir()
+        try:
+            with manager.load_capture(os.path.abspath(capture_filepath)) as capture:
+                export(capture, str(temp_path))
+            try:
+                os.rename(temp_path, path)
+            except OSError:
+                # Another process stored the same export first
+                if not path.exists():
+                    raise
+                shutil.rmtree(temp_path, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+
+        self.evict(keep=key)
+        return path
+
+    def key_raw_data_csv(self, capture_filepath: str, *, analog_channels: Optional[List[int]] = None,
+                         digital_channels: Optional[List[int]] = None, analog_downsample_ratio: int = 1,
+                         iso8601_timestamp: bool = False, start_time: Optional[ExportTime] = None,
+                         end_time: Optional[ExportTime] = None) -> str:
+        """
+        Returns the cache key of a raw data CSV export. The parameters are the same as export_raw_data_csv().
+        """
+        return self._key(capture_filepath, 'raw_data_csv', {
+            'analog_channels': _channels_key(analog_channels),
+            'digital_channels': _channels_key(digital_channels),
+            'analog_downsample_ratio': analog_downsample_ratio,
+            'iso8601_timestamp': iso8601_timestamp,
+            'start_time': _time_key(start_time),
+            'end_time': _time_key(end_time),
+        })
+
+    def key_raw_data_binary(self, capture_filepath: str, *, analog_channels: Optional[List[int]] = None,
+                            digital_channels: Optional[List[int]] = None, analog_downsample_ratio: int = 1,
+                            start_time: Optional[ExportTime] = None, end_time: Optional[ExportTime] = None) -> str:
+        """
+        Returns the cache key of a raw data binary export. The parameters are the same as export_raw_data_binary().
+        """
+        return self._key(capture_filepath, 'raw_data_binary', {
+            'analog_channels': _channels_key(analog_channels),
+            'digital_channels': _channels_key(digital_channels),
+            'analog_downsample_ratio': analog_downsample_ratio,
+            'start_time': _time_key(start_time),
+            'end_time': _time_key(end_time),
+        })
+
+    def export_raw_data_csv(self, manager: 'Manager', capture_filepath: str, *,
+                            analog_channels: Optional[List[int]] = None, digital_channels: Optional[List[int]] = None,
+                            analog_downsample_ratio: int = 1, iso8601_timestamp: bool = False,
+                            start_time: Optional[ExportTime] = None, end_time: Optional[ExportTime] = None) -> Path:
+        """
+        Returns the directory of a raw data CSV export of a capture file, exporting it only if it is not in the cache.
+
+        See Capture.export_raw_data_csv() for the export parameters.
+
+        :param manager: Manager used to load and export the capture on a miss.
+        :param capture_filepath: Path of the .sal file.
+        :return: Directory containing analog.csv and/or digital.csv.
+        """
+        key = self.key_raw_data_csv(capture_filepath, analog_channels=analog_channels,
+                                    digital_channels=digital_channels, analog_downsample_ratio=analog_downsample_ratio,
+                                    iso8601_timestamp=iso8601_timestamp, start_time=start_time, end_time=end_time)
+
+        def export(capture: Capture, directory: str):
+            capture.export_raw_data_csv(directory, analog_channels=analog_channels, digital_channels=digital_channels,
+                                        analog_downsample_ratio=analog_downsample_ratio,
+                                        iso8601_timestamp=iso8601_timestamp, start_time=start_time, end_time=end_time)
+
+        return self._get_or_export(key, manager, capture_filepath, export)
+
+    def export_raw_data_binary(self, manager: 'Manager', capture_filepath: str, *,
+                               analog_channels: Optional[List[int]] = None, digital_channels: Optional[List[int]] = None,
+                               analog_downsample_ratio: int = 1, start_time: Optional[ExportTime] = None,
+                               end_time: Optional[ExportTime] = None) -> Path:
+        """
+        Returns the directory of a raw data binary export of a capture file, exporting it only if it is not in the cache.
+
+        See Capture.export_raw_data_binary() for the export parameters.
+
+        :param manager: Manager used to load and export the capture on a miss.
+        :param capture_filepath: Path of the .sal file.
+        :return: Directory containing the .bin files.
+        """
+        key = self.key_raw_data_binary(capture_filepath, analog_channels=analog_channels,
+                                       digital_channels=digital_channels,
+                                       analog_downsample_ratio=analog_downsample_ratio,
+                                       start_time=start_time, end_time=end_time)
+
+        def export(capture: Capture, directory: str):
+            capture.export_raw_data_binary(directory, analog_channels=analog_channels,
+                                           digital_channels=digital_channels,
+                                           analog_downsample_ratio=analog_downsample_ratio,
+                                           start_time=start_time, end_time=end_time)
+
+        return self._get_or_export(key, manager, capture_filepath, export)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """
+        Returns (last used time, size in bytes, path) of every entry.
+        """
+        entries = []
+        for path in self._entries_directory.iterdir():
+            try:
+                last_used = path.stat().st_mtime
+                size = sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+            except FileNotFoundError:
+                # Removed by another process
+                continue
+            entries.append((last_used, size, path))
+        return entries
+
+    def _remove_stale_temp_directories(self):
+        cutoff = time.time() - _STALE_TEMP_SECONDS
+        for path in self._temp_directory.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                # Renamed or removed by the process that created it
+                continue
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the cached exports"""
+        return sum(size for _, size, _ in self._entries())
+
+    @property
+    def num_entries(self) -> int:
+        """Number of cached exports"""
+        return len(self._entries())
+
+    def evict(self, *, keep: Optional[str] = None):
+        """
+        Remove the least recently used entries until the cache is within max_size_bytes and max_entries.
+
+        This is called automatically after each export that is added to the cache. It also removes temporary export
+        directories left behind by processes that exited in the middle of an export.
+
+        :param keep: Key of an entry that must not be removed, e.g. the entry that was just added.
+        """
+        self._remove_stale_temp_directories()
+
+        if self.max_size_bytes is None and self.max_entries is None:
+            return
+
+        entries = sorted(self._entries(), key=lambda entry: entry[0])
+        total_size = sum(size for _, size, _ in entries)
+        num_entries = len(entries)
+
+        for _, size, path in entries:
+            over_size = self.max_size_bytes is not None and total_size > self.max_size_bytes
+            over_count = self.max_entries is not None and num_entries > self.max_entries
+            if not over_size and not over_count:
+                break
+            if path.name == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            num_entries -= 1
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        for path in self._entries_directory.iterdir():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _channels_key(channels: Optional[List[int]]) -> List[int]:
+    # None and [] both export no channels, and the order of the channels does not change the export
+    return sorted(channels) if channels else []
+
+
+def _time_key(t: Optional[ExportTime]) -> Optional[Dict[str, Any]]:
+    if t is None:
+        return None
+    capture_time = _capture_time(t)
+    kind = capture_time.WhichOneof('time')
+    return {kind: getattr(capture_time, kind)}
@@ -0,0 +1,1301 @@
+"""
+An in-process stand-in for the Logic 2 automation server.
+
+FakeLogic2Server implements the Manager service from saleae.proto on a local port, so that Manager.connect() (and
+AsyncManager.connect()) can target it without the Logic 2 software or any hardware. This makes it possible to measure
+the overhead of the client library itself, and to run load tests on machines where Logic 2 can't run.
+
+Captures are synthetic. Digital channel N toggles at a fixed rate of `digital_transitions_per_second / (N + 1)`, and
+analog channels contain a sine wave. Exports produce files in the same formats as Logic 2 (CSV, and version 0 of the
+binary export format), but the contents will never match an export of a real capture.
+
+    from saleae import automation
+    from saleae.automation.fake_server import FakeLogic2Server
+
+    with FakeLogic2Server(latency_seconds=0.001) as server:
+        with automation.Manager.connect(port=server.port) as manager:
+            ...
+
+The server can also be run as a separate process: `python -m saleae.automation.fake_server --port 10430`
+"""
+from array import array
+from concurrent import futures
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import datetime
+import functools
+import heapq
+import inspect
+import json
+import math
+import os
+import struct
+import sys
+import threading
+import time
+
+import grpc
+
+from saleae.grpc import saleae_pb2, saleae_pb2_grpc
+
+from .manager import DeviceDesc, DeviceType
+from .tracing import SERVER_TIMING_METADATA_KEY, format_server_timing
+
+# Device ids of the simulation devices that Logic 2 provides
+_SIMULATION_DEVICES = [
+    DeviceDesc(device_id='F4241', device_type=DeviceType.LOGIC_PRO_16, is_simulation=True),
+    DeviceDesc(device_id='F4243', device_type=DeviceType.LOGIC_8, is_simulation=True),
+    DeviceDesc(device_id='F4244', device_type=DeviceType.LOGIC_PRO_8, is_simulation=True),
+]
+
+# Marker stored in capture files written by SaveCapture, so they can be loaded again with the same contents
+_CAPTURE_FILE_FORMAT = 'fake-logic2-capture'
+
+_DEFAULT_MAX_CHUNK_SIZE = 65536
+_DEFAULT_MAX_ROWS_PER_REPLY = 1000
+_DEFAULT_BUFFER_SIZE_MEGABYTES = 1024
+_DEFAULT_PROGRESS_INTERVAL_SECONDS = 0.25
+_DEFAULT_SEGMENT_FILE_NAME_PREFIX = 'segment_'
+_DEFAULT_MAX_PARALLEL_EXPORTS = 4
+
+# RPC that handles each kind of ExportManyEntry
+_EXPORT_MANY_METHODS = {
+    'raw_data_csv': 'ExportRawDataCsv',
+    'raw_data_binary': 'ExportRawDataBinary',
+    'data_table_csv': 'ExportDataTableCsv',
+    'legacy_analyzer': 'LegacyExportAnalyzer',
+}
+
+_BINARY_HEADER = struct.Struct('<8sii')
+_BINARY_DIGITAL_HEADER_V0 = struct.Struct('<IddQ')
+_BINARY_ANALOG_HEADER_V0 = struct.Struct('<dQQQ')
+
+# Standard data table columns, in export order. Each analyzer frame has a single value column, named 'value'.
+_DATA_TABLE_STANDARD_COLUMNS = ['name', 'type', 'start_time', 'duration']
+_DATA_TABLE_VALUE_COLUMNS = ['value']
+
+
+class _Abort(Exception):
+    """
+    Raised by request handlers to fail the request with a Saleae error code.
+    """
+
+    def __init__(self, error_code: int, message: str):
+        super().__init__(message)
+        self.error_code = error_code
+        self.message = message
+
+
+@dataclass
+class _FakeAnalyzer:
+    analyzer_id: int
+    name: str
+    label: str
+    is_high_level: bool = False
+
+    @property
+    def display_name(self) -> str:
+        return self.label or self.name
+
+
+@dataclass
+class _FakeFrame:
+    analyzer: _FakeAnalyzer
+    type: str
+    start_time: float
+    duration: float
+    value: int
+
+
+@dataclass
+class _FakeCapture:
+    capture_id: int
+    digital_channels: List[int]
+    analog_channels: List[int]
+    digital_sample_rate: int
+    analog_sample_rate: int
+
+    #: Wall clock time of the start of the capture, in nanoseconds since the epoch. Used for ISO8601 timestamps.
+    start_time_ns: int
+
+    #: Capture mode, one of 'manual', 'timed', 'trigger' or 'segmented'
+    mode: str = 'manual'
+
+    #: Duration of the capture, in seconds. None while the capture is running.
+    duration_seconds: Optional[float] = None
+
+    trim_data_seconds: float = 0.0
+
+    #: Size of the capture buffer, and the rate at which it fills while recording
+    buffer_size_bytes: int = _DEFAULT_BUFFER_SIZE_MEGABYTES * 1024 * 1024
+    bytes_per_second: float = 0.0
+
+    #: Time at which the trigger is found, in seconds from the start. None if the capture does not use a trigger.
+    trigger_time_seconds: Optional[float] = None
+
+    #: Error that ended the capture, raised by StopCapture, WaitCapture and StreamCaptureProgress
+    error: Optional[_Abort] = None
+
+    #: Segments saved so far in segmented mode. `segments_complete` is set once no more segments will be saved.
+    segments: List['saleae_pb2.CaptureSegment'] = field(default_factory=list)
+    segments_complete: bool = False
+    segments_changed: threading.Condition = field(default_factory=threading.Condition)
+    segment_begin_seconds: float = 0.0
+    max_segments: int = 0
+    segment_writer: Optional[threading.Thread] = None
+
+    analyzers: Dict[int, _FakeAnalyzer] = field(default_factory=dict)
+
+    done: threading.Event = field(default_factory=threading.Event)
+    timer: Optional[threading.Timer] = None
+    started_at: float = field(default_factory=time.monotonic)
+
+    def finish(self):
+        """
+        End the capture, if it is still running.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.duration_seconds is None:
+            duration = time.monotonic() - self.started_at
+            if self.trim_data_seconds > 0:
+                duration = min(duration, self.trim_data_seconds)
+            self.duration_seconds = duration
+        self.done.set()
+
+    def fail(self, error: _Abort):
+        """
+        End the capture with an error, if it is still running.
+        """
+        if not self.done.is_set():
+            self.error = error
+            self.finish()
+
+    def check_error(self):
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def bytes_captured(self) -> int:
+        """
+        Number of bytes of the capture buffer in use. Manual captures discard the oldest data once the buffer is full,
+        and segmented captures free the data of each segment once it has been saved.
+        """
+        return min(int((self.length_seconds - self.segment_begin_seconds) * self.bytes_per_second), self.buffer_size_bytes)
+
+    @property
+    def length_seconds(self) -> float:
+        """
+        Duration of the data recorded so far, in seconds.
+        """
+        if self.duration_seconds is not None:
+            return self.duration_seconds
+        return time.monotonic() - self.started_at
+
+
+class _ServerTiming:
+    """
+    Time spent in each phase of a request, reported to the client in the `saleae-server-timing` trailing metadata entry.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start_time
+
+    def metadata(self) -> Tuple[Tuple[str, str], ...]:
+        phases = dict(self.phases)
+        # Time not covered by a phase of the handler is reported as 'handle'
+        handle_seconds = time.perf_counter() - self.start_time - sum(phases.values())
+        if handle_seconds > 0:
+            phases['handle'] = handle_seconds
+        return ((SERVER_TIMING_METADATA_KEY, format_server_timing(list(phases.items()))),)
+
+
+# Timing of the request being handled on the current thread
+_current_call = threading.local()
+
+
+def _phase(name: str):
+    """
+    Time a phase of the current request, e.g. `with _phase('disk_write'):`
+
+    Threads that are not handling a request, such as the workers of ExportMany, are not timed.
+    """
+    timing = getattr(_current_call, 'timing', None)
+    return timing.phase(name) if timing is not None else nullcontext()
+
+
+def _rpc(method: Callable) -> Callable:
+    """
+    Wraps a servicer method: counts the call, applies the configured latency, reports the server timing in the trailing
+    metadata, and converts _Abort to a gRPC error in the same format Logic 2 uses, "<error code>: <message>".
+    """
+    def start(server: 'FakeLogic2Server') -> _ServerTiming:
+        timing = _ServerTiming()
+        _current_call.timing = timing
+        with timing.phase('queue'):
+            server._before_call(method.__name__)
+        return timing
+
+    @functools.wraps(method)
+    def wrapper(self: '_FakeManagerServicer', request, context: grpc.ServicerContext):
+        timing = start(self._server)
+        try:
+            reply = method(self, request, context)
+        except _Abort as exc:
+            context.set_trailing_metadata(timing.metadata())
+            context.abort(grpc.StatusCode.ABORTED, f'{exc.error_code}: {exc.message}')
+        context.set_trailing_metadata(timing.metadata())
+        return reply
+
+    @functools.wraps(method)
+    def stream_wrapper(self: '_FakeManagerServicer', request, context: grpc.ServicerContext):
+        timing = start(self._server)
+        try:
+            yield from method(self, request, context)
+        except _Abort as exc:
+            context.set_trailing_metadata(timing.metadata())
+            context.abort(grpc.StatusCode.ABORTED, f'{exc.error_code}: {exc.message}')
+        context.set_trailing_metadata(timing.metadata())
+
+    return stream_wrapper if inspect.isgeneratorfunction(method) else wrapper
+
+
+def _requested_channels(capture: _FakeCapture, request) -> Tuple[List[int], List[int]]:
+    """
+    Returns the (digital, analog) channels selected by a request with a `logic_channels` field.
+    """
+    if not request.HasField('logic_channels'):
+        return capture.digital_channels, capture.analog_channels
+
+    digital = list(request.logic_channels.digital_channels)
+    analog = list(request.logic_channels.analog_channels)
+    if len(digital) == 0 and len(analog) == 0:
+        return capture.digital_channels, capture.analog_channels
+
+    for channel in digital:
+        if channel not in capture.digital_channels:
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Digital channel {channel} is not enabled in the capture')
+    for channel in analog:
+        if channel not in capture.analog_channels:
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Analog channel {channel} is not enabled in the capture')
+
+    return digital, analog
+
+
+def _capture_seconds(capture: _FakeCapture, time) -> float:
+    """
+    Convert a CaptureTime message to seconds from the start of the capture.
+    """
+    kind = time.WhichOneof('time')
+    if kind == 'relative_seconds':
+        return time.relative_seconds
+    elif kind == 'absolute_time_ns':
+        return (time.absolute_time_ns - capture.start_time_ns) / 1e9
+    raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, 'CaptureTime must have relative_seconds or absolute_time_ns set')
+
+
+def _export_window(capture: _FakeCapture, request) -> Tuple[float, float]:
+    """
+    Returns the (begin, end) of the range of time selected by a request with a `time_range` field, clamped to the capture.
+    """
+    begin = 0.0
+    end = capture.length_seconds
+    if request.HasField('time_range'):
+        if request.time_range.HasField('start'):
+            begin = _capture_seconds(capture, request.time_range.start)
+        if request.time_range.HasField('end'):
+            end = _capture_seconds(capture, request.time_range.end)
+        if begin > end:
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, 'The start of time_range must not be after its end')
+
+    begin = min(max(begin, 0.0), capture.length_seconds)
+    end = min(max(end, begin), capture.length_seconds)
+    return begin, end
+
+
+def _first_at_or_after(t: float, time_of: Callable[[int], float], count: int) -> int:
+    """
+    Binary search for the first index in [0, count) whose time is at or after `t`, where `time_of` is increasing.
+    Returns `count` if there is none.
+    """
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if time_of(mid) < t:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _downsample_ratio(value: int) -> int:
+    if value == 0:
+        return 1
+    if value < 1 or value > 1_000_000:
+        raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, 'analog_downsample_ratio must be between 1 and 1,000,000')
+    return value
+
+
+def _iso8601(start_time_ns: int, seconds: float) -> str:
+    timestamp_ns = start_time_ns + round(seconds * 1e9)
+    dt = datetime.datetime.fromtimestamp(timestamp_ns // 1_000_000_000, tz=datetime.timezone.utc)
+    return f'{dt.strftime("%Y-%m-%dT%H:%M:%S")}.{timestamp_ns % 1_000_000_000:09d}+00:00'
+
+
+def _format_radix(value: int, radix_type: int) -> str:
+    if radix_type == saleae_pb2.RADIX_TYPE_BINARY:
+        return f'0b{value:08b}'
+    elif radix_type == saleae_pb2.RADIX_TYPE_HEXADECIMAL:
+        return f'0x{value:02X}'
+    elif radix_type == saleae_pb2.RADIX_TYPE_ASCII:
+        return chr(value) if 32 <= value < 127 else f'\\x{value:02X}'
+    return str(value)
+
+
+def _write_columnar_data_table(filepath: str, export_format: int, columns: List[str], frames: Iterator[_FakeFrame],
+                                start_time_ns: Optional[int]):
+    """
+    Write a data table export in the Arrow IPC or Parquet format, with the column types documented in saleae.proto.
+
+    If start_time_ns is set, start_time is written as a UTC timestamp instead of capture relative seconds.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise _Abort(saleae_pb2.ERROR_CODE_EXPORT_FAILED, 'The fake server requires pyarrow for Arrow IPC and Parquet exports')
+
+    values: Dict[str, list] = {column: [] for column in columns}
+    for frame in frames:
+        row = {
+            'name': frame.analyzer.display_name,
+            'type': frame.type,
+            'start_time': frame.start_time if start_time_ns is None else start_time_ns + round(frame.start_time * 1e9),
+            'duration': frame.duration,
+            'value': frame.value,
+        }
+        for column in columns:
+            values[column].append(row[column])
+
+    types = {
+        'name': pa.string(),
+        'type': pa.string(),
+        'start_time': pa.float64() if start_time_ns is None else pa.timestamp('ns', tz='UTC'),
+        'duration': pa.float64(),
+        'value': pa.int64(),
+    }
+    table = pa.table({column: pa.array(values[column], type=types[column]) for column in columns})
+
+    if export_format == saleae_pb2.DATA_TABLE_EXPORT_FORMAT_PARQUET:
+        pa.parquet.write_table(table, filepath)
+    else:
+        with pa.OSFile(filepath, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _write_capture_file(filepath: str, capture: _FakeCapture, *, begin_seconds: float, end_seconds: float):
+    """
+    Save the part of a capture between begin_seconds and end_seconds, in a format that LoadCapture can restore.
+    """
+    saved = {
+        'format': _CAPTURE_FILE_FORMAT,
+        'digital_channels': capture.digital_channels,
+        'analog_channels': capture.analog_channels,
+        'digital_sample_rate': capture.digital_sample_rate,
+        'analog_sample_rate': capture.analog_sample_rate,
+        'start_time_ns': capture.start_time_ns + round(begin_seconds * 1e9),
+        'duration_seconds': end_seconds - begin_seconds,
+    }
+    with open(filepath, 'w') as f:
+        json.dump(saved, f)
+
+
+def _to_little_endian(data: array) -> bytes:
+    if sys.byteorder != 'little':
+        data = array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+class _FakeManagerServicer(saleae_pb2_grpc.ManagerServicer):
+    def __init__(self, server: 'FakeLogic2Server'):
+        self._server = server
+
+    def _capture(self, capture_id: int) -> _FakeCapture:
+        with self._server._lock:
+            capture = self._server._captures.get(capture_id)
+        if capture is None:
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Capture {capture_id} does not exist')
+        return capture
+
+    def _analyzer(self, capture: _FakeCapture, analyzer_id: int) -> _FakeAnalyzer:
+        analyzer = capture.analyzers.get(analyzer_id)
+        if analyzer is None:
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Analyzer {analyzer_id} does not exist')
+        return analyzer
+
+    @_rpc
+    def GetAppInfo(self, request, context):
+        return saleae_pb2.GetAppInfoReply(app_info=saleae_pb2.AppInfo(
+            api_version=saleae_pb2.Version(major=saleae_pb2.THIS_API_VERSION_MAJOR,
+                                           minor=saleae_pb2.THIS_API_VERSION_MINOR,
+                                           patch=saleae_pb2.THIS_API_VERSION_PATCH),
+            application_version='fake',
+            launch_pid=os.getpid(),
+        ))
+
+    @_rpc
+    def GetDevices(self, request, context):
+        devices = [d for d in self._server.devices if request.include_simulation_devices or not d.is_simulation]
+        return saleae_pb2.GetDevicesReply(devices=[
+            saleae_pb2.Device(device_id=d.device_id, device_type=d.device_type.value, is_simulation=d.is_simulation)
+            for d in devices
+        ])
+
+    @_rpc
+    def StartCapture(self, request, context):
+        if request.device_id:
+            if not any(d.device_id == request.device_id for d in self._server.devices):
+                raise _Abort(saleae_pb2.ERROR_CODE_MISSING_DEVICE, f'Device {request.device_id} not found')
+        elif not any(not d.is_simulation for d in self._server.devices):
+            raise _Abort(saleae_pb2.ERROR_CODE_MISSING_DEVICE, 'No physical device is connected')
+
+        device_configuration = request.logic_device_configuration
+        digital_channels = list(device_configuration.logic_channels.digital_channels)
+        analog_channels = list(device_configuration.logic_channels.analog_channels)
+        if len(digital_channels) == 0 and len(analog_channels) == 0:
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, 'At least one channel must be enabled')
+
+        capture_configuration = request.capture_configuration
+        mode = capture_configuration.WhichOneof('capture_mode')
+
+        duration_seconds = None
+        trim_data_seconds = 0.0
+        trigger_time_seconds = None
+        if mode == 'timed_capture_mode':
+            duration_seconds = capture_configuration.timed_capture_mode.duration_seconds
+            trim_data_seconds = capture_configuration.timed_capture_mode.trim_data_seconds
+        elif mode == 'digital_capture_mode':
+            trigger = capture_configuration.digital_capture_mode
+            trigger_channels = [trigger.trigger_channel_index] + [linked.channel_index for linked in trigger.linked_channels]
+            for channel in trigger_channels:
+                if channel not in digital_channels:
+                    raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST,
+                                 f'Trigger channel {channel} is not an enabled digital channel')
+            # The synthetic trigger condition is met after a fixed delay
+            trigger_time_seconds = self._server.trigger_delay_seconds
+            duration_seconds = trigger_time_seconds + trigger.after_trigger_seconds
+            trim_data_seconds = trigger.trim_data_seconds
+        elif mode == 'manual_capture_mode':
+            trim_data_seconds = capture_configuration.manual_capture_mode.trim_data_seconds
+
+        segmented = capture_configuration.segmented_capture_mode if mode == 'segmented_capture_mode' else None
+        segment_seconds = math.inf
+        if segmented is not None:
+            if not segmented.directory:
+                raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, 'A directory must be specified for segmented captures')
+            if segmented.segment_duration_seconds <= 0 and segmented.segment_size_megabytes == 0:
+                raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST,
+                             'segment_duration_seconds or segment_size_megabytes must be specified')
+            try:
+                os.makedirs(segmented.directory, exist_ok=True)
+            except OSError as exc:
+                raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Failed to create {segmented.directory}: {exc}')
+
+            if segmented.segment_duration_seconds > 0:
+                segment_seconds = segmented.segment_duration_seconds
+            if segmented.segment_size_megabytes > 0 and self._server.capture_bytes_per_second > 0:
+                segment_seconds = min(segment_seconds,
+                                      segmented.segment_size_megabytes * 1024 * 1024 / self._server.capture_bytes_per_second)
+
+        capture = self._server._add_capture(
+            digital_channels=digital_channels,
+            analog_channels=analog_channels,
+            digital_sample_rate=device_configuration.digital_sample_rate,
+            analog_sample_rate=device_configuration.analog_sample_rate or self._server.analog_sample_rate,
+            mode={'timed_capture_mode': 'timed', 'digital_capture_mode': 'trigger',
+                  'segmented_capture_mode': 'segmented'}.get(mode, 'manual'),
+            trim_data_seconds=trim_data_seconds,
+            buffer_size_bytes=(capture_configuration.buffer_size_megabytes or _DEFAULT_BUFFER_SIZE_MEGABYTES) * 1024 * 1024,
+            bytes_per_second=self._server.capture_bytes_per_second,
+            trigger_time_seconds=trigger_time_seconds,
+            max_segments=segmented.max_segments if segmented is not None else 0,
+        )
+
+        # Timed, trigger and segmented captures are terminated when the buffer is full, manual captures discard the
+        # oldest data. Segmented captures only need to hold a single segment.
+        buffer_full_seconds = math.inf
+        if capture.mode != 'manual' and capture.bytes_per_second > 0:
+            buffer_full_seconds = capture.buffer_size_bytes / capture.bytes_per_second
+        end_seconds = segment_seconds if segmented is not None else duration_seconds
+
+        if buffer_full_seconds < (math.inf if end_seconds is None else end_seconds):
+            def out_of_memory():
+                capture.fail(_Abort(saleae_pb2.ERROR_CODE_OUT_OF_MEMORY, 'Capture buffer is full'))
+            capture.timer = threading.Timer(buffer_full_seconds, out_of_memory)
+        elif duration_seconds is not None:
+            def finish():
+                capture.duration_seconds = duration_seconds if trim_data_seconds <= 0 else min(duration_seconds, trim_data_seconds)
+                capture.done.set()
+            capture.timer = threading.Timer(duration_seconds, finish)
+
+        if capture.timer is not None:
+            capture.timer.daemon = True
+            capture.timer.start()
+
+        if segmented is not None:
+            capture.segment_writer = threading.Thread(
+                target=self._server._record_segments,
+                args=(capture, segmented.directory, segmented.file_name_prefix or _DEFAULT_SEGMENT_FILE_NAME_PREFIX,
+                      segment_seconds),
+                name='FakeLogic2SegmentWriter', daemon=True)
+            capture.segment_writer.start()
+
+        return saleae_pb2.StartCaptureReply(capture_info=saleae_pb2.CaptureInfo(capture_id=capture.capture_id))
+
+    @_rpc
+    def StopCapture(self, request, context):
+        capture = self._capture(request.capture_id)
+        capture.finish()
+        if capture.segment_writer is not None:
+            # The remaining data is saved as a final segment before the reply
+            capture.segment_writer.join()
+        capture.check_error()
+        return saleae_pb2.StopCaptureReply()
+
+    @_rpc
+    def WaitCapture(self, request, context):
+        capture = self._capture(request.capture_id)
+        if capture.mode == 'manual' and not capture.done.is_set():
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, 'WaitCapture cannot be used with a manual capture')
+        if capture.mode == 'segmented' and capture.max_segments == 0 and not capture.done.is_set():
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST,
+                         'WaitCapture can only be used with a segmented capture if max_segments is specified')
+
+        with _phase('wait'):
+            while not capture.done.wait(0.1):
+                if not context.is_active():
+                    break
+        capture.check_error()
+        return saleae_pb2.WaitCaptureReply()
+
+    @_rpc
+    def StreamCaptureProgress(self, request, context):
+        capture = self._capture(request.capture_id)
+        interval = request.interval_seconds if request.interval_seconds > 0 else _DEFAULT_PROGRESS_INTERVAL_SECONDS
+
+        while context.is_active():
+            is_complete = capture.done.is_set()
+            if is_complete:
+                capture.check_error()
+
+            elapsed = capture.length_seconds
+            progress = saleae_pb2.CaptureProgress(
+                elapsed_seconds=elapsed,
+                samples_captured=int(elapsed * (capture.digital_sample_rate * len(capture.digital_channels) +
+                                                capture.analog_sample_rate * len(capture.analog_channels))),
+                bytes_captured=capture.bytes_captured,
+                buffer_size_bytes=capture.buffer_size_bytes,
+                is_complete=is_complete,
+            )
+            if capture.trigger_time_seconds is not None:
+                if elapsed >= capture.trigger_time_seconds:
+                    progress.trigger_state = saleae_pb2.CAPTURE_TRIGGER_STATE_TRIGGERED
+                    progress.trigger_time_seconds = capture.trigger_time_seconds
+                else:
+                    progress.trigger_state = saleae_pb2.CAPTURE_TRIGGER_STATE_WAITING
+
+            yield saleae_pb2.StreamCaptureProgressReply(progress=progress)
+            if is_complete:
+                break
+            capture.done.wait(interval)
+
+    @_rpc
+    def StreamCaptureSegments(self, request, context):
+        capture = self._capture(request.capture_id)
+        if capture.mode != 'segmented':
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Capture {capture.capture_id} is not a segmented capture')
+
+        num_sent = 0
+        while context.is_active():
+            with capture.segments_changed:
+                segments = capture.segments[num_sent:]
+                is_complete = capture.segments_complete
+                if len(segments) == 0 and not is_complete:
+                    capture.segments_changed.wait(0.1)
+                    continue
+
+            for segment in segments:
+                yield saleae_pb2.StreamCaptureSegmentsReply(segment=segment)
+            num_sent += len(segments)
+
+            if is_complete:
+                capture.check_error()
+                break
+
+    @_rpc
+    def LoadCapture(self, request, context):
+        try:
+            with _phase('disk_read'), open(request.filepath, 'rb') as f:
+                data = f.read()
+        except OSError as exc:
+            raise _Abort(saleae_pb2.ERROR_CODE_LOAD_CAPTURE_FAILED, f'Failed to load {request.filepath}: {exc}')
+
+        if len(data) == 0:
+            raise _Abort(saleae_pb2.ERROR_CODE_LOAD_CAPTURE_FAILED, f'Failed to load {request.filepath}: file is empty')
+
+        # Files written by SaveCapture are restored exactly, anything else becomes a default synthetic capture
+        saved = None
+        try:
+            saved = json.loads(data)
+        except ValueError:
+            pass
+        if not isinstance(saved, dict) or saved.get('format') != _CAPTURE_FILE_FORMAT:
+            saved = {}
+
+        capture = self._server._add_capture(
+            digital_channels=saved.get('digital_channels', self._server.loaded_capture_digital_channels),
+            analog_channels=saved.get('analog_channels', self._server.loaded_capture_analog_channels),
+            digital_sample_rate=saved.get('digital_sample_rate', 0),
+            analog_sample_rate=saved.get('analog_sample_rate', self._server.analog_sample_rate),
+            start_time_ns=saved.get('start_time_ns'),
+        )
+        capture.duration_seconds = saved.get('duration_seconds', self._server.loaded_capture_duration_seconds)
+        capture.done.set()
+
+        return saleae_pb2.LoadCaptureReply(capture_info=saleae_pb2.CaptureInfo(capture_id=capture.capture_id))
+
+    @_rpc
+    def SaveCapture(self, request, context):
+        capture = self._capture(request.capture_id)
+        try:
+            with _phase('disk_write'):
+                _write_capture_file(request.filepath, capture, begin_seconds=0.0, end_seconds=capture.length_seconds)
+        except OSError as exc:
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Failed to save {request.filepath}: {exc}')
+        return saleae_pb2.SaveCaptureReply()
+
+    @_rpc
+    def CloseCapture(self, request, context):
+        capture = self._capture(request.capture_id)
+        capture.finish()
+        with self._server._lock:
+            self._server._captures.pop(request.capture_id, None)
+        return saleae_pb2.CloseCaptureReply()
+
+    @_rpc
+    def AddAnalyzer(self, request, context):
+        capture = self._capture(request.capture_id)
+        analyzer = self._server._add_analyzer(capture, request.analyzer_name, request.analyzer_label)
+        return saleae_pb2.AddAnalyzerReply(analyzer_id=analyzer.analyzer_id)
+
+    @_rpc
+    def RemoveAnalyzer(self, request, context):
+        capture = self._capture(request.capture_id)
+        self._analyzer(capture, request.analyzer_id)
+        del capture.analyzers[request.analyzer_id]
+        return saleae_pb2.RemoveAnalyzerReply()
+
+    def _check_extension_directory(self, extension_directory: str):
+        if not os.path.isfile(os.path.join(extension_directory, 'extension.json')):
+            raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'{extension_directory} does not contain extension.json')
+
+    @_rpc
+    def AddHighLevelAnalyzer(self, request, context):
+        capture = self._capture(request.capture_id)
+        self._check_extension_directory(request.extension_directory)
+        self._analyzer(capture, request.input_analyzer_id)
+        analyzer = self._server._add_analyzer(capture, request.hla_name, request.hla_label, is_high_level=True)
+        return saleae_pb2.AddHighLevelAnalyzerReply(analyzer_id=analyzer.analyzer_id)
+
+    @_rpc
+    def RemoveHighLevelAnalyzer(self, request, context):
+        capture = self._capture(request.capture_id)
+        self._analyzer(capture, request.analyzer_id)
+        del capture.analyzers[request.analyzer_id]
+        return saleae_pb2.RemoveHighLevelAnalyzerReply()
+
+    @_rpc
+    def AddAnalyzers(self, request, context):
+        capture = self._capture(request.capture_id)
+
+        # Validate every entry first, so that nothing is added if any entry is invalid
+        for index, entry in enumerate(request.analyzers):
+            if entry.WhichOneof('entry') == 'high_level_analyzer':
+                hla = entry.high_level_analyzer
+                self._check_extension_directory(hla.extension_directory)
+                if hla.WhichOneof('input_analyzer') == 'input_analyzer_index':
+                    if hla.input_analyzer_index >= index:
+                        raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST,
+                                     f'Entry {index} refers to entry {hla.input_analyzer_index}, which is not an earlier entry')
+                else:
+                    self._analyzer(capture, hla.input_analyzer_id)
+            elif entry.WhichOneof('entry') is None:
+                raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Entry {index} is empty')
+
+        analyzer_ids = []
+        for entry in request.analyzers:
+            if entry.WhichOneof('entry') == 'analyzer':
+                analyzer = self._server._add_analyzer(capture, entry.analyzer.analyzer_name, entry.analyzer.analyzer_label)
+            else:
+                hla = entry.high_level_analyzer
+                analyzer = self._server._add_analyzer(capture, hla.hla_name, hla.hla_label, is_high_level=True)
+            analyzer_ids.append(analyzer.analyzer_id)
+
+        return saleae_pb2.AddAnalyzersReply(analyzer_ids=analyzer_ids)
+
+    @_rpc
+    def ExportRawDataCsv(self, request, context):
+        capture = self._capture(request.capture_id)
+        digital_channels, analog_channels = _requested_channels(capture, request)
+        downsample = _downsample_ratio(request.analog_downsample_ratio)
+        os.makedirs(request.directory, exist_ok=True)
+
+        begin, end = _export_window(capture, request)
+
+        def format_time(t: float) -> str:
+            return _iso8601(capture.start_time_ns, t) if request.iso8601_timestamp else f'{t:.9f}'
+
+        if digital_channels:
+            with _phase('decode'):
+                rows = list(self._server._digital_rows(capture, digital_channels, begin, end))
+            with _phase('disk_write'), open(os.path.join(request.directory, 'digital.csv'), 'w', newline='') as f:
+                f.write(','.join(['Time [s]'] + [f'Channel {c}' for c in digital_channels]) + '\n')
+                for t, states in rows:
+                    f.write(format_time(t) + ',' + ','.join(str(s) for s in states) + '\n')
+
+        if analog_channels:
+            first, stop = self._server._sample_range(capture, downsample, begin, end)
+            with _phase('decode'):
+                samples = [self._server._analog_samples(capture, c, downsample, first, stop) for c in analog_channels]
+            period = downsample / capture.analog_sample_rate
+            with _phase('disk_write'), open(os.path.join(request.directory, 'analog.csv'), 'w', newline='') as f:
+                f.write(','.join(['Time [s]'] + [f'Channel {c}' for c in analog_channels]) + '\n')
+                for i in range(len(samples[0])):
+                    f.write(format_time((first + i) * period) + ',' + ','.join(f'{s[i]:.3f}' for s in samples) + '\n')
+
+        return saleae_pb2.ExportRawDataCsvReply()
+
+    @_rpc
+    def ExportRawDataBinary(self, request, context):
+        capture = self._capture(request.capture_id)
+        digital_channels, analog_channels = _requested_channels(capture, request)
+        downsample = _downsample_ratio(request.analog_downsample_ratio)
+        os.makedirs(request.directory, exist_ok=True)
+
+        begin, end = _export_window(capture, request)
+
+        for channel in digital_channels:
+            with _phase('decode'):
+                initial_state = self._server._digital_state(capture, channel, begin)
+                transitions = self._server._digital_transitions(capture, channel, begin, end)
+            with _phase('disk_write'), open(os.path.join(request.directory, f'digital_{channel}.bin'), 'wb') as f:
+                f.write(_BINARY_HEADER.pack(b'<SALEAE>', 0, 0))
+                f.write(_BINARY_DIGITAL_HEADER_V0.pack(initial_state, begin, end, len(transitions)))
+                f.write(_to_little_endian(transitions))
+
+        first, stop = self._server._sample_range(capture, downsample, begin, end)
+        for channel in analog_channels:
+            with _phase('decode'):
+                samples = self._server._analog_samples(capture, channel, downsample, first, stop)
+            with _phase('disk_write'), open(os.path.join(request.directory, f'analog_{channel}.bin'), 'wb') as f:
+                f.write(_BINARY_HEADER.pack(b'<SALEAE>', 0, 1))
+                f.write(_BINARY_ANALOG_HEADER_V0.pack(first * downsample / capture.analog_sample_rate,
+                                                      capture.analog_sample_rate, downsample, len(samples)))
+                f.write(_to_little_endian(samples))
+
+        return saleae_pb2.ExportRawDataBinaryReply()
+
+    @_rpc
+    def StreamRawData(self, request, context):
+        capture = self._capture(request.capture_id)
+        digital_channels, analog_channels = _requested_channels(capture, request)
+        downsample = _downsample_ratio(request.analog_downsample_ratio)
+        chunk_size = request.max_chunk_size or _DEFAULT_MAX_CHUNK_SIZE
+        end_time = capture.length_seconds
+
+        for channel in digital_channels:
+            transitions = self._server._digital_transitions(capture, channel)
+            begin_time = 0.0
+            state = 0
+            for start in range(0, max(len(transitions), 1), chunk_size):
+                chunk = transitions[start:start + chunk_size]
+                is_last = start + chunk_size >= len(transitions)
+                chunk_end = end_time if is_last else transitions[start + chunk_size]
+                yield saleae_pb2.StreamRawDataReply(digital_chunk=saleae_pb2.DigitalDataChunk(
+                    channel_index=channel, initial_state=state, begin_time=begin_time, end_time=chunk_end,
+                    transition_times=chunk))
+                state ^= len(chunk) & 1
+                begin_time = chunk_end
+
+        period = downsample / capture.analog_sample_rate
+        for channel in analog_channels:
+            samples = self._server._analog_samples(capture, channel, downsample)
+            for start in range(0, max(len(samples), 1), chunk_size):
+                yield saleae_pb2.StreamRawDataReply(analog_chunk=saleae_pb2.AnalogDataChunk(
+                    channel_index=channel, begin_time=start * period, sample_rate=capture.analog_sample_rate,
+                    downsample=downsample, samples=samples[start:start + chunk_size]))
+
+    def _data_table_frames(self, capture: _FakeCapture, analyzers, filter, begin: float = 0.0,
+                           end: Optional[float] = None) -> Tuple[Dict[int, int], Iterator[_FakeFrame]]:
+        """
+        Returns the radix type of each requested analyzer, and their frames that start in [begin, end) in time order,
+        filtered by `filter`.
+        """
+        radix_types = {}
+        for config in analyzers:
+            self._analyzer(capture, config.analyzer_id)
+            radix_types[config.analyzer_id] = config.radix_type
+
+        frames = heapq.merge(*(self._server._frames(capture, capture.analyzers[analyzer_id], begin, end)
+                               for analyzer_id in radix_types),
+                             key=lambda frame: frame.start_time)
+
+        query = filter.query.lower() if filter is not None else ''
+        if query:
+            columns = list(filter.columns) or (['name', 'type'] + _DATA_TABLE_VALUE_COLUMNS)
+
+            def matches(frame: _FakeFrame) -> bool:
+                values = {
+                    'name': frame.analyzer.display_name,
+                    'type': frame.type,
+                    'value': _format_radix(frame.value, radix_types[frame.analyzer.analyzer_id]),
+                }
+                return any(query in values.get(column, '').lower() for column in columns)
+            frames = (frame for frame in frames if matches(frame))
+
+        return radix_types, frames
+
+    @_rpc
+    def ExportDataTableCsv(self, request, context):
+        capture = self._capture(request.capture_id)
+        radix_types, frames = self._data_table_frames(
+            capture, request.analyzers, request.filter if request.HasField('filter') else None,
+            *_export_window(capture, request))
+
+        export_columns = set(request.export_columns)
+        columns = [c for c in _DATA_TABLE_STANDARD_COLUMNS + _DATA_TABLE_VALUE_COLUMNS
+                   if c == 'name' or not export_columns or c in export_columns]
+
+        try:
+            if request.format in (saleae_pb2.DATA_TABLE_EXPORT_FORMAT_ARROW_IPC, saleae_pb2.DATA_TABLE_EXPORT_FORMAT_PARQUET):
+                with _phase('disk_write'):
+                    _write_columnar_data_table(request.filepath, request.format, columns, frames,
+                                               capture.start_time_ns if request.iso8601_timestamp else None)
+                return saleae_pb2.ExportDataTableCsvReply()
+
+            with _phase('disk_write'), open(request.filepath, 'w', newline='') as f:
+                f.write(','.join(c if c in _DATA_TABLE_STANDARD_COLUMNS else f'"{c}"' for c in columns) + '\n')
+                writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
+                for frame in frames:
+                    values = {
+                        'name': frame.analyzer.display_name,
+                        'type': frame.type,
+                        'start_time': frame.start_time,
+                        'duration': frame.duration,
+                        'value': _format_radix(frame.value, radix_types[frame.analyzer.analyzer_id]),
+                    }
+                    writer.writerow([values[c] for c in columns])
+        except OSError as exc:
+            raise _Abort(saleae_pb2.ERROR_CODE_EXPORT_FAILED, f'Failed to export {request.filepath}: {exc}')
+
+        return saleae_pb2.ExportDataTableCsvReply()
+
+    @_rpc
+    def StreamDataTable(self, request, context):
+        capture = self._capture(request.capture_id)
+        radix_types, frames = self._data_table_frames(
+            capture, request.analyzers, request.filter if request.HasField('filter') else None)
+
+        export_columns = list(request.export_columns)
+        columns = [c for c in _DATA_TABLE_VALUE_COLUMNS if not export_columns or c in export_columns]
+        rows_per_reply = request.max_rows_per_reply or _DEFAULT_MAX_ROWS_PER_REPLY
+
+        reply = saleae_pb2.StreamDataTableReply(columns=columns)
+        for frame in frames:
+            radix_type = radix_types[frame.analyzer.analyzer_id]
+            if radix_type == saleae_pb2.RADIX_TYPE_UNSPECIFIED:
+                value = saleae_pb2.DataTableValue(int64_value=frame.value)
+            else:
+                value = saleae_pb2.DataTableValue(string_value=_format_radix(frame.value, radix_type))
+
+            reply.rows.append(saleae_pb2.DataTableRow(
+                analyzer_id=frame.analyzer.analyzer_id, type=frame.type, start_time=frame.start_time,
+                duration=frame.duration, values=[value for _ in columns]))
+            if len(reply.rows) >= rows_per_reply:
+                yield reply
+                reply = saleae_pb2.StreamDataTableReply()
+
+        if len(reply.rows) > 0 or len(reply.columns) > 0:
+            yield reply
+
+    @_rpc
+    def LegacyExportAnalyzer(self, request, context):
+        capture = self._capture(request.capture_id)
+        analyzer = self._analyzer(capture, request.analyzer_id)
+        begin, end = _export_window(capture, request)
+
+        try:
+            with _phase('disk_write'), open(request.filepath, 'w') as f:
+                f.write('Time [s],Value\n')
+                for frame in self._server._frames(capture, analyzer, begin, end):
+                    f.write(f'{frame.start_time:.9f},{_format_radix(frame.value, request.radix_type)}\n')
+        except OSError as exc:
+            raise _Abort(saleae_pb2.ERROR_CODE_EXPORT_FAILED, f'Failed to export {request.filepath}: {exc}')
+
+        return saleae_pb2.LegacyExportAnalyzerReply()
+
+    @_rpc
+    def ExportMany(self, request, context):
+        self._capture(request.capture_id)
+        kinds = []
+        for index, entry in enumerate(request.exports):
+            kind = entry.WhichOneof('export')
+            if kind is None:
+                raise _Abort(saleae_pb2.ERROR_CODE_INVALID_REQUEST, f'Entry {index} is empty')
+            kinds.append(kind)
+
+        start_time = time.perf_counter()
+
+        def run(entry, kind: str) -> saleae_pb2.ExportResult:
+            export_start_time = time.perf_counter()
+            export_request = getattr(entry, kind)
+            export_request.capture_id = request.capture_id
+
+            # Each export behaves exactly like the corresponding single export request, including its latency
+            method_name = _EXPORT_MANY_METHODS[kind]
+            result = saleae_pb2.ExportResult(queued_seconds=export_start_time - start_time)
+            try:
+                self._server._apply_latency(method_name)
+                getattr(_FakeManagerServicer, method_name).__wrapped__(self, export_request, context)
+            except _Abort as exc:
+                result.error_code = exc.error_code
+                result.error_message = exc.message
+            result.duration_seconds = time.perf_counter() - export_start_time
+            return result
+
+        max_workers = request.max_parallel_exports or _DEFAULT_MAX_PARALLEL_EXPORTS
+        with _phase('export'), futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                          thread_name_prefix='FakeLogic2Export') as executor:
+            results = list(executor.map(run, request.exports, kinds))
+
+        return saleae_pb2.ExportManyReply(results=results)
+
+
+class FakeLogic2Server:
+    """
+    A local gRPC server that implements the Logic 2 automation API with synthetic captures.
+
+    The server runs on background threads in the current process. Use it as a context manager, or call start() and
+    stop() directly.
+    """
+
+    def __init__(self,
+                 *,
+                 port: int = 0,
+                 address: str = '127.0.0.1',
+                 latency_seconds: float = 0.0,
+                 method_latency_seconds: Optional[Dict[str, float]] = None,
+                 devices: Optional[List[DeviceDesc]] = None,
+                 loaded_capture_duration_seconds: float = 1.0,
+                 loaded_capture_digital_channels: Optional[List[int]] = None,
+                 loaded_capture_analog_channels: Optional[List[int]] = None,
+                 digital_transitions_per_second: float = 1000.0,
+                 analog_sample_rate: int = 50_000,
+                 analyzer_frames_per_second: float = 100.0,
+                 capture_bytes_per_second: float = 10_000_000.0,
+                 trigger_delay_seconds: float = 0.0,
+                 max_workers: int = 16):
+        """
+        :param port: Port to listen on. If 0, a free port is chosen, which is available from the `port` property once started.
+        :param address: Address to listen on.
+        :param latency_seconds: Delay added to the start of every request, to simulate a slower server.
+        :param method_latency_seconds: Per-method delay, keyed by RPC name (e.g. "ExportRawDataCsv"). Overrides latency_seconds.
+        :param devices: Devices returned by GetDevices. Defaults to the simulation devices that Logic 2 provides.
+                        Include a device with is_simulation=False to allow starting captures without a device id.
+        :param loaded_capture_duration_seconds: Length of the data in captures loaded with LoadCapture.
+        :param loaded_capture_digital_channels: Digital channels in loaded captures. Defaults to channels 0-3.
+        :param loaded_capture_analog_channels: Analog channels in loaded captures. Defaults to channels 0-1.
+        :param digital_transitions_per_second: Transition rate of digital channel 0. Channel N toggles N + 1 times slower.
+        :param analog_sample_rate: Analog sample rate of loaded captures, and of started captures that don't specify one.
+        :param analyzer_frames_per_second: Number of frames each analyzer produces per second of capture.
+        :param capture_bytes_per_second: Rate at which started captures fill their capture buffer. Timed and trigger
+                                         captures end with OutOfMemoryError when the buffer is full.
+        :param trigger_delay_seconds: Time from the start of a DigitalTriggerCaptureMode capture until its trigger is found.
+        :param max_workers: Number of requests that can be handled concurrently.
+        """
+        self.address = address
+        self.latency_seconds = latency_seconds
+        self.method_latency_seconds = dict(method_latency_seconds or {})
+        self.devices = list(_SIMULATION_DEVICES if devices is None else devices)
+        self.loaded_capture_duration_seconds = loaded_capture_duration_seconds
+        self.loaded_capture_digital_channels = [0, 1, 2, 3] if loaded_capture_digital_channels is None else loaded_capture_digital_channels
+        self.loaded_capture_analog_channels = [0, 1] if loaded_capture_analog_channels is None else loaded_capture_analog_channels
+        self.digital_transitions_per_second = digital_transitions_per_second
+        self.analog_sample_rate = analog_sample_rate
+        self.analyzer_frames_per_second = analyzer_frames_per_second
+        self.capture_bytes_per_second = capture_bytes_per_second
+        self.trigger_delay_seconds = trigger_delay_seconds
+
+        self._requested_port = port
+        self._port: Optional[int] = None
+        self._max_workers = max_workers
+        self._server: Optional[grpc.Server] = None
+
+        self._lock = threading.Lock()
+        self._captures: Dict[int, _FakeCapture] = {}
+        self._next_capture_id = 1
+        self._next_analyzer_id = 1
+
+        #: Number of requests received, keyed by RPC name
+        self.call_counts: Dict[str, int] = {}
+
+    @property
+    def port(self) -> int:
+        """
+        Port the server is listening on.
+        """
+        if self._port is None:
+            raise RuntimeError('FakeLogic2Server has not been started')
+        return self._port
+
+    @property
+    def num_open_captures(self) -> int:
+        """
+        Number of captures that have been started or loaded, and not closed.
+        """
+        with self._lock:
+            return len(self._captures)
+
+    def start(self) -> 'FakeLogic2Server':
+        """
+        Start listening for requests.
+        """
+        if self._server is not None:
+            raise RuntimeError('FakeLogic2Server has already been started')
+
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='FakeLogic2Server'))
+        saleae_pb2_grpc.add_ManagerServicer_to_server(_FakeManagerServicer(self), server)
+        port = server.add_insecure_port(f'{self.address}:{self._requested_port}')
+        if port == 0:
+            raise RuntimeError(f'FakeLogic2Server failed to listen on {self.address}:{self._requested_port}')
+
+        server.start()
+        self._server = server
+        self._port = port
+        return self
+
+    def stop(self, grace: Optional[float] = None):
+        """
+        Stop the server. Requests in progress are cancelled after `grace` seconds.
+        """
+        if self._server is None:
+            return
+
+        self._server.stop(grace).wait()
+        self._server = None
+
+        with self._lock:
+            captures = list(self._captures.values())
+            self._captures.clear()
+        for capture in captures:
+            capture.finish()
+
+    def wait(self):
+        """
+        Block until the server is stopped.
+        """
+        if self._server is not None:
+            self._server.wait_for_termination()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _before_call(self, method_name: str):
+        with self._lock:
+            self.call_counts[method_name] = self.call_counts.get(method_name, 0) + 1
+
+        self._apply_latency(method_name)
+
+    def _apply_latency(self, method_name: str):
+        latency = self.method_latency_seconds.get(method_name, self.latency_seconds)
+        if latency > 0:
+            time.sleep(latency)
+
+    def _add_capture(self, *, start_time_ns: Optional[int] = None, **kwargs) -> _FakeCapture:
+        with self._lock:
+            capture = _FakeCapture(capture_id=self._next_capture_id,
+                                   start_time_ns=time.time_ns() if start_time_ns is None else start_time_ns,
+                                   **kwargs)
+            self._next_capture_id += 1
+            self._captures[capture.capture_id] = capture
+        return capture
+
+    def _add_analyzer(self, capture: _FakeCapture, name: str, label: str, is_high_level: bool = False) -> _FakeAnalyzer:
+        with self._lock:
+            analyzer = _FakeAnalyzer(analyzer_id=self._next_analyzer_id, name=name, label=label, is_high_level=is_high_level)
+            self._next_analyzer_id += 1
+        capture.analyzers[analyzer.analyzer_id] = analyzer
+        return analyzer
+
+    def _record_segments(self, capture: _FakeCapture, directory: str, file_name_prefix: str, segment_seconds: float):
+        """
+        Runs on a separate thread for each segmented capture, and saves a segment every `segment_seconds`.
+        """
+        def save_segment(end_seconds: float):
+            index = len(capture.segments)
+            filepath = os.path.abspath(os.path.join(directory, f'{file_name_prefix}{index:04d}.sal'))
+            try:
+                _write_capture_file(filepath, capture, begin_seconds=capture.segment_begin_seconds, end_seconds=end_seconds)
+            except OSError as exc:
+                capture.fail(_Abort(saleae_pb2.ERROR_CODE_INTERNAL_EXCEPTION, f'Failed to save segment {filepath}: {exc}'))
+                return
+
+            segment = saleae_pb2.CaptureSegment(index=index, filepath=filepath, begin_time=capture.segment_begin_seconds,
+                                                end_time=end_seconds, size_bytes=os.path.getsize(filepath))
+            with capture.segments_changed:
+                capture.segments.append(segment)
+                capture.segment_begin_seconds = end_seconds
+                capture.segments_changed.notify_all()
+
+        try:
+            while True:
+                end_seconds = capture.segment_begin_seconds + segment_seconds
+                timeout = None if math.isinf(end_seconds) else max(end_seconds - capture.length_seconds, 0.0)
+                if capture.done.wait(timeout):
+                    # Stopped: the remaining data becomes the final segment
+                    if capture.error is None and capture.length_seconds > capture.segment_begin_seconds:
+                        save_segment(capture.length_seconds)
+                    break
+
+                save_segment(end_seconds)
+                if capture.max_segments > 0 and len(capture.segments) >= capture.max_segments:
+                    capture.duration_seconds = end_seconds
+                    capture.done.set()
+                    break
+        finally:
+            with capture.segments_changed:
+                capture.segments_complete = True
+                capture.segments_changed.notify_all()
+
+    def _transition_range(self, capture: _FakeCapture, channel: int, begin: float,
+                          end: Optional[float]) -> Tuple[float, int, int]:
+        """
+        Interval between the transitions of a digital channel, and the indices of its transitions in [begin, end).
+        Transition i is at `interval * (i + 1)`.
+        """
+        interval = (channel + 1) / self.digital_transitions_per_second
+        count = max(int(math.ceil(capture.length_seconds / interval)) - 1, 0)
+
+        def time_of(i: int) -> float:
+            return interval * (i + 1)
+        first = _first_at_or_after(begin, time_of, count)
+        stop = count if end is None else max(_first_at_or_after(end, time_of, count), first)
+        return interval, first, stop
+
+    def _digital_transitions(self, capture: _FakeCapture, channel: int, begin: float = 0.0,
+                             end: Optional[float] = None) -> array:
+        """
+        Times of the transitions of a digital channel in [begin, end). Every channel starts low.
+        """
+        interval, first, stop = self._transition_range(capture, channel, begin, end)
+        return array('d', (interval * (i + 1) for i in range(first, stop)))
+
+    def _digital_state(self, capture: _FakeCapture, channel: int, time: float) -> int:
+        """
+        State of a digital channel at `time`, before any transition at exactly `time`.
+        """
+        _, first, _ = self._transition_range(capture, channel, time, time)
+        return first & 1
+
+    def _digital_rows(self, capture: _FakeCapture, channels: List[int], begin: float = 0.0,
+                      end: Optional[float] = None) -> Iterator[Tuple[float, List[int]]]:
+        """
+        Rows of digital.csv: the state of every channel at `begin`, and after every transition in [begin, end).
+        """
+        states = [self._digital_state(capture, channel, begin) for channel in channels]
+        yield begin, list(states)
+
+        transitions = heapq.merge(*([(t, index) for t in self._digital_transitions(capture, channel, begin, end)]
+                                    for index, channel in enumerate(channels)))
+        pending_time = None
+        for t, index in transitions:
+            if pending_time is not None and t != pending_time:
+                yield pending_time, list(states)
+            states[index] ^= 1
+            pending_time = t
+        if pending_time is not None:
+            yield pending_time, list(states)
+
+    def _sample_range(self, capture: _FakeCapture, downsample: int, begin: float = 0.0,
+                      end: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Indices of the analog samples in [begin, end). Sample i is at `i * downsample / analog_sample_rate`.
+        """
+        period = downsample / capture.analog_sample_rate
+        count = int(capture.length_seconds * capture.analog_sample_rate) // downsample
+        first = _first_at_or_after(begin, lambda i: i * period, count)
+        stop = count if end is None else max(_first_at_or_after(end, lambda i: i * period, count), first)
+        return first, stop
+
+    def _analog_samples(self, capture: _FakeCapture, channel: int, downsample: int, first: int = 0,
+                        stop: Optional[int] = None) -> array:
+        """
+        Samples [first, stop) of an analog channel: a 1kHz sine wave, with an amplitude of 1V and an offset of `channel`
+        volts.
+        """
+        period = downsample / capture.analog_sample_rate
+        if stop is None:
+            stop = int(capture.length_seconds * capture.analog_sample_rate) // downsample
+        omega = 2 * math.pi * 1000.0 * period
+        return array('f', (channel + math.sin(omega * i) for i in range(first, stop)))
+
+    def _frames(self, capture: _FakeCapture, analyzer: _FakeAnalyzer, begin: float = 0.0,
+                end: Optional[float] = None) -> Iterator[_FakeFrame]:
+        """
+        Frames produced by an analyzer that start in [begin, end): evenly spaced frames, with values counting up from the
+        analyzer id.
+        """
+        interval = 1.0 / self.analyzer_frames_per_second
+        count = int(capture.length_seconds * self.analyzer_frames_per_second)
+        frame_type = 'frame' if analyzer.is_high_level else 'result'
+        first = _first_at_or_after(begin, lambda i: i * interval, count)
+        stop = count if end is None else max(_first_at_or_after(end, lambda i: i * interval, count), first)
+        for i in range(first, stop):
+            yield _FakeFrame(analyzer=analyzer, type=frame_type, start_time=i * interval, duration=interval / 2,
+                             value=(analyzer.analyzer_id + i) % 256)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake Logic 2 automation server with synthetic captures.')
+    parser.add_argument('--port', type=int, default=10430, help='Port to listen on')
+    parser.add_argument('--address', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='Delay added to every request, in seconds')
+    args = parser.parse_args()
+
+    with FakeLogic2Server(port=args.port, address=args.address, latency_seconds=args.latency) as server:
+        print(f'Fake Logic 2 server listening on {server.address}:{server.port}')
+        try:
+            server.wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
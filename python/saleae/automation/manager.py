@@ -1,17 +1,25 @@
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
-import grpc
 import logging
+import os
 import subprocess
+import threading
 import time
+import weakref
 
 from . import errors
 
 from .capture import Capture
+from .capture_group import CaptureGroup
 
-from saleae.grpc import saleae_pb2, saleae_pb2_grpc
+from ._lazy import grpc, saleae_pb2, saleae_pb2_grpc
+
+if TYPE_CHECKING:
+    from .metrics import ClientMetrics
+    from .tracing import Tracer
 
 logger = logging.getLogger(__name__)
 
@@ -36,23 +44,25 @@ class AppInfo:
 
 
 class DeviceType(Enum):
+    # Values match the DeviceType enum in saleae.proto
+
     #: Saleae Logic
-    LOGIC = saleae_pb2.DEVICE_TYPE_LOGIC
+    LOGIC = 1
 
     #: Saleae Logic 4
-    LOGIC_4 = saleae_pb2.DEVICE_TYPE_LOGIC_4
+    LOGIC_4 = 2
 
     #: Saleae Logic 8
-    LOGIC_8 = saleae_pb2.DEVICE_TYPE_LOGIC_8
+    LOGIC_8 = 3
 
     #: Saleae Logic 16
-    LOGIC_16 = saleae_pb2.DEVICE_TYPE_LOGIC_16
+    LOGIC_16 = 4
 
     #: Saleae Logic Pro 8
-    LOGIC_PRO_8 = saleae_pb2.DEVICE_TYPE_LOGIC_PRO_8
+    LOGIC_PRO_8 = 5
 
     #: Saleae Logic Pro 16
-    LOGIC_PRO_16 = saleae_pb2.DEVICE_TYPE_LOGIC_PRO_16
+    LOGIC_PRO_16 = 6
 
 
 class DeviceConfiguration:
@@ -121,22 +131,25 @@ class LogicDeviceConfiguration(DeviceConfiguration):
 
 
 class DigitalTriggerType(Enum):
+    # Values match the DigitalTriggerType enum in saleae.proto
+
     #: Rising Edge
-    RISING = saleae_pb2.DIGITAL_TRIGGER_TYPE_RISING
+    RISING = 1
 
     #: Falling Edge
-    FALLING = saleae_pb2.DIGITAL_TRIGGER_TYPE_FALLING
+    FALLING = 2
 
     #: High Pulse
-    PULSE_HIGH = saleae_pb2.DIGITAL_TRIGGER_TYPE_PULSE_HIGH
+    PULSE_HIGH = 3
 
     #: Low Pulse
-    PULSE_LOW = saleae_pb2.DIGITAL_TRIGGER_TYPE_PULSE_LOW
+    PULSE_LOW = 4
 
 
 class DigitalTriggerLinkedChannelState(Enum):
-    LOW = saleae_pb2.DIGITAL_TRIGGER_LINKED_CHANNEL_STATE_LOW
-    HIGH = saleae_pb2.DIGITAL_TRIGGER_LINKED_CHANNEL_STATE_HIGH
+    # Values match the DigitalTriggerLinkedChannelState enum in saleae.proto
+    LOW = 1
+    HIGH = 2
 
 
 @dataclass
@@ -208,8 +221,37 @@ class ManualCaptureMode:
     trim_data_seconds: Optional[float] = None
 
 
+@dataclass
+class SegmentedCaptureMode:
+    """
+    When this is used, the capture is saved to a new .sal file every `segment_duration_seconds`, or whenever the data
+    since the last segment reaches `segment_size_megabytes`, whichever comes first. Saved data is freed from the capture
+    buffer, so the capture can record for much longer than the buffer would otherwise allow, e.g. for soak tests.
+
+    Note: use Capture.iter_segments() to receive each segment once it has been saved. Use the stop() command to stop
+    the capture, which saves the remaining data as a final segment. The wait() function can only be used if
+    max_segments is specified.
+    """
+
+    #: Directory to save segments in. It will be created if it does not exist.
+    directory: str
+
+    #: Length of each segment, in seconds. If unspecified, segments are only limited by size.
+    segment_duration_seconds: Optional[float] = None
+
+    #: Maximum size of each segment, in megabytes. If unspecified, segments are only limited by time.
+    #: At least one of segment_duration_seconds and segment_size_megabytes must be specified.
+    segment_size_megabytes: Optional[int] = None
+
+    #: Segment files are named "<file_name_prefix><index>.sal". If unspecified, "segment_" is used.
+    file_name_prefix: Optional[str] = None
+
+    #: Number of segments to record before the capture ends. If unspecified, the capture runs until it is stopped.
+    max_segments: Optional[int] = None
+
+
 CaptureMode = Union[ManualCaptureMode,
-                    TimedCaptureMode, DigitalTriggerCaptureMode]
+                    TimedCaptureMode, DigitalTriggerCaptureMode, SegmentedCaptureMode]
 
 
 @dataclass
@@ -230,12 +272,279 @@ class CaptureConfiguration:
     |   This will record until the specified duration has been captured. Use the wait() function to block until the capture is complete.
     | DigitalTriggerCaptureMode
     |   This will set the digital trigger and record until the trigger has been found and the post-trigger length has been recorded. Use the wait() function to block until the capture is complete.
+    | SegmentedCaptureMode
+    |   This will record until stopped, saving the capture to a new file every N seconds or megabytes. Use Capture.iter_segments() to receive the saved files.
     """
 
 
+@dataclass
+class CaptureGroupDevice:
+    """
+    The settings for one device of a capture group started with start_capture_group()
+    """
+
+    #: The id of the device to record with
+    device_id: str
+
+    #: The device configuration, for example an instance of LogicDeviceConfiguration
+    device_configuration: DeviceConfiguration
+
+    #: Capture configuration for this device. If unspecified, the capture_configuration passed to start_capture_group() is used.
+    capture_configuration: Optional[CaptureConfiguration] = None
+
+
 _DEFAULT_GRPC_ADDRESS = '127.0.0.1'
 _DEFAULT_GRPC_PORT = 10430
 
+# Bounds of the exponential backoff used while waiting for the Logic 2 software to accept requests
+_CONNECT_RETRY_INITIAL_DELAY_SECONDS = 0.01
+_CONNECT_RETRY_MAX_DELAY_SECONDS = 0.5
+
+# gRPC waits at least 1 second between reconnection attempts by default, which adds up to a second of latency when
+# connecting to a Logic 2 instance that is still starting up.
+_DEFAULT_RECONNECT_CHANNEL_ARGUMENTS = [
+    ('grpc.initial_reconnect_backoff_ms', 10),
+    ('grpc.min_reconnect_backoff_ms', 10),
+    ('grpc.max_reconnect_backoff_ms', 100),
+]
+
+
+def _channel_arguments(grpc_channel_arguments: Optional[List[Tuple[str, Any]]]) -> List[Tuple[str, Any]]:
+    """
+    Add the default reconnection arguments to the user's gRPC channel arguments, unless they are already specified.
+    """
+    arguments = list(grpc_channel_arguments or [])
+    specified = set(name for name, _ in arguments)
+    arguments.extend((name, value) for name, value in _DEFAULT_RECONNECT_CHANNEL_ARGUMENTS if name not in specified)
+    return arguments
+
+
+def _launch_logic2_process(application_path: Optional[Union[Path, str]], port: int) -> subprocess.Popen:
+    """
+    Start a Logic 2 process with the automation server enabled on `port`.
+    """
+    # Attempt to find application
+    import platform
+    import os
+
+    system = platform.system()
+
+    def fail(reason: str):
+        raise RuntimeError(f"Logic2 application not found: {reason}")
+
+    if application_path is None:
+        if system == 'Linux':
+            raise RuntimeError(f"launch_application() not supported on Linux without `application_path` specified")
+        elif system == 'Windows':
+            program_files_path = os.environ.get('programw6432')
+            if program_files_path is None:
+                fail('"Program Files" not found')
+
+            logic2_bin = os.path.join(program_files_path, 'Logic', 'Logic.exe')
+
+            if not os.path.exists(logic2_bin):
+                fail('Logic2 install not found. Go to https://www.saleae.com/downloads/ to download the installer.')
+        elif system == 'Darwin':
+            raise RuntimeError(f"launch_application() not supported on MacOS without `application_path` specified")
+        else:
+            raise RuntimeError(f"Unknown system: {system}")
+    else:
+        logic2_bin = str(application_path)
+        if not os.path.exists(logic2_bin):
+            fail(f'application path "{application_path}" does not exist')
+
+    process = subprocess.Popen([logic2_bin, '--automation', '--automationPort', str(port)],
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+
+    if system == 'Windows':
+        import win32job
+        import win32api
+        import win32con
+
+        # On Windows, we use a job to ensure that the child process is shutdown when this process exits
+        job = win32job.CreateJobObject(None, 'Logic2Monitor')
+
+        # Configure job to kill child process when this process exits
+        limits = win32job.QueryInformationJobObject(job, win32job.JobObjectExtendedLimitInformation)
+        limits['BasicLimitInformation']['LimitFlags'] = win32job.JOB_OBJECT_LIMIT_KILL_ON_JOB_CLOSE
+        win32job.SetInformationJobObject(job, win32job.JobObjectExtendedLimitInformation, limits)
+
+        # Get handle to child process and assign job
+        child_process_handle = win32api.OpenProcess(win32con.PROCESS_ALL_ACCESS, False, process.pid)
+        win32job.AssignProcessToJobObject(job, child_process_handle)
+
+        # Attach the job to the process object so that it does not get garbage collected during the lifetime of the Popen object
+        process.__saleae_win32_job = job
+
+    return process
+
+
+def _check_app_info(app_info: AppInfo, logic2_process: Optional[subprocess.Popen]):
+    """
+    Validate the AppInfo returned by a newly connected Logic 2 instance.
+    """
+    if logic2_process:
+        if logic2_process.pid != app_info.app_pid:
+            raise errors.Logic2AlreadyRunningError()
+
+    if app_info.api_version.major != saleae_pb2.THIS_API_VERSION_MAJOR:
+        logger.error(
+                "Incompatible Saleae Automation API Version encountered."
+                + f"Supported Major Version={saleae_pb2.THIS_API_VERSION_MAJOR}, "
+                + f"Logic2 Version={app_info.api_version.major}.{app_info.api_version.minor}.{app_info.api_version.patch}"
+            )
+        raise errors.IncompatibleApiVersionError()
+
+
+def _start_capture_request(
+    *,
+    device_configuration: DeviceConfiguration,
+    device_id: Optional[str],
+    capture_configuration: Optional[CaptureConfiguration],
+) -> 'saleae_pb2.StartCaptureRequest':
+    request = saleae_pb2.StartCaptureRequest()
+
+    if device_id is not None:
+        request.device_id = device_id
+
+    if isinstance(device_configuration, LogicDeviceConfiguration):
+        request.logic_device_configuration.logic_channels.CopyFrom(
+            saleae_pb2.LogicChannels(
+                digital_channels=device_configuration.enabled_digital_channels,
+                analog_channels=device_configuration.enabled_analog_channels,
+            )
+        )
+
+        if device_configuration.analog_sample_rate is not None:
+            request.logic_device_configuration.analog_sample_rate = (
+                device_configuration.analog_sample_rate
+            )
+        if device_configuration.digital_sample_rate is not None:
+            request.logic_device_configuration.digital_sample_rate = (
+                device_configuration.digital_sample_rate
+            )
+        if device_configuration.digital_threshold_volts is not None:
+            request.logic_device_configuration.digital_threshold_volts = (
+                device_configuration.digital_threshold_volts
+            )
+        request.logic_device_configuration.glitch_filters.extend(
+            [
+                saleae_pb2.GlitchFilterEntry(
+                    channel_index=glitch_filter.channel_index,
+                    pulse_width_seconds=glitch_filter.pulse_width_seconds,
+                )
+                for glitch_filter in device_configuration.glitch_filters
+            ]
+        )
+    else:
+        raise TypeError("Invalid device configuration type")
+
+    if capture_configuration is not None:
+        if capture_configuration.buffer_size_megabytes:
+            request.capture_configuration.buffer_size_megabytes = (
+                capture_configuration.buffer_size_megabytes
+            )
+
+        if capture_configuration.capture_mode is not None:
+            trigger = capture_configuration.capture_mode
+
+            if isinstance(trigger, ManualCaptureMode):
+                request.capture_configuration.manual_capture_mode.CopyFrom(
+                    saleae_pb2.ManualCaptureMode(
+                        trim_data_seconds=trigger.trim_data_seconds
+                    )
+                )
+
+            elif isinstance(trigger, TimedCaptureMode):
+                request.capture_configuration.timed_capture_mode.CopyFrom(
+                    saleae_pb2.TimedCaptureMode(
+                        duration_seconds=trigger.duration_seconds,
+                        trim_data_seconds=trigger.trim_data_seconds,
+                    )
+                )
+
+            elif isinstance(trigger, DigitalTriggerCaptureMode):
+                request.capture_configuration.digital_capture_mode.CopyFrom(
+                    saleae_pb2.DigitalTriggerCaptureMode(
+                        trigger_channel_index=trigger.trigger_channel_index,
+                        trigger_type=trigger.trigger_type.value,
+                        min_pulse_width_seconds=trigger.min_pulse_width_seconds,
+                        max_pulse_width_seconds=trigger.max_pulse_width_seconds,
+                        after_trigger_seconds=trigger.after_trigger_seconds,
+                        trim_data_seconds=trigger.trim_data_seconds,
+                        linked_channels=[
+                            saleae_pb2.DigitalTriggerLinkedChannel(
+                                channel_index=linked_channel.channel_index,
+                                state=linked_channel.state.value,
+                            )
+                            for linked_channel in trigger.linked_channels
+                        ],
+                    )
+                )
+            elif isinstance(trigger, SegmentedCaptureMode):
+                request.capture_configuration.segmented_capture_mode.CopyFrom(
+                    saleae_pb2.SegmentedCaptureMode(
+                        directory=trigger.directory,
+                        segment_duration_seconds=trigger.segment_duration_seconds,
+                        segment_size_megabytes=trigger.segment_size_megabytes,
+                        file_name_prefix=trigger.file_name_prefix,
+                        max_segments=trigger.max_segments,
+                    )
+                )
+            else:
+                raise TypeError("Unexpected trigger type")
+
+    return request
+
+
+def _app_info_from_reply(reply: 'saleae_pb2.GetAppInfoReply') -> AppInfo:
+    return AppInfo(
+        api_version=Version(
+            major=reply.app_info.api_version.major,
+            minor=reply.app_info.api_version.minor,
+            patch=reply.app_info.api_version.patch,
+        ),
+        app_version=reply.app_info.application_version,
+        app_pid=reply.app_info.launch_pid,
+    )
+
+
+def _devices_from_reply(reply: 'saleae_pb2.GetDevicesReply') -> List[DeviceDesc]:
+    devices = []
+    for device in reply.devices:
+        devices.append(DeviceDesc(
+            device_id=device.device_id,
+            device_type=DeviceType(device.device_type),
+            is_simulation=device.is_simulation,
+        ))
+
+    return devices
+
+
+def _buffer_size_bytes(capture_configuration: Optional[CaptureConfiguration]) -> int:
+    if capture_configuration is None or capture_configuration.buffer_size_megabytes is None:
+        return 0
+    return capture_configuration.buffer_size_megabytes * 1024 * 1024
+
+
+@dataclass
+class _LoadedCapture:
+    capture_id: int
+    ref_count: int
+
+
+@dataclass
+class _OpenCapture:
+    # Estimated memory used by the capture in the Logic 2 software
+    memory_bytes: int
+    # Captures are not closed to stay within the budget while they are recording
+    is_recording: bool
+    # Number of requests or streams that are using the capture, which is not closed to stay within the budget until 0
+    in_use: int = 0
+    # Capture objects that refer to this capture
+    captures: 'weakref.WeakSet[Capture]' = field(default_factory=weakref.WeakSet)
+
 
 class Manager:
     """
@@ -250,6 +559,12 @@ class Manager:
                  connect_timeout_seconds: Optional[float] = None,
                  grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None,
                  logic2_process: Optional[subprocess.Popen] = None,
+                 metrics: Optional['ClientMetrics'] = None,
+                 tracer: Optional['Tracer'] = None,
+                 reuse_loaded_captures: bool = False,
+                 max_open_captures: Optional[int] = None,
+                 max_capture_memory_bytes: Optional[int] = None,
+                 evicted_capture_directory: Optional[Union[Path, str]] = None,
                  ):
         """
         It is recommended that you use Manager.launch() or Manager.connect() instead of using __init__ directly.
@@ -265,17 +580,69 @@ class Manager:
         :param grpc_channel_arguments: A set of arguments to pass through to gRPC.
         :param logic2_process: Process object for Logic2 if launched from Python. The process will be shutdown automatically when
                                Manager.close() is called.
+        :param metrics: If specified, the latency, errors and size of every request made by this Manager are recorded here.
+        :param tracer: If specified, a span is recorded here for every request made by this Manager.
+        :param reuse_loaded_captures: If True, load_capture() returns the capture that is already open for a file, instead
+                                      of loading it again. See load_capture().
+        :param max_open_captures: Maximum number of captures to keep open. When a capture is opened beyond this, the
+                                  least recently used captures are closed. See enforce_capture_budget().
+        :param max_capture_memory_bytes: Maximum estimated memory used by the open captures, see max_open_captures.
+        :param evicted_capture_directory: If specified, captures closed to stay within the budget are saved to this
+                                          directory first, as `<capture id>.sal`.
 
         """
         self.logic2_process = logic2_process
-        self.channel = grpc.insecure_channel(f"{address}:{port}", options=grpc_channel_arguments)
-        self.channel.subscribe(lambda value: logger.info(f"sub {value}"))
-        self._stub = saleae_pb2_grpc.ManagerStub(self.channel)
+
+        #: Metrics recorded for this Manager, if enabled with the `metrics` parameter
+        self.metrics = metrics
+
+        #: Tracer that records the requests made by this Manager, if enabled with the `tracer` parameter
+        self.tracer = tracer
+
+        # Captures opened by load_capture(), keyed by (path, mtime, size), if enabled with `reuse_loaded_captures`
+        self._loaded_captures: Optional[Dict[Tuple[str, int, int], _LoadedCapture]] = \
+            {} if reuse_loaded_captures else None
+        self._loaded_captures_lock = threading.Lock()
+
+        #: Maximum number of open captures, or None for no limit. See enforce_capture_budget().
+        self.max_open_captures = max_open_captures
+
+        #: Maximum estimated memory used by the open captures, or None for no limit
+        self.max_capture_memory_bytes = max_capture_memory_bytes
+
+        #: Directory that captures closed to stay within the budget are saved to, or None to close them without saving
+        self.evicted_capture_directory = evicted_capture_directory
+
+        # Captures opened by this Manager that are still open, from least to most recently used
+        self._open_captures: 'OrderedDict[int, _OpenCapture]' = OrderedDict()
+        self._open_captures_lock = threading.Lock()
+        # Captures that enforce_capture_budget() is saving or closing
+        self._closing_capture_ids: Set[int] = set()
+
+        self.channel = grpc.insecure_channel(f"{address}:{port}", options=_channel_arguments(grpc_channel_arguments))
+        # Subscribed once connected, so that channel_ready_future() starts the connection attempt without delay. It is
+        # unsubscribed before the channel is closed, otherwise gRPC keeps polling the closed channel from its own thread.
+        self._connectivity_callback = lambda value: logger.info(f"gRPC channel connectivity changed to {value}")
+
+        # Interceptors are only installed on the channel used by the stub. The underlying channel is kept for connectivity
+        # state and for closing.
+        interceptors = []
+        if metrics is not None:
+            interceptors.append(metrics._interceptor())
+        if tracer is not None:
+            interceptors.append(tracer._interceptor())
+        stub_channel = grpc.intercept_channel(self.channel, *interceptors) if interceptors else self.channel
+        self._stub = saleae_pb2_grpc.ManagerStub(stub_channel)
+
+        # The handshake bypasses the interceptors, so retries while the server starts up are not recorded as errors.
+        # The time it takes is reported in connect_latency_seconds instead.
+        handshake_stub = saleae_pb2_grpc.ManagerStub(self.channel)
 
         connect_timeout_seconds = 20.0 if connect_timeout_seconds is None else connect_timeout_seconds
 
         def cleanup():
             # Immediately close the gRPC channel to avoid the process from hanging
+            self.channel.unsubscribe(self._connectivity_callback)
             self.channel.close()
 
             # Close the Logic2 process if it was launched from here
@@ -285,39 +652,58 @@ class Manager:
 
         # Attempt to connect to endpoint
         start_time = time.monotonic()
+        deadline = start_time + connect_timeout_seconds
+        retry_delay_seconds = _CONNECT_RETRY_INITIAL_DELAY_SECONDS
         while True:
             try:
-                app_info = self.get_app_info()
-
-                if logic2_process:
-                    if logic2_process.pid != app_info.app_pid:
-                        raise errors.Logic2AlreadyRunningError()
-
-                if app_info.api_version.major != saleae_pb2.THIS_API_VERSION_MAJOR:
-                    logger.error(
-                            "Incompatible Saleae Automation API Version encountered."
-                            + f"Supported Major Version={saleae_pb2.THIS_API_VERSION_MAJOR}, "
-                            + f"Logic2 Version={app_info.api_version.major}.{app_info.api_version.minor}.{app_info.api_version.patch}"
-                        )
-                    raise errors.IncompatibleApiVersionError()
-
+                # Block until the channel reports that it is connected, instead of repeatedly issuing requests while
+                # the server is starting up. On timeout, fall through so the failure surfaces as the usual UNAVAILABLE
+                # error from GetAppInfo.
+                ready_future = grpc.channel_ready_future(self.channel)
+                try:
+                    ready_future.result(timeout=max(deadline - time.monotonic(), 0.0))
+                except grpc.FutureTimeoutError:
+                    ready_future.cancel()
+
+                with errors._error_handler():
+                    reply: saleae_pb2.GetAppInfoReply = handshake_stub.GetAppInfo(saleae_pb2.GetAppInfoRequest())
+                _check_app_info(_app_info_from_reply(reply), logic2_process)
                 break
             except grpc.RpcError as exc:
                 now = time.monotonic()
-                if (exc.code() != grpc.StatusCode.UNAVAILABLE) or (now - start_time) >= connect_timeout_seconds:
+                if (exc.code() != grpc.StatusCode.UNAVAILABLE) or now >= deadline:
                     # Rethrow if X seconds have passed or this is not a connection error
                     cleanup()
                     raise exc from None
+
+                # The channel can be connected before the server is ready to handle requests, so back off before retrying
+                time.sleep(min(retry_delay_seconds, deadline - now))
+                retry_delay_seconds = min(retry_delay_seconds * 2, _CONNECT_RETRY_MAX_DELAY_SECONDS)
             except Exception as exc:
                 cleanup()
                 raise exc from None
 
+        self.channel.subscribe(self._connectivity_callback)
+
+        #: Time, in seconds, from the creation of the gRPC channel until the Logic 2 software responded to GetAppInfo
+        self.connect_latency_seconds: float = time.monotonic() - start_time
+
+        #: Time, in seconds, from launching the Logic 2 process until the connection was established.
+        #: This is only set for Managers created with Manager.launch(), and is None otherwise.
+        self.launch_latency_seconds: Optional[float] = None
+
     @classmethod
     def launch(cls,
                application_path: Optional[Union[Path, str]] = None,
                connect_timeout_seconds: Optional[float] = None,
                grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None,
-               port: Optional[int] = None) -> 'Manager':
+               port: Optional[int] = None,
+               metrics: Optional['ClientMetrics'] = None,
+               tracer: Optional['Tracer'] = None,
+               reuse_loaded_captures: bool = False,
+               max_open_captures: Optional[int] = None,
+               max_capture_memory_bytes: Optional[int] = None,
+               evicted_capture_directory: Optional[Union[Path, str]] = None) -> 'Manager':
         """
         Launch the Logic2 application and shut it down when the returned Manager is closed.
 
@@ -326,72 +712,35 @@ class Manager:
         :param connect_timeout_seconds: See __init__
         :param grpc_channel_arguments: See __init__
         :param port: Port to use for the gRPC server. If not specified, 10430 will be used.
+        :param metrics: See __init__
+        :param tracer: See __init__
+        :param reuse_loaded_captures: See __init__
+        :param max_open_captures: See __init__
+        :param max_capture_memory_bytes: See __init__
+        :param evicted_capture_directory: See __init__
 
         """
 
-        # Attempt to find application
-        import platform
-        import os
-
-        system = platform.system()
-
-        def fail(reason: str):
-            raise RuntimeError(f"Logic2 application not found: {reason}")
-
-        if application_path is None:
-            if system == 'Linux':
-                raise RuntimeError(f"launch_application() not supported on Linux without `application_path` specified")
-            elif system == 'Windows':
-                program_files_path = os.environ.get('programw6432')
-                if program_files_path is None:
-                    fail('"Program Files" not found')
-
-                logic2_bin = os.path.join(program_files_path, 'Logic', 'Logic.exe')
-
-                if not os.path.exists(logic2_bin):
-                    fail('Logic2 install not found. Go to https://www.saleae.com/downloads/ to download the installer.')
-            elif system == 'Darwin':
-                raise RuntimeError(f"launch_application() not supported on MacOS without `application_path` specified")
-            else:
-                raise RuntimeError(f"Unknown system: {system}")
-        else:
-            logic2_bin = str(application_path)
-            if not os.path.exists(logic2_bin):
-                fail(f'application path "{application_path}" does not exist')
-
         if port is None:
             port = _DEFAULT_GRPC_PORT
 
-        process = subprocess.Popen([logic2_bin, '--automation', '--automationPort', str(port)],
-                                   stdout=subprocess.DEVNULL,
-                                   stderr=subprocess.DEVNULL)
-
-        if system == 'Windows':
-            import win32job
-            import win32api
-            import win32con
-
-            # On Windows, we use a job to ensure that the child process is shutdown when this process exits
-            job = win32job.CreateJobObject(None, 'Logic2Monitor')
-
-            # Configure job to kill child process when this process exits
-            limits = win32job.QueryInformationJobObject(job, win32job.JobObjectExtendedLimitInformation)
-            limits['BasicLimitInformation']['LimitFlags'] = win32job.JOB_OBJECT_LIMIT_KILL_ON_JOB_CLOSE
-            win32job.SetInformationJobObject(job, win32job.JobObjectExtendedLimitInformation, limits)
-
-            # Get handle to child process and assign job
-            child_process_handle = win32api.OpenProcess(win32con.PROCESS_ALL_ACCESS, False, process.pid)
-            win32job.AssignProcessToJobObject(job, child_process_handle)
-
-            # Attach the job to the process object so that it does not get garbage collected during the lifetime of the Popen object
-            process.__saleae_win32_job = job
+        launch_time = time.monotonic()
+        process = _launch_logic2_process(application_path, port)
 
-        return cls(
+        manager = cls(
             address=_DEFAULT_GRPC_ADDRESS,
             port=port,
             logic2_process=process,
             connect_timeout_seconds=connect_timeout_seconds,
-            grpc_channel_arguments=grpc_channel_arguments)
+            grpc_channel_arguments=grpc_channel_arguments,
+            metrics=metrics,
+            tracer=tracer,
+            reuse_loaded_captures=reuse_loaded_captures,
+            max_open_captures=max_open_captures,
+            max_capture_memory_bytes=max_capture_memory_bytes,
+            evicted_capture_directory=evicted_capture_directory)
+        manager.launch_latency_seconds = time.monotonic() - launch_time
+        return manager
 
     @classmethod
     def connect(cls,
@@ -399,19 +748,37 @@ class Manager:
                 address: str = _DEFAULT_GRPC_ADDRESS,
                 port: int = _DEFAULT_GRPC_PORT,
                 connect_timeout_seconds: Optional[float] = None,
-                grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None) -> 'Manager':
+                grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None,
+                metrics: Optional['ClientMetrics'] = None,
+                tracer: Optional['Tracer'] = None,
+                reuse_loaded_captures: bool = False,
+                max_open_captures: Optional[int] = None,
+                max_capture_memory_bytes: Optional[int] = None,
+                evicted_capture_directory: Optional[Union[Path, str]] = None) -> 'Manager':
         """Connect to an existing instance of Logic 2.
 
         :param port: Port number. By default, Logic 2 uses port 10430.
         :param address: Address to connect to.
         :param connect_timeout_seconds: See __init__
         :param grpc_channel_arguments: See __init__
+        :param metrics: See __init__
+        :param tracer: See __init__
+        :param reuse_loaded_captures: See __init__
+        :param max_open_captures: See __init__
+        :param max_capture_memory_bytes: See __init__
+        :param evicted_capture_directory: See __init__
         """
 
         return cls(address=address,
                    port=port,
                    connect_timeout_seconds=connect_timeout_seconds,
-                   grpc_channel_arguments=grpc_channel_arguments)
+                   grpc_channel_arguments=grpc_channel_arguments,
+                   metrics=metrics,
+                   tracer=tracer,
+                   reuse_loaded_captures=reuse_loaded_captures,
+                   max_open_captures=max_open_captures,
+                   max_capture_memory_bytes=max_capture_memory_bytes,
+                   evicted_capture_directory=evicted_capture_directory)
 
     def get_app_info(self) -> AppInfo:
         """Get information about the connected Logic 2 instance.
@@ -421,25 +788,25 @@ class Manager:
         with errors._error_handler():
             reply: saleae_pb2.GetAppInfoReply = self.stub.GetAppInfo(saleae_pb2.GetAppInfoRequest())
 
-        return AppInfo(
-            api_version=Version(
-                major=reply.app_info.api_version.major,
-                minor=reply.app_info.api_version.minor,
-                patch=reply.app_info.api_version.patch,
-            ),
-            app_version=reply.app_info.application_version,
-            app_pid=reply.app_info.launch_pid,
-        )
+        return _app_info_from_reply(reply)
 
     def close(self):
         """
         Close connection to Saleae backend, and shut it down if it was created by Manager.
 
         """
+        self.channel.unsubscribe(self._connectivity_callback)
         self.channel.close()
         self.channel = None
         self._stub = None
 
+        if self._loaded_captures is not None:
+            with self._loaded_captures_lock:
+                self._loaded_captures.clear()
+
+        with self._open_captures_lock:
+            self._open_captures.clear()
+
         if self.logic2_process:
             import signal
 
@@ -451,7 +818,7 @@ class Manager:
             self.logic2_process = None
 
     @property
-    def stub(self) -> saleae_pb2_grpc.ManagerStub:
+    def stub(self) -> 'saleae_pb2_grpc.ManagerStub':
         """
         :meta private:
         """
@@ -469,15 +836,7 @@ class Manager:
         with errors._error_handler():
             reply: saleae_pb2.GetDevicesReply = self.stub.GetDevices(request)
 
-        devices = []
-        for device in reply.devices:
-            devices.append(DeviceDesc(
-                device_id=device.device_id,
-                device_type=DeviceType(device.device_type),
-                is_simulation=device.is_simulation,
-            ))
-
-        return devices
+        return _devices_from_reply(reply)
 
     def start_capture(
         self,
@@ -497,93 +856,103 @@ class Manager:
         :param capture_configuration: The capture configuration, which selects the capture mode: timer, digital trigger, or manual., defaults to None, indicating manual mode.
         :return: Capture instance class. Be sure to call either wait() or stop() before trying to save, export, or close the capture.
         """
-        request = saleae_pb2.StartCaptureRequest()
+        request = _start_capture_request(
+            device_configuration=device_configuration,
+            device_id=device_id,
+            capture_configuration=capture_configuration,
+        )
 
-        if device_id is not None:
-            request.device_id = device_id
+        with errors._error_handler():
+            reply: saleae_pb2.StartCaptureReply = self.stub.StartCapture(
+                request)
 
-        if isinstance(device_configuration, LogicDeviceConfiguration):
-            request.logic_device_configuration.logic_channels.CopyFrom(
-                saleae_pb2.LogicChannels(
-                    digital_channels=device_configuration.enabled_digital_channels,
-                    analog_channels=device_configuration.enabled_analog_channels,
-                )
-            )
+        return self._track_capture(Capture(self, reply.capture_info.capture_id),
+                                   memory_bytes=_buffer_size_bytes(capture_configuration), is_recording=True)
 
-            if device_configuration.analog_sample_rate is not None:
-                request.logic_device_configuration.analog_sample_rate = (
-                    device_configuration.analog_sample_rate
-                )
-            if device_configuration.digital_sample_rate is not None:
-                request.logic_device_configuration.digital_sample_rate = (
-                    device_configuration.digital_sample_rate
-                )
-            if device_configuration.digital_threshold_volts is not None:
-                request.logic_device_configuration.digital_threshold_volts = (
-                    device_configuration.digital_threshold_volts
-                )
-            request.logic_device_configuration.glitch_filters.extend(
-                [
-                    saleae_pb2.GlitchFilterEntry(
-                        channel_index=glitch_filter.channel_index,
-                        pulse_width_seconds=glitch_filter.pulse_width_seconds,
-                    )
-                    for glitch_filter in device_configuration.glitch_filters
-                ]
-            )
-        else:
-            raise TypeError("Invalid device configuration type")
+    def start_capture_group(
+        self,
+        *,
+        devices: List[CaptureGroupDevice],
+        capture_configuration: Optional[CaptureConfiguration] = None,
+    ) -> CaptureGroup:
+        """Start a capture on several devices at once
 
-        if capture_configuration is not None:
-            if capture_configuration.buffer_size_megabytes:
-                request.capture_configuration.buffer_size_megabytes = (
-                    capture_configuration.buffer_size_megabytes
-                )
+        The start requests for all devices are sent back-to-back without waiting for replies, which keeps the skew between
+        the start of each capture as small as possible. The measured offsets are available in CaptureGroup.start_offsets_seconds.
 
-            if capture_configuration.capture_mode is not None:
-                trigger = capture_configuration.capture_mode
+        If any of the captures fail to start, the captures that did start are stopped and closed, and the first error is raised.
 
-                if isinstance(trigger, ManualCaptureMode):
-                    request.capture_configuration.manual_capture_mode.CopyFrom(
-                        saleae_pb2.ManualCaptureMode(
-                            trim_data_seconds=trigger.trim_data_seconds
-                        )
-                    )
+        Be sure to catch DeviceError exceptions raised by this function, and handle them accordingly. See the error section of the library documentation.
 
-                elif isinstance(trigger, TimedCaptureMode):
-                    request.capture_configuration.timed_capture_mode.CopyFrom(
-                        saleae_pb2.TimedCaptureMode(
-                            duration_seconds=trigger.duration_seconds,
-                            trim_data_seconds=trigger.trim_data_seconds,
-                        )
-                    )
+        :param devices: The devices to record with, and their configurations.
+        :param capture_configuration: The capture configuration used for each device that does not specify its own, defaults to None, indicating manual mode.
+        :return: CaptureGroup instance. Be sure to call either wait() or stop() before trying to save, export, or close the captures.
+        """
+        requests = [
+            _start_capture_request(
+                device_configuration=device.device_configuration,
+                device_id=device.device_id,
+                capture_configuration=capture_configuration if device.capture_configuration is None else device.capture_configuration,
+            )
+            for device in devices
+        ]
+
+        reply_times = [0.0] * len(requests)
+        replied = [threading.Event() for _ in requests]
+
+        def on_reply(index: int):
+            def callback(_future):
+                reply_times[index] = time.monotonic()
+                replied[index].set()
+            return callback
+
+        # Requests are built up front so that nothing delays issuing them
+        futures = [self.stub.StartCapture.future(request) for request in requests]
+        for index, future in enumerate(futures):
+            future.add_done_callback(on_reply(index))
+
+        captures: List[Capture] = []
+        first_error = None
+        for device, future in zip(devices, futures):
+            try:
+                with errors._error_handler():
+                    reply: saleae_pb2.StartCaptureReply = future.result()
+                captures.append(self._track_capture(
+                    Capture(self, reply.capture_info.capture_id),
+                    memory_bytes=_buffer_size_bytes(
+                        capture_configuration if device.capture_configuration is None else device.capture_configuration),
+                    is_recording=True, enforce_budget=False))
+            except Exception as exc:
+                if first_error is None:
+                    first_error = exc
 
-                elif isinstance(trigger, DigitalTriggerCaptureMode):
-                    request.capture_configuration.digital_capture_mode.CopyFrom(
-                        saleae_pb2.DigitalTriggerCaptureMode(
-                            trigger_channel_index=trigger.trigger_channel_index,
-                            trigger_type=trigger.trigger_type.value,
-                            min_pulse_width_seconds=trigger.min_pulse_width_seconds,
-                            max_pulse_width_seconds=trigger.max_pulse_width_seconds,
-                            after_trigger_seconds=trigger.after_trigger_seconds,
-                            trim_data_seconds=trigger.trim_data_seconds,
-                            linked_channels=[
-                                saleae_pb2.DigitalTriggerLinkedChannel(
-                                    channel_index=linked_channel.channel_index,
-                                    state=linked_channel.state.value,
-                                )
-                                for linked_channel in trigger.linked_channels
-                            ],
-                        )
-                    )
-                else:
-                    raise TypeError("Unexpected trigger type")
+        if first_error is not None:
+            group = CaptureGroup(self, [], captures, [])
+            try:
+                group.stop()
+            except Exception:
+                pass
+            try:
+                group.close()
+            except Exception:
+                pass
+            raise first_error
 
-        with errors._error_handler():
-            reply: saleae_pb2.StartCaptureReply = self.stub.StartCapture(
-                request)
+        # Done callbacks run on a gRPC thread, and may complete slightly after result() returns
+        for event in replied:
+            event.wait()
+
+        first_reply_time = min(reply_times, default=0.0)
 
-        return Capture(self, reply.capture_info.capture_id)
+        # The budget is only enforced once every capture of the group has started, so that none of them are delayed
+        self.enforce_capture_budget()
+
+        return CaptureGroup(
+            self,
+            device_ids=[device.device_id for device in devices],
+            captures=captures,
+            start_offsets_seconds=[t - first_reply_time for t in reply_times],
+        )
 
     def load_capture(self, filepath: str) -> "Capture":
         """
@@ -591,16 +960,265 @@ class Manager:
 
         The returned Capture object will be fully loaded (`wait_until_done` not required).
 
+        If the Manager was created with `reuse_loaded_captures=True`, and the same file (by path, modification time and
+        size) is already open from an earlier call, the open capture is returned instead of loading it again. Each call
+        returns a separate Capture object, and the capture is only closed in the Logic 2 software once all of them have
+        been closed. Analyzers added through one of them are part of the shared capture.
+
         Raises:
             InvalidFileError
 
         :return: Capture instance class.
         """
+        try:
+            stat: Optional[os.stat_result] = os.stat(filepath)
+        except OSError:
+            # Let the Logic 2 software report the error
+            stat = None
+
+        if self._loaded_captures is None or stat is None:
+            capture_id = self._load_capture(filepath)
+            return self._track_capture(Capture(self, capture_id), memory_bytes=stat.st_size if stat else 0)
+        key = (os.path.realpath(filepath), stat.st_mtime_ns, stat.st_size)
+
+        with self._loaded_captures_lock:
+            loaded = self._loaded_captures.get(key)
+            if loaded is not None:
+                loaded.ref_count += 1
+                return self._track_capture(self._shared_capture(loaded.capture_id, key), memory_bytes=stat.st_size)
+
+        # The lock isn't held while loading, so other files can be loaded in the meantime
+        capture_id = self._load_capture(filepath)
+
+        duplicate_capture_id = None
+        with self._loaded_captures_lock:
+            loaded = self._loaded_captures.get(key)
+            if loaded is None:
+                self._loaded_captures[key] = _LoadedCapture(capture_id=capture_id, ref_count=1)
+            else:
+                # Another thread loaded the same file at the same time
+                loaded.ref_count += 1
+                duplicate_capture_id, capture_id = capture_id, loaded.capture_id
+
+        if duplicate_capture_id is not None:
+            Capture(self, duplicate_capture_id).close()
+        return self._track_capture(self._shared_capture(capture_id, key), memory_bytes=stat.st_size)
+
+    def _load_capture(self, filepath: str) -> int:
         request = saleae_pb2.LoadCaptureRequest(filepath=filepath)
         with errors._error_handler():
             reply: saleae_pb2.LoadCaptureReply = self.stub.LoadCapture(request)
 
-        return Capture(self, reply.capture_info.capture_id)
+        return reply.capture_info.capture_id
+
+    def _shared_capture(self, capture_id: int, key: Tuple[str, int, int]) -> Capture:
+        capture = Capture(self, capture_id)
+        capture._loaded_capture_key = key
+        return capture
+
+    def _release_loaded_capture(self, key: Tuple[str, int, int]) -> bool:
+        """
+        Release a reference to a capture returned by load_capture(). Returns True if it was the last reference, and the
+        capture should be closed.
+        """
+        with self._loaded_captures_lock:
+            loaded = self._loaded_captures.get(key)
+            if loaded is None:
+                return True
+            loaded.ref_count -= 1
+            if loaded.ref_count > 0:
+                return False
+            del self._loaded_captures[key]
+            return True
+
+    def _forget_loaded_capture(self, capture_id: int):
+        """
+        Remove a capture that was closed by the Manager from the captures returned by load_capture().
+        """
+        if self._loaded_captures is None:
+            return
+        with self._loaded_captures_lock:
+            for key, loaded in list(self._loaded_captures.items()):
+                if loaded.capture_id == capture_id:
+                    del self._loaded_captures[key]
+
+    def _track_capture(self, capture: Capture, *, memory_bytes: int, is_recording: bool = False,
+                       enforce_budget: bool = True) -> Capture:
+        """
+        Add a Capture to the open captures, as the most recently used, and close other captures if over the budget.
+        """
+        capture_id = capture._capture_id
+        with self._open_captures_lock:
+            open_capture = self._open_captures.get(capture_id)
+            if open_capture is None:
+                open_capture = _OpenCapture(memory_bytes=memory_bytes, is_recording=is_recording)
+                self._open_captures[capture_id] = open_capture
+            else:
+                self._open_captures.move_to_end(capture_id)
+            open_capture.captures.add(capture)
+
+        if enforce_budget:
+            self.enforce_capture_budget()
+        return capture
+
+    def _touch_capture(self, capture_id: int):
+        """
+        Mark a capture as the most recently used.
+        """
+        with self._open_captures_lock:
+            if capture_id in self._open_captures:
+                self._open_captures.move_to_end(capture_id)
+
+    def _acquire_capture(self, capture_id: int):
+        """
+        Mark a capture as in use, and as the most recently used, until _release_capture() is called.
+        """
+        with self._open_captures_lock:
+            if capture_id in self._closing_capture_ids:
+                raise RuntimeError(
+                    f'Capture {capture_id} is being closed by the Manager to stay within its capture budget')
+            open_capture = self._open_captures.get(capture_id)
+            if open_capture is not None:
+                open_capture.in_use += 1
+                self._open_captures.move_to_end(capture_id)
+
+    def _release_capture(self, capture_id: int):
+        with self._open_captures_lock:
+            open_capture = self._open_captures.get(capture_id)
+            if open_capture is not None and open_capture.in_use > 0:
+                open_capture.in_use -= 1
+
+    def _update_capture(self, capture_id: int, *, memory_bytes: Optional[int] = None,
+                        is_recording: Optional[bool] = None):
+        with self._open_captures_lock:
+            open_capture = self._open_captures.get(capture_id)
+            if open_capture is None:
+                return
+            if memory_bytes is not None:
+                open_capture.memory_bytes = memory_bytes
+            if is_recording is not None:
+                open_capture.is_recording = is_recording
+
+    def _untrack_capture(self, capture_id: int):
+        with self._open_captures_lock:
+            self._open_captures.pop(capture_id, None)
+
+    @property
+    def num_open_captures(self) -> int:
+        """Number of captures opened by this Manager that have not been closed"""
+        with self._open_captures_lock:
+            return len(self._open_captures)
+
+    @property
+    def open_capture_memory_bytes(self) -> int:
+        """
+        Estimated memory used by the captures opened by this Manager that have not been closed.
+
+        Loaded captures are estimated by the size of their file. Started captures are estimated by their buffer size,
+        until progress() reports the number of bytes captured.
+        """
+        with self._open_captures_lock:
+            return sum(open_capture.memory_bytes for open_capture in self._open_captures.values())
+
+    def enforce_capture_budget(self) -> List[int]:
+        """
+        Close the least recently used captures until the open captures are within `max_open_captures` and
+        `max_capture_memory_bytes`. Captures that are still recording, captures with a request or stream in progress,
+        and the capture that was opened last, are never closed. If `evicted_capture_directory` is set, each capture is
+        saved there before it is closed.
+
+        This is called automatically whenever a capture is started or loaded. A capture is used whenever one of its
+        methods is called.
+
+        Once a capture has been closed this way, its Capture objects raise RuntimeError when used. Captures that fail to
+        save are left open.
+
+        :return: Ids of the captures that were closed.
+        """
+        if self.max_open_captures is None and self.max_capture_memory_bytes is None:
+            return []
+
+        # Captures are chosen with the lock held, but the requests are made without it
+        evicted: List[Tuple[int, _OpenCapture]] = []
+        with self._open_captures_lock:
+            num_captures = len(self._open_captures)
+            memory_bytes = sum(open_capture.memory_bytes for open_capture in self._open_captures.values())
+            newest_capture_id = next(reversed(self._open_captures), None)
+            for capture_id, open_capture in list(self._open_captures.items()):
+                over_count = self.max_open_captures is not None and num_captures > self.max_open_captures
+                over_memory = self.max_capture_memory_bytes is not None and memory_bytes > self.max_capture_memory_bytes
+                if not over_count and not over_memory:
+                    break
+                if capture_id == newest_capture_id or open_capture.is_recording or open_capture.in_use > 0:
+                    continue
+                del self._open_captures[capture_id]
+                self._closing_capture_ids.add(capture_id)
+                evicted.append((capture_id, open_capture))
+                num_captures -= 1
+                memory_bytes -= open_capture.memory_bytes
+
+        closed = []
+        for capture_id, open_capture in evicted:
+            saved_filepath = None
+            try:
+                if self.evicted_capture_directory is not None:
+                    saved_filepath = os.path.abspath(os.path.join(self.evicted_capture_directory, f'{capture_id}.sal'))
+                    request = saleae_pb2.SaveCaptureRequest(capture_id=capture_id, filepath=saved_filepath)
+                    with errors._error_handler():
+                        self.stub.SaveCapture(request)
+                with errors._error_handler():
+                    self.stub.CloseCapture(saleae_pb2.CloseCaptureRequest(capture_id=capture_id))
+            except Exception as exc:
+                logger.warning(f'Failed to close capture {capture_id} to stay within the capture budget: {exc}')
+                with self._open_captures_lock:
+                    self._open_captures[capture_id] = open_capture
+                    self._closing_capture_ids.discard(capture_id)
+                continue
+
+            self._forget_loaded_capture(capture_id)
+            message = f'Capture {capture_id} was closed by the Manager to stay within its capture budget'
+            if saved_filepath is not None:
+                message += f', and saved to "{saved_filepath}"'
+            for capture in list(open_capture.captures):
+                capture._closed(message, saved_filepath)
+            with self._open_captures_lock:
+                self._closing_capture_ids.discard(capture_id)
+            closed.append(capture_id)
+
+        return closed
+
+    def close_all(self):
+        """
+        Close every capture opened by this Manager that has not been closed yet, including captures whose Capture
+        objects are no longer referenced.
+
+        The close requests are sent without waiting for each other. If any of them fail, the first error is raised once
+        all of them have completed. Afterwards, the Capture objects raise RuntimeError when used.
+        """
+        with self._open_captures_lock:
+            open_captures = list(self._open_captures.items())
+            self._open_captures.clear()
+
+        if self._loaded_captures is not None:
+            with self._loaded_captures_lock:
+                self._loaded_captures.clear()
+
+        futures = [self.stub.CloseCapture.future(saleae_pb2.CloseCaptureRequest(capture_id=capture_id))
+                   for capture_id, _ in open_captures]
+
+        first_error = None
+        for (capture_id, open_capture), future in zip(open_captures, futures):
+            try:
+                with errors._error_handler():
+                    future.result()
+            except Exception as exc:
+                if first_error is None:
+                    first_error = exc
+            for capture in list(open_capture.captures):
+                capture._closed(f'Capture {capture_id} was closed by Manager.close_all()', None)
+
+        if first_error is not None:
+            raise first_error
 
     def __enter__(self):
         return self
@@ -0,0 +1,221 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+import queue
+import threading
+import time
+
+from .manager import Manager, _DEFAULT_GRPC_ADDRESS, _DEFAULT_GRPC_PORT
+
+if TYPE_CHECKING:
+    from .metrics import ClientMetrics
+    from .tracing import Tracer
+
+T = TypeVar('T')
+
+
+class ManagerPool:
+    """
+    ManagerPool distributes jobs across several Logic 2 instances.
+
+    Each instance can only process so much work at once, so for offline processing (loading captures, adding analyzers,
+    and exporting), running several instances side by side can make better use of the available cores.
+
+    Jobs are submitted with submit() or submit_capture(), and run on whichever instance is idle. Each instance runs at
+    most one job at a time. Results are returned as concurrent.futures.Future objects.
+
+    Use ManagerPool.launch() to start new instances of Logic 2, or ManagerPool.connect() to use instances that are already running.
+    """
+
+    def __init__(self, managers: List[Manager]):
+        """
+        It is recommended that you use ManagerPool.launch() or ManagerPool.connect() instead of using __init__ directly.
+
+        :param managers: Connected Manager objects. The pool takes ownership of them, and closes them on shutdown().
+        """
+        if len(managers) == 0:
+            raise RuntimeError("ManagerPool requires at least one Manager")
+
+        self.managers = managers
+
+        self._lock = threading.Lock()
+        self._busy: List[Manager] = []
+        self._idle: 'queue.Queue[Manager]' = queue.Queue()
+        for manager in managers:
+            self._idle.put(manager)
+
+        # One worker per instance, so a worker can always take an idle instance
+        self._executor = ThreadPoolExecutor(max_workers=len(managers), thread_name_prefix='ManagerPool')
+
+    @classmethod
+    def launch(cls,
+               num_instances: int,
+               application_path: Optional[Union[Path, str]] = None,
+               *,
+               base_port: int = _DEFAULT_GRPC_PORT,
+               connect_timeout_seconds: Optional[float] = None,
+               grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None,
+               metrics: Optional['ClientMetrics'] = None,
+               tracer: Optional['Tracer'] = None) -> 'ManagerPool':
+        """
+        Launch several instances of the Logic2 application, and shut them down when the pool is shut down.
+
+        Instance `i` uses port `base_port + i`. The instances are launched in parallel.
+
+        :param num_instances: Number of Logic 2 instances to launch.
+        :param application_path: See Manager.launch()
+        :param base_port: gRPC port of the first instance. If not specified, 10430 will be used.
+        :param connect_timeout_seconds: See Manager.__init__
+        :param grpc_channel_arguments: See Manager.__init__
+        :param metrics: See Manager.__init__. The metrics of all instances are recorded together.
+        :param tracer: See Manager.__init__. Use Tracer.job() inside each job to write a trace per job.
+        """
+        def launch(port: int) -> Manager:
+            return Manager.launch(application_path,
+                                  connect_timeout_seconds=connect_timeout_seconds,
+                                  grpc_channel_arguments=grpc_channel_arguments,
+                                  port=port,
+                                  metrics=metrics,
+                                  tracer=tracer)
+
+        return cls._create([base_port + i for i in range(num_instances)], launch)
+
+    @classmethod
+    def connect(cls,
+                ports: List[int],
+                *,
+                address: str = _DEFAULT_GRPC_ADDRESS,
+                connect_timeout_seconds: Optional[float] = None,
+                grpc_channel_arguments: Optional[List[Tuple[str, Any]]] = None,
+                metrics: Optional['ClientMetrics'] = None,
+                tracer: Optional['Tracer'] = None) -> 'ManagerPool':
+        """
+        Connect to several existing instances of Logic 2.
+
+        :param ports: gRPC port of each instance.
+        :param address: Address to connect to.
+        :param connect_timeout_seconds: See Manager.__init__
+        :param grpc_channel_arguments: See Manager.__init__
+        :param metrics: See Manager.__init__. The metrics of all instances are recorded together.
+        :param tracer: See Manager.__init__. Use Tracer.job() inside each job to write a trace per job.
+        """
+        def connect(port: int) -> Manager:
+            return Manager.connect(address=address,
+                                   port=port,
+                                   connect_timeout_seconds=connect_timeout_seconds,
+                                   grpc_channel_arguments=grpc_channel_arguments,
+                                   metrics=metrics,
+                                   tracer=tracer)
+
+        return cls._create(ports, connect)
+
+    @classmethod
+    def _create(cls, ports: List[int], create_manager: Callable[[int], Manager]) -> 'ManagerPool':
+        managers = []
+        first_error = None
+
+        with ThreadPoolExecutor(max_workers=max(len(ports), 1)) as executor:
+            futures = [executor.submit(create_manager, port) for port in ports]
+            for future in futures:
+                try:
+                    managers.append(future.result())
+                except Exception as exc:
+                    if first_error is None:
+                        first_error = exc
+
+        if first_error is not None:
+            for manager in managers:
+                manager.close()
+            raise first_error
+
+        return cls(managers)
+
+    @property
+    def num_instances(self) -> int:
+        """Number of Logic 2 instances in the pool"""
+        return len(self.managers)
+
+    @property
+    def num_busy(self) -> int:
+        """Number of Logic 2 instances that are currently running a job"""
+        with self._lock:
+            return len(self._busy)
+
+    def _run(self, fn: Callable[..., T], args, kwargs) -> T:
+        manager = self._idle.get()
+        with self._lock:
+            self._busy.append(manager)
+        try:
+            return fn(manager, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._busy.remove(manager)
+            self._idle.put(manager)
+
+    def submit(self, fn: Callable[..., T], *args, **kwargs) -> 'Future[T]':
+        """
+        Schedule `fn(manager, *args, **kwargs)` to run on the next idle Logic 2 instance.
+
+        Any captures opened by `fn` should be closed before it returns.
+
+        :param fn: Function to call. The Manager of the instance is passed as the first argument.
+        :return: A Future for the return value of `fn`.
+        """
+        return self._executor.submit(self._run, fn, args, kwargs)
+
+    def submit_capture(self, filepath: str, fn: Callable[..., T], *args, **kwargs) -> 'Future[T]':
+        """
+        Schedule a job that loads a capture, calls `fn(capture, *args, **kwargs)`, and then closes the capture.
+
+        This is a convenience wrapper around submit() for the common load, analyze, export, close pattern.
+
+        :param filepath: Path of the .sal file to load.
+        :param fn: Function to call. The loaded Capture is passed as the first argument.
+        :return: A Future for the return value of `fn`.
+        """
+        def job(manager: Manager) -> T:
+            with manager.load_capture(filepath) as capture:
+                return fn(capture, *args, **kwargs)
+
+        return self.submit(job)
+
+    def map(self, fn: Callable[..., T], *iterables: Iterable[Any], timeout: Optional[float] = None) -> Iterator[T]:
+        """
+        Equivalent to `map(fn, *iterables)`, except that each call runs on an idle Logic 2 instance, with the Manager
+        passed as the first argument.
+
+        See concurrent.futures.Executor.map()
+        """
+        # As with Executor.map(), the timeout is measured from the original call, not from each result
+        deadline = None if timeout is None else time.monotonic() + timeout
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+
+        def results() -> Iterator[T]:
+            try:
+                for future in futures:
+                    if deadline is None:
+                        yield future.result()
+                    else:
+                        yield future.result(timeout=max(deadline - time.monotonic(), 0))
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return results()
+
+    def shutdown(self):
+        """
+        Stop accepting jobs, wait for all submitted jobs to complete, and close every Manager in the pool.
+
+        Instances launched by the pool are shut down.
+        """
+        self._executor.shutdown(wait=True)
+
+        for manager in self.managers:
+            manager.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
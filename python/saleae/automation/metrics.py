@@ -0,0 +1,328 @@
+"""
+Client-side metrics for the requests made to the Logic 2 software.
+
+Pass a ClientMetrics object to Manager.launch(), Manager.connect() or ManagerPool to record metrics for every request
+made by that Manager, then read them with ClientMetrics.snapshot(), or expose them to Prometheus with
+ClientMetrics.to_prometheus_text() or ClientMetrics.start_http_server().
+
+    metrics = automation.ClientMetrics()
+    with automation.Manager.connect(metrics=metrics) as manager:
+        ...
+    print(metrics.to_prometheus_text())
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import http.server
+import math
+import threading
+import time
+
+import grpc
+
+from . import errors
+
+#: Default upper bounds of the latency histogram buckets, in seconds
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_METRIC_PREFIX = 'saleae_automation_rpc'
+
+
+@dataclass
+class MethodMetrics:
+    """
+    Metrics for a single gRPC method, e.g. "LoadCapture".
+    """
+
+    #: Name of the gRPC method
+    method: str
+
+    #: Number of completed requests, including failed and cancelled requests
+    count: int = 0
+
+    #: Number of requests that have been sent, but have not completed
+    in_flight: int = 0
+
+    #: Number of failed requests, keyed by the name of the SaleaeError subclass (e.g. "LoadCaptureFailedError"), or by the
+    #: gRPC status code (e.g. "UNAVAILABLE") for errors that don't come from the Logic 2 software
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    #: Number of requests cancelled by the client, e.g. by breaking out of a loop over Capture.iter_raw_data(). These are
+    #: not counted as errors.
+    cancelled: int = 0
+
+    #: Total serialized size of all request messages, in bytes
+    bytes_sent: int = 0
+
+    #: Total serialized size of all reply messages, in bytes. For streaming requests, this includes every reply.
+    bytes_received: int = 0
+
+    #: Sum of the latency of all completed requests, in seconds
+    latency_sum_seconds: float = 0.0
+
+    #: Cumulative latency histogram, as (upper bound in seconds, number of requests) pairs. The last bound is infinity.
+    latency_buckets: List[Tuple[float, int]] = field(default_factory=list)
+
+    @property
+    def mean_latency_seconds(self) -> Optional[float]:
+        """
+        Mean latency of the completed requests, in seconds, or None if no requests have completed.
+        """
+        return self.latency_sum_seconds / self.count if self.count > 0 else None
+
+
+class _MethodState:
+    def __init__(self, method: str, num_buckets: int):
+        self.metrics = MethodMetrics(method=method)
+        self.bucket_counts = [0] * num_buckets
+
+
+class ClientMetrics:
+    """
+    Records the latency, in-flight count, errors and bytes transferred of each gRPC method.
+
+    A single ClientMetrics object can be shared by several Managers, in which case it records the totals of all of them.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, *, latency_buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        """
+        :param latency_buckets: Upper bounds of the latency histogram buckets, in seconds, in increasing order.
+                                A bucket for all larger values is always added.
+        """
+        if list(latency_buckets) != sorted(latency_buckets):
+            raise ValueError('latency_buckets must be in increasing order')
+
+        self._bounds = [b for b in latency_buckets if b != math.inf] + [math.inf]
+        self._lock = threading.Lock()
+        self._methods: Dict[str, _MethodState] = {}
+
+    def _state(self, method: str) -> _MethodState:
+        state = self._methods.get(method)
+        if state is None:
+            state = _MethodState(method, len(self._bounds))
+            self._methods[method] = state
+        return state
+
+    def _start(self, method: str, bytes_sent: int):
+        with self._lock:
+            state = self._state(method)
+            state.metrics.in_flight += 1
+            state.metrics.bytes_sent += bytes_sent
+
+    def _add_bytes_received(self, method: str, bytes_received: int):
+        with self._lock:
+            self._state(method).metrics.bytes_received += bytes_received
+
+    def _finish(self, method: str, latency_seconds: float, error: Optional[str], *, cancelled: bool = False):
+        with self._lock:
+            state = self._state(method)
+            state.metrics.in_flight -= 1
+            state.metrics.count += 1
+            state.metrics.latency_sum_seconds += latency_seconds
+            for index, bound in enumerate(self._bounds):
+                if latency_seconds <= bound:
+                    state.bucket_counts[index] += 1
+                    break
+            if cancelled:
+                state.metrics.cancelled += 1
+            elif error is not None:
+                state.metrics.errors[error] = state.metrics.errors.get(error, 0) + 1
+
+    def _interceptor(self) -> '_MetricsInterceptor':
+        """
+        :meta private:
+        """
+        return _MetricsInterceptor(self)
+
+    def snapshot(self) -> Dict[str, MethodMetrics]:
+        """
+        Returns a copy of the current metrics, keyed by gRPC method name.
+        """
+        with self._lock:
+            result = {}
+            for method, state in self._methods.items():
+                cumulative = 0
+                buckets = []
+                for bound, count in zip(self._bounds, state.bucket_counts):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+
+                metrics = state.metrics
+                result[method] = MethodMetrics(
+                    method=method,
+                    count=metrics.count,
+                    in_flight=metrics.in_flight,
+                    errors=dict(metrics.errors),
+                    cancelled=metrics.cancelled,
+                    bytes_sent=metrics.bytes_sent,
+                    bytes_received=metrics.bytes_received,
+                    latency_sum_seconds=metrics.latency_sum_seconds,
+                    latency_buckets=buckets,
+                )
+            return result
+
+    def reset(self):
+        """
+        Clear all metrics. Requests that are in flight are still counted when they complete.
+        """
+        with self._lock:
+            for method, state in list(self._methods.items()):
+                in_flight = state.metrics.in_flight
+                self._methods[method] = _MethodState(method, len(self._bounds))
+                self._methods[method].metrics.in_flight = in_flight
+
+    def to_prometheus_text(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        methods = sorted(snapshot)
+        lines = []
+
+        def header(name: str, metric_type: str, help: str):
+            lines.append(f'# HELP {_METRIC_PREFIX}_{name} {help}')
+            lines.append(f'# TYPE {_METRIC_PREFIX}_{name} {metric_type}')
+
+        header('duration_seconds', 'histogram', 'Latency of requests to the Logic 2 software.')
+        for method in methods:
+            metrics = snapshot[method]
+            for bound, count in metrics.latency_buckets:
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(f'{_METRIC_PREFIX}_duration_seconds_bucket{{method="{method}",le="{le}"}} {count}')
+            lines.append(f'{_METRIC_PREFIX}_duration_seconds_sum{{method="{method}"}} {metrics.latency_sum_seconds!r}')
+            lines.append(f'{_METRIC_PREFIX}_duration_seconds_count{{method="{method}"}} {metrics.count}')
+
+        header('in_flight', 'gauge', 'Number of requests to the Logic 2 software that have not completed.')
+        for method in methods:
+            lines.append(f'{_METRIC_PREFIX}_in_flight{{method="{method}"}} {snapshot[method].in_flight}')
+
+        header('errors_total', 'counter', 'Number of failed requests, by error type.')
+        for method in methods:
+            for error, count in sorted(snapshot[method].errors.items()):
+                lines.append(f'{_METRIC_PREFIX}_errors_total{{method="{method}",error="{error}"}} {count}')
+
+        header('cancelled_total', 'counter', 'Number of requests cancelled by the client.')
+        for method in methods:
+            lines.append(f'{_METRIC_PREFIX}_cancelled_total{{method="{method}"}} {snapshot[method].cancelled}')
+
+        header('sent_bytes_total', 'counter', 'Serialized size of all request messages.')
+        for method in methods:
+            lines.append(f'{_METRIC_PREFIX}_sent_bytes_total{{method="{method}"}} {snapshot[method].bytes_sent}')
+
+        header('received_bytes_total', 'counter', 'Serialized size of all reply messages.')
+        for method in methods:
+            lines.append(f'{_METRIC_PREFIX}_received_bytes_total{{method="{method}"}} {snapshot[method].bytes_received}')
+
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port: int, address: str = '127.0.0.1') -> http.server.HTTPServer:
+        """
+        Serve the metrics in the Prometheus text format over HTTP, on a background thread.
+
+        Every path returns the metrics, so Prometheus can be pointed at e.g. http://127.0.0.1:<port>/metrics
+
+        :param port: Port to listen on. If 0, a free port is chosen, which is available as `server.server_address[1]`.
+        :param address: Address to listen on.
+        :return: The HTTP server. Call shutdown() on it to stop serving.
+        """
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((address, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, name='ClientMetricsHttpServer', daemon=True)
+        thread.start()
+        return server
+
+
+def _method_name(full_method: str) -> str:
+    # "/saleae.automation.Manager/LoadCapture" -> "LoadCapture"
+    if isinstance(full_method, bytes):
+        full_method = full_method.decode('utf-8')
+    return full_method.rsplit('/', 1)[-1]
+
+
+def _error_name(exc: grpc.RpcError) -> str:
+    mapped = errors.grpc_error_to_exception(exc)
+    if isinstance(mapped, errors.SaleaeError):
+        return type(mapped).__name__
+    return exc.code().name
+
+
+class _CountingStream:
+    """
+    Wraps the reply iterator of a server-streaming call, and counts the size of each reply.
+    """
+
+    def __init__(self, call, on_reply):
+        self._call = call
+        self._on_reply = on_reply
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        reply = next(self._call)
+        self._on_reply(reply.ByteSize())
+        return reply
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class _MetricsInterceptor(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor):
+    def __init__(self, metrics: ClientMetrics):
+        self._metrics = metrics
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details.method)
+        self._metrics._start(method, request.ByteSize())
+        start_time = time.perf_counter()
+
+        call = continuation(client_call_details, request)
+
+        def done(call):
+            latency = time.perf_counter() - start_time
+            if call.cancelled():
+                # Cancelled by the client, e.g. a wait_future() that is no longer needed
+                self._metrics._finish(method, latency, None, cancelled=True)
+                return
+
+            exc = call.exception()
+            if exc is None:
+                self._metrics._add_bytes_received(method, call.result().ByteSize())
+                self._metrics._finish(method, latency, None)
+            else:
+                self._metrics._finish(method, latency, _error_name(exc))
+
+        call.add_done_callback(done)
+        return call
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        method = _method_name(client_call_details.method)
+        self._metrics._start(method, request.ByteSize())
+        start_time = time.perf_counter()
+
+        call = continuation(client_call_details, request)
+
+        def done(call):
+            latency = time.perf_counter() - start_time
+            if call.cancelled():
+                # Cancelled by the client, e.g. by breaking out of a loop over Capture.iter_raw_data()
+                self._metrics._finish(method, latency, None, cancelled=True)
+                return
+            code = call.code()
+            self._metrics._finish(method, latency, None if code == grpc.StatusCode.OK else _error_name(call))
+
+        call.add_done_callback(done)
+        return _CountingStream(call, lambda size: self._metrics._add_bytes_received(method, size))
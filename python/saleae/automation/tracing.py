@@ -0,0 +1,371 @@
+"""
+Timeline tracing of the requests made to the Logic 2 software.
+
+Pass a Tracer object to Manager.launch(), Manager.connect() or ManagerPool to record a span for every request made by
+that Manager. Group the requests of a job (e.g. start, wait, add analyzers, export, save, close) with Tracer.job(), and
+each job is written to a JSON file that can be opened in Perfetto (https://ui.perfetto.dev) or chrome://tracing.
+
+    tracer = automation.Tracer(output_directory='traces')
+    with automation.Manager.connect(tracer=tracer) as manager:
+        with tracer.job('capture-1'):
+            with manager.start_capture(...) as capture:
+                capture.wait()
+                with tracer.span('export'):
+                    capture.export_raw_data_csv(...)
+
+If the server reports how it spent its time with the `saleae-server-timing` trailing metadata entry (see saleae.proto),
+each phase is added as a child span of the request.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+import json
+import os
+import re
+import threading
+import time
+
+import grpc
+
+from .metrics import _error_name, _method_name
+
+#: Trailing metadata key that the server uses to report the time spent in each phase of a request
+SERVER_TIMING_METADATA_KEY = 'saleae-server-timing'
+
+# How long a job waits for its requests to complete before its trace is written, e.g. a stream that was just cancelled
+_PENDING_REQUEST_TIMEOUT_SECONDS = 1.0
+
+# Each entry is "<phase>;dur=<milliseconds>", in the order the phases ran, e.g. "queue;dur=0.1, disk_write;dur=12.5"
+_SERVER_TIMING_ENTRY = re.compile(r'^\s*([A-Za-z0-9_.\-]+)\s*;\s*dur\s*=\s*([0-9.eE+\-]+)\s*$')
+
+
+def parse_server_timing(value: str) -> List[Tuple[str, float]]:
+    """
+    Parse the value of the `saleae-server-timing` trailing metadata entry.
+
+    :param value: Comma separated "<phase>;dur=<milliseconds>" entries.
+    :return: (phase, duration in seconds) pairs, in order. Malformed entries are skipped.
+    """
+    phases = []
+    for entry in value.split(','):
+        match = _SERVER_TIMING_ENTRY.match(entry)
+        if match is None:
+            continue
+        try:
+            phases.append((match.group(1), float(match.group(2)) / 1000.0))
+        except ValueError:
+            continue
+    return phases
+
+
+def format_server_timing(phases: List[Tuple[str, float]]) -> str:
+    """
+    Format (phase, duration in seconds) pairs as the value of the `saleae-server-timing` trailing metadata entry.
+    """
+    return ', '.join(f'{name};dur={seconds * 1000.0:.3f}' for name, seconds in phases)
+
+
+class TraceJob:
+    """
+    The spans recorded for a single job. Returned by Tracer.job().
+    """
+
+    def __init__(self, tracer: 'Tracer', name: str, path: Optional[Path]):
+        #: Name of the job
+        self.name = name
+
+        #: File the trace is written to when the job ends, or None if the Tracer has no output directory
+        self.path = path
+
+        self._tracer = tracer
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        # Requests made by the job that have not completed, whose spans are added from gRPC threads
+        self._pending: Set['_PendingRequest'] = set()
+        self._pending_done = threading.Condition(self._lock)
+
+    def _add(self, event: Dict[str, Any]):
+        with self._lock:
+            self._events.append(event)
+
+    def _add_pending(self, request: '_PendingRequest'):
+        with self._lock:
+            self._pending.add(request)
+
+    def _remove_pending(self, request: '_PendingRequest'):
+        with self._lock:
+            self._pending.discard(request)
+            if not self._pending:
+                self._pending_done.notify_all()
+
+    def _finish_pending(self):
+        """
+        Wait for the requests of the job to complete, and end the spans of any that are still running, so that every
+        span is part of the trace when it is written.
+        """
+        with self._lock:
+            self._pending_done.wait_for(lambda: not self._pending, timeout=_PENDING_REQUEST_TIMEOUT_SECONDS)
+            pending = list(self._pending)
+        for request in pending:
+            request.finish(time.perf_counter(), error=None, trailing_metadata=None)
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """
+        Chrome trace events recorded for this job so far.
+        """
+        with self._lock:
+            return list(self._events)
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Returns the job as a Chrome trace JSON object.
+        """
+        return self._tracer._trace_json(self.events)
+
+
+class Tracer:
+    """
+    Records a span for every request made by the Managers that use it, in the Chrome trace event format.
+
+    Spans are attributed to the job that is active on the thread that made the request, see job(). Spans recorded
+    outside of any job are kept by the Tracer, and can be written with write(). All methods are thread-safe.
+    """
+
+    def __init__(self, *, output_directory: Optional[Union[Path, str]] = None):
+        """
+        :param output_directory: Directory that each job's trace is written to, as `<job name>.json`. If not specified,
+                                 jobs are not written automatically.
+        """
+        self.output_directory = Path(output_directory) if output_directory is not None else None
+
+        self._start_time = time.perf_counter()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._thread_names: Dict[int, str] = {}
+        self._local = threading.local()
+
+    def _timestamp_us(self, perf_counter_time: float) -> float:
+        return (perf_counter_time - self._start_time) * 1e6
+
+    def _current_job(self) -> Optional[TraceJob]:
+        return getattr(self._local, 'job', None)
+
+    def _current_thread(self) -> int:
+        # Callbacks run on gRPC threads, so the name of the thread that made the request is recorded up front
+        tid = threading.get_ident()
+        with self._lock:
+            if tid not in self._thread_names:
+                self._thread_names[tid] = threading.current_thread().name
+        return tid
+
+    def _add(self, event: Dict[str, Any], job: Optional[TraceJob]):
+        if job is not None:
+            job._add(event)
+        else:
+            with self._lock:
+                self._events.append(event)
+
+    def _add_span(self, name: str, category: str, start_time: float, end_time: float, *,
+                  tid: int, job: Optional[TraceJob], args: Optional[Dict[str, Any]] = None):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': self._timestamp_us(start_time),
+            'dur': max(end_time - start_time, 0.0) * 1e6,
+            'pid': self._pid,
+            'tid': tid,
+        }
+        if args:
+            event['args'] = args
+        self._add(event, job)
+
+    def _add_request(self, method: str, start_time: float, end_time: float, *, tid: int, job: Optional[TraceJob],
+                     error: Optional[str], trailing_metadata):
+        """
+        Record the span of a completed request, and a child span for each phase reported by the server.
+        """
+        phases = []
+        for key, value in trailing_metadata or ():
+            if key == SERVER_TIMING_METADATA_KEY:
+                phases.extend(parse_server_timing(value))
+
+        args: Dict[str, Any] = {}
+        if error is not None:
+            args['error'] = error
+        for phase, seconds in phases:
+            args[f'server.{phase}_ms'] = seconds * 1000.0
+        self._add_span(method, 'rpc', start_time, end_time, tid=tid, job=job, args=args)
+
+        # The server only reports durations, so the phases are laid out back to back from the start of the request.
+        # They are clamped to the request, since the two clocks are not synchronized.
+        phase_start = start_time
+        for phase, seconds in phases:
+            phase_end = min(phase_start + seconds, end_time)
+            self._add_span(phase, 'server', phase_start, phase_end, tid=tid, job=job)
+            phase_start = phase_end
+
+    @contextmanager
+    def job(self, name: str) -> Iterator[TraceJob]:
+        """
+        Record the spans of all requests made by the current thread to a separate trace, until the with block exits.
+
+        The job itself is recorded as a span containing them. When the job ends, its trace is written to
+        `<output_directory>/<name>.json` if the Tracer has an output directory.
+
+        :param name: Name of the job, also used as the file name.
+        """
+        if self._current_job() is not None:
+            raise RuntimeError('Tracer jobs cannot be nested')
+
+        path = self.output_directory / f'{name}.json' if self.output_directory is not None else None
+        job = TraceJob(self, name, path)
+        tid = self._current_thread()
+        self._local.job = job
+        start_time = time.perf_counter()
+        error = None
+        try:
+            yield job
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            self._local.job = None
+            job._finish_pending()
+            end_time = time.perf_counter()
+            self._add_span(name, 'job', start_time, end_time, tid=tid, job=job,
+                           args={'error': error} if error is not None else None)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, 'w') as f:
+                    json.dump(job.to_json(), f)
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """
+        Record a span around a with block, e.g. to group several requests into a phase of a job.
+
+        :param name: Name of the span.
+        :param args: Extra values shown with the span.
+        """
+        job = self._current_job()
+        tid = self._current_thread()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_span(name, 'span', start_time, time.perf_counter(), tid=tid, job=job, args=args)
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """
+        Chrome trace events recorded outside of any job.
+        """
+        with self._lock:
+            return list(self._events)
+
+    def _trace_json(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            thread_names = dict(self._thread_names)
+
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self._pid, 'tid': 0, 'args': {'name': 'saleae.automation'}}]
+        for tid in sorted({event['tid'] for event in events}):
+            metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': tid,
+                             'args': {'name': thread_names.get(tid, str(tid))}})
+
+        return {
+            'traceEvents': metadata + sorted(events, key=lambda event: event['ts']),
+            'displayTimeUnit': 'ms',
+        }
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Returns the spans recorded outside of any job as a Chrome trace JSON object.
+        """
+        return self._trace_json(self.events)
+
+    def write(self, path: Union[Path, str]):
+        """
+        Write the spans recorded outside of any job to a Chrome trace JSON file.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f)
+
+    def _interceptor(self) -> '_TracingInterceptor':
+        """
+        :meta private:
+        """
+        return _TracingInterceptor(self)
+
+
+class _PendingRequest:
+    """
+    A request whose span is added once it completes, or once its job ends, whichever happens first.
+    """
+
+    def __init__(self, tracer: Tracer, method: str):
+        self._tracer = tracer
+        self._method = method
+        self._job = tracer._current_job()
+        self._tid = tracer._current_thread()
+        self._start_time = time.perf_counter()
+        self._lock = threading.Lock()
+        self._finished = False
+        if self._job is not None:
+            self._job._add_pending(self)
+
+    def finish(self, end_time: float, *, error: Optional[str], trailing_metadata):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+
+        self._tracer._add_request(self._method, self._start_time, end_time, tid=self._tid, job=self._job, error=error,
+                                  trailing_metadata=trailing_metadata)
+        if self._job is not None:
+            self._job._remove_pending(self)
+
+
+class _TracingInterceptor(grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor):
+    def __init__(self, tracer: Tracer):
+        self._tracer = tracer
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        pending = _PendingRequest(self._tracer, _method_name(client_call_details.method))
+
+        call = continuation(client_call_details, request)
+
+        def done(call):
+            end_time = time.perf_counter()
+            if call.cancelled():
+                # Cancelled by the client, e.g. a wait_future() that is no longer needed
+                pending.finish(end_time, error=None, trailing_metadata=None)
+                return
+
+            exc = call.exception()
+            pending.finish(end_time, error=None if exc is None else _error_name(exc),
+                           trailing_metadata=call.trailing_metadata())
+
+        call.add_done_callback(done)
+        return call
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        pending = _PendingRequest(self._tracer, _method_name(client_call_details.method))
+
+        call = continuation(client_call_details, request)
+
+        def done(call):
+            end_time = time.perf_counter()
+            if call.cancelled():
+                # Cancelled by the client, e.g. by breaking out of a loop over Capture.iter_raw_data()
+                pending.finish(end_time, error=None, trailing_metadata=None)
+                return
+
+            code = call.code()
+            pending.finish(end_time, error=None if code == grpc.StatusCode.OK else _error_name(call),
+                           trailing_metadata=call.trailing_metadata())
+
+        call.add_done_callback(done)
+        return call
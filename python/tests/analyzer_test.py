@@ -137,3 +137,44 @@ def test_parallel_analyzer(manager: saleae.automation.Manager, asset_path: str):
 
         for thread in threads:
             thread.join()
+
+
+def test_add_analyzers(manager: saleae.automation.Manager, asset_path: str):
+    path = os.path.join(asset_path, 'small_spi_capture.sal')
+    hla_root_path = os.path.join(asset_path, 'hla/test')
+
+    with manager.load_capture(path) as cap:
+        spi_settings = {
+            'MISO': 4,
+            'Clock': 3,
+            'Enable': 5,
+            'Bits per Transfer': '8 Bits per Transfer (Standard)'
+        }
+
+        with measure('add analyzers'):
+            handles = cap.add_analyzers([
+                saleae.automation.AnalyzerConfiguration('SPI', label=f'SPI ({i})', settings=spi_settings)
+                for i in range(10)
+            ] + [
+                saleae.automation.HighLevelAnalyzerConfiguration(hla_root_path, 'test_hla', input_analyzer=0, label='hla', settings={
+                    'my_choices_setting': 'A',
+                    'my_string_setting': 'hi',
+                    'my_number_setting': 100,
+                }),
+            ])
+
+        assert len(handles) == 11
+        assert len(set(handle.analyzer_id for handle in handles)) == 11
+
+        cap.remove_high_level_analyzer(handles[-1])
+        for handle in handles[:-1]:
+            cap.remove_analyzer(handle)
+
+        try:
+            cap.add_analyzers([
+                saleae.automation.AnalyzerConfiguration('SPI', label='Valid', settings=spi_settings),
+                saleae.automation.AnalyzerConfiguration('SPI', label='Invalid channel', settings=dict(spi_settings, Enable=7)),
+            ])
+            assert(False)
+        except saleae.automation.InvalidRequestError:
+            pass
@@ -0,0 +1,40 @@
+import asyncio
+import os.path
+
+import saleae.automation
+
+
+def test_async_load_and_export(manager: saleae.automation.Manager, asset_path: str, tmp_path, request):
+    port = request.config.getoption('--port') or 10430
+    path = os.path.join(asset_path, 'cap1.sal')
+
+    async def run():
+        async with await saleae.automation.AsyncManager.connect(port=port) as async_manager:
+            captures = await asyncio.gather(*[async_manager.load_capture(path) for _ in range(4)])
+
+            await asyncio.gather(*[
+                cap.export_raw_data_binary(directory=os.path.join(tmp_path, f'export_{i}'), digital_channels=[0, 1])
+                for i, cap in enumerate(captures)
+            ])
+
+            await asyncio.gather(*[cap.close() for cap in captures])
+
+    asyncio.run(run())
+
+    for i in range(4):
+        files_created = os.listdir(os.path.join(tmp_path, f'export_{i}'))
+        assert sorted(files_created) == ['digital_0.bin', 'digital_1.bin']
+
+
+def test_async_load_missing_file(manager: saleae.automation.Manager, tmp_path, request):
+    port = request.config.getoption('--port') or 10430
+
+    async def run():
+        async with await saleae.automation.AsyncManager.connect(port=port) as async_manager:
+            await async_manager.load_capture(os.path.join(tmp_path, 'missing.sal'))
+
+    try:
+        asyncio.run(run())
+        assert(False)
+    except saleae.automation.LoadCaptureFailedError:
+        pass
@@ -0,0 +1,150 @@
+import csv
+import os.path
+import shutil
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from saleae.automation import binary_export
+
+
+def read_digital_csv_transitions(filepath: str, column: int):
+    with open(filepath) as f:
+        reader = csv.reader(f)
+        next(reader)
+
+        transitions = []
+        previous_state = None
+        for row in reader:
+            state = int(row[column])
+            if previous_state is not None and state != previous_state:
+                transitions.append(float(row[0]))
+            previous_state = state
+
+    return transitions
+
+
+def test_read_directory(asset_path: str):
+    export = binary_export.read_binary_export_directory(os.path.join(asset_path, 'cap1/all_bin'))
+
+    assert sorted(export.digital.keys()) == [0, 1]
+    assert sorted(export.analog.keys()) == [0, 1]
+
+
+@pytest.mark.parametrize('channel', [0, 1])
+def test_digital_matches_csv(channel: int, asset_path: str):
+    export = binary_export.read_digital_export(os.path.join(asset_path, f'cap1/all_bin/digital_{channel}.bin'))
+    expected = read_digital_csv_transitions(os.path.join(asset_path, 'cap1/all/digital.csv'), channel + 1)
+
+    assert isinstance(export.transition_times, np.memmap)
+    assert export.initial_state == 0
+    assert export.begin_time <= export.transition_times[0]
+    assert export.transition_times[-1] <= export.end_time
+    assert np.allclose(export.transition_times, expected, rtol=0, atol=1e-8)
+
+
+def test_analog(asset_path: str):
+    export = binary_export.read_analog_export(os.path.join(asset_path, 'cap1/analog_1_downsample4_bin/analog_1.bin'))
+
+    assert isinstance(export.samples, np.memmap)
+    assert export.sample_rate == 625000
+    assert export.downsample == 4
+    assert export.effective_sample_rate == 156250
+    assert export.samples.dtype == np.float32
+    assert np.allclose(export.samples[:3], [2.499, 2.578, 2.657], atol=1e-3)
+    assert np.allclose(export.sample_times(1, 3) - export.begin_time, [6.4e-6, 12.8e-6])
+
+
+def test_wrong_type(asset_path: str):
+    with pytest.raises(RuntimeError):
+        binary_export.read_analog_export(os.path.join(asset_path, 'cap1/all_bin/digital_0.bin'))
+
+
+def test_not_an_export(asset_path: str):
+    with pytest.raises(RuntimeError):
+        binary_export.read_binary_export(os.path.join(asset_path, 'cap1/all/digital.csv'))
+
+
+@pytest.mark.parametrize('block_size', [1, 4, 100, 10000])
+def test_transition_index(asset_path: str, tmp_path, block_size: int):
+    filepath = str(tmp_path / 'digital_0.bin')
+    shutil.copyfile(os.path.join(asset_path, 'cap1/all_bin/digital_0.bin'), filepath)
+
+    export = binary_export.read_digital_export(filepath)
+    index = binary_export.open_transition_index(export, block_size=block_size)
+    assert os.path.exists(filepath + '.idx')
+
+    times = np.asarray(export.transition_times)
+    queries = np.concatenate([times[::7], times[::11] + 1e-7, [export.begin_time - 1.0, export.end_time + 1.0]])
+    for t0, t1 in zip(queries, np.roll(queries, 5)):
+        expected = times[(times >= t0) & (times < t1)]
+        assert index.count_transitions(t0, t1) == len(expected)
+        assert np.array_equal(index.transitions_between(t0, t1), expected)
+
+        expected_state = export.initial_state ^ (np.count_nonzero(times <= t0) & 1)
+        assert index.state_at(t0) == expected_state
+
+
+def test_transition_index_persisted(asset_path: str, tmp_path):
+    filepath = str(tmp_path / 'digital_1.bin')
+    shutil.copyfile(os.path.join(asset_path, 'cap1/all_bin/digital_1.bin'), filepath)
+
+    built = binary_export.open_transition_index(filepath, block_size=16)
+    loaded = binary_export.open_transition_index(filepath, block_size=32)
+
+    # The saved index is used, instead of building a new one with the new block size
+    assert loaded.block_size == 16
+    assert np.array_equal(loaded.block_start_times, built.block_start_times)
+    assert np.array_equal(loaded.block_end_times, built.block_end_times)
+
+    # The index is rebuilt when the export changes
+    os.utime(filepath, ns=(0, 0))
+    rebuilt = binary_export.open_transition_index(filepath, block_size=32)
+    assert rebuilt.block_size == 32
+
+    with open(filepath + '.idx', 'r+b') as f:
+        f.write(b'garbage!')
+    with pytest.raises(RuntimeError):
+        binary_export.DigitalTransitionIndex.load(rebuilt.export, filepath + '.idx')
+    assert binary_export.open_transition_index(filepath).block_size == binary_export.DEFAULT_INDEX_BLOCK_SIZE
+
+
+def test_envelope_pyramid(asset_path: str, tmp_path):
+    filepath = str(tmp_path / 'analog_0.bin')
+    shutil.copyfile(os.path.join(asset_path, 'cap1/all_bin/analog_0.bin'), filepath)
+
+    export = binary_export.read_analog_export(filepath)
+    pyramid = binary_export.open_envelope_pyramid(export, base_block_size=16, factor=4)
+    assert os.path.exists(filepath + '.lod')
+    assert len(pyramid.min_levels[-1]) == 1
+    assert pyramid.min_levels[-1][0] == export.samples.min()
+    assert pyramid.max_levels[-1][0] == export.samples.max()
+
+    samples = np.asarray(export.samples)
+    period = 1 / export.effective_sample_rate
+    for start_time, end_time, max_points in [(None, None, 500), (0.01, 0.02, 1000), (0.1, 0.1 + 100 * period, 1000)]:
+        envelope = pyramid.envelope(start_time, end_time, max_points=max_points)
+        assert 0 < envelope.num_points <= max_points
+
+        # Every point covers the min and max of its samples, so spikes are never lost
+        starts = np.round((envelope.times - export.begin_time) * export.effective_sample_rate).astype(int)
+        for i in range(0, envelope.num_points - 1, 37):
+            block = samples[starts[i]:starts[i + 1]]
+            assert envelope.min_values[i] == block.min()
+            assert envelope.max_values[i] == block.max()
+
+    # A short range returns the samples themselves
+    envelope = pyramid.envelope(0.1, 0.1 + 100 * period, max_points=1000)
+    assert envelope.samples_per_point == 1
+
+    # The number of points doesn't drop once the range holds more than max_points samples
+    for num_samples in [2001, 2100, 10000, export.num_samples]:
+        envelope = pyramid.envelope(export.begin_time, export.begin_time + num_samples * period, max_points=2000)
+        assert envelope.num_points == 2000
+        assert envelope.samples_per_point == pytest.approx(num_samples / 2000, rel=0.05)
+
+    loaded = binary_export.open_envelope_pyramid(filepath)
+    assert (loaded.base_block_size, loaded.factor, loaded.num_levels) == (16, 4, pyramid.num_levels)
+    for level in range(pyramid.num_levels):
+        assert np.array_equal(loaded.min_levels[level], pyramid.min_levels[level])
+        assert np.array_equal(loaded.max_levels[level], pyramid.max_levels[level])
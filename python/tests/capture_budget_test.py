@@ -0,0 +1,135 @@
+import os.path
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+SIMULATION_LOGIC_PRO_8 = 'F4244'
+
+DEVICE_CONFIGURATION = saleae.automation.LogicDeviceConfiguration(
+    enabled_digital_channels=[0, 1],
+    digital_sample_rate=500_000_000,
+)
+
+
+def test_max_open_captures(fake_server: FakeLogic2Server, asset_path: str, tmp_path):
+    filepath = os.path.join(asset_path, 'cap1.sal')
+
+    with saleae.automation.Manager.connect(port=fake_server.port, max_open_captures=2) as manager:
+        first = manager.load_capture(filepath)
+        second = manager.load_capture(filepath)
+        assert manager.num_open_captures == 2
+
+        # Using a capture makes it the most recently used, so the second capture is closed instead of the first
+        first.export_raw_data_csv(str(tmp_path / 'export'), digital_channels=[0])
+        third = manager.load_capture(filepath)
+        assert fake_server.call_counts['CloseCapture'] == 1
+        assert manager.num_open_captures == 2
+
+        with pytest.raises(RuntimeError, match='capture budget'):
+            second.export_raw_data_csv(str(tmp_path / 'export'), digital_channels=[0])
+        assert second.evicted_filepath is None
+
+        # Closing an evicted capture does nothing
+        second.close()
+        first.close()
+        third.close()
+        assert fake_server.call_counts['CloseCapture'] == 3
+        assert manager.num_open_captures == 0
+
+
+def test_evicted_captures_are_saved(fake_server: FakeLogic2Server, asset_path: str, tmp_path):
+    filepath = os.path.join(asset_path, 'cap1.sal')
+    file_size = os.path.getsize(filepath)
+
+    with saleae.automation.Manager.connect(port=fake_server.port, max_capture_memory_bytes=file_size * 3 // 2,
+                                           evicted_capture_directory=str(tmp_path)) as manager:
+        first = manager.load_capture(filepath)
+        assert manager.open_capture_memory_bytes == file_size
+        with manager.load_capture(filepath) as second:
+            assert manager.num_open_captures == 1
+            assert first.evicted_filepath == str(tmp_path / f'{first._capture_id}.sal')
+            assert fake_server.call_counts['SaveCapture'] == 1
+
+            # The saved capture can be loaded again
+            with manager.load_capture(first.evicted_filepath) as reloaded:
+                reloaded.export_raw_data_csv(str(tmp_path / 'export'), digital_channels=[0])
+
+
+def test_recording_captures_are_not_closed(fake_server: FakeLogic2Server, asset_path: str):
+    with saleae.automation.Manager.connect(port=fake_server.port, max_open_captures=1) as manager:
+        recording = manager.start_capture(
+            device_id=SIMULATION_LOGIC_PRO_8,
+            device_configuration=DEVICE_CONFIGURATION,
+            capture_configuration=saleae.automation.CaptureConfiguration(
+                capture_mode=saleae.automation.ManualCaptureMode()))
+        loaded = manager.load_capture(os.path.join(asset_path, 'cap1.sal'))
+        assert manager.num_open_captures == 2
+        assert 'CloseCapture' not in fake_server.call_counts
+
+        # Once stopped, the capture is closed when the next capture is opened
+        recording.stop()
+        with manager.load_capture(os.path.join(asset_path, 'cap1.sal')):
+            assert fake_server.call_counts['CloseCapture'] == 2
+            with pytest.raises(RuntimeError):
+                recording.capture_id
+            with pytest.raises(RuntimeError):
+                loaded.capture_id
+
+
+def test_progress_ends_recording(fake_server: FakeLogic2Server, asset_path: str):
+    with saleae.automation.Manager.connect(port=fake_server.port, max_open_captures=1) as manager:
+        timed = manager.start_capture(
+            device_id=SIMULATION_LOGIC_PRO_8,
+            device_configuration=DEVICE_CONFIGURATION,
+            capture_configuration=saleae.automation.CaptureConfiguration(
+                capture_mode=saleae.automation.TimedCaptureMode(duration_seconds=0.1)))
+        updates = list(timed.progress(interval_seconds=0.05))
+        assert updates[-1].is_complete
+
+        # The capture was never waited on, but progress() reported that it is complete
+        with manager.load_capture(os.path.join(asset_path, 'cap1.sal')):
+            assert fake_server.call_counts['CloseCapture'] == 1
+            with pytest.raises(RuntimeError):
+                timed.capture_id
+
+
+def test_captures_in_use_are_not_closed(fake_server: FakeLogic2Server, asset_path: str):
+    filepath = os.path.join(asset_path, 'cap1.sal')
+
+    with saleae.automation.Manager.connect(port=fake_server.port, max_open_captures=1) as manager:
+        streaming = manager.load_capture(filepath)
+        chunks = streaming.iter_raw_data(digital_channels=[0], max_chunk_size=100)
+        next(chunks)
+
+        # The stream is still in progress, so the capture stays open
+        with manager.load_capture(filepath):
+            assert 'CloseCapture' not in fake_server.call_counts
+            assert manager.num_open_captures == 2
+
+            for _ in chunks:
+                pass
+            with manager.load_capture(filepath):
+                assert fake_server.call_counts['CloseCapture'] == 2
+                with pytest.raises(RuntimeError):
+                    streaming.capture_id
+
+
+def test_close_all(fake_server: FakeLogic2Server, asset_path: str):
+    filepath = os.path.join(asset_path, 'cap1.sal')
+
+    with saleae.automation.Manager.connect(port=fake_server.port) as manager:
+        captures = [manager.load_capture(filepath) for _ in range(3)]
+        captures[0].close()
+        # Captures are closed even if their Capture objects are no longer referenced
+        manager.load_capture(filepath)
+        assert manager.num_open_captures == 3
+
+        manager.close_all()
+        assert fake_server.call_counts['CloseCapture'] == 4
+        assert manager.num_open_captures == 0
+        with pytest.raises(RuntimeError, match='close_all'):
+            captures[1].capture_id
+        captures[2].close()
+        assert fake_server.call_counts['CloseCapture'] == 4
@@ -0,0 +1,102 @@
+import asyncio
+import os.path
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+SIMULATION_LOGIC_PRO_8 = 'F4244'
+
+DEVICE_CONFIGURATION = saleae.automation.LogicDeviceConfiguration(
+    enabled_digital_channels=[0, 1],
+    enabled_analog_channels=[0],
+    digital_sample_rate=500_000_000,
+    analog_sample_rate=50_000,
+)
+
+
+def start_capture(manager: saleae.automation.Manager, capture_mode, buffer_size_megabytes=None) -> saleae.automation.Capture:
+    return manager.start_capture(
+        device_id=SIMULATION_LOGIC_PRO_8,
+        device_configuration=DEVICE_CONFIGURATION,
+        capture_configuration=saleae.automation.CaptureConfiguration(buffer_size_megabytes=buffer_size_megabytes,
+                                                                     capture_mode=capture_mode))
+
+
+def test_progress_timed_capture(fake_manager: saleae.automation.Manager):
+    with start_capture(fake_manager, saleae.automation.TimedCaptureMode(duration_seconds=0.3)) as cap:
+        updates = list(cap.progress(interval_seconds=0.05))
+
+    assert len(updates) > 2
+    assert [update.is_complete for update in updates] == [False] * (len(updates) - 1) + [True]
+    assert all(a.elapsed_seconds <= b.elapsed_seconds for a, b in zip(updates, updates[1:]))
+    assert updates[-1].samples_captured > 0
+    assert updates[-1].bytes_captured > 0
+    assert 0.0 < updates[-1].buffer_fill < 1.0
+    assert updates[-1].trigger_state is None
+    assert updates[-1].trigger_time_seconds is None
+
+
+def test_progress_trigger_state():
+    with FakeLogic2Server(trigger_delay_seconds=0.2) as server:
+        with saleae.automation.Manager.connect(port=server.port) as manager:
+            capture_mode = saleae.automation.DigitalTriggerCaptureMode(
+                trigger_type=saleae.automation.DigitalTriggerType.RISING,
+                trigger_channel_index=0,
+                after_trigger_seconds=0.1)
+            with start_capture(manager, capture_mode) as cap:
+                updates = list(cap.progress(interval_seconds=0.05))
+
+    states = [update.trigger_state for update in updates]
+    assert states[0] == saleae.automation.CaptureTriggerState.WAITING
+    assert states[-1] == saleae.automation.CaptureTriggerState.TRIGGERED
+    assert updates[0].trigger_time_seconds is None
+    assert updates[-1].trigger_time_seconds == pytest.approx(0.2)
+
+
+def test_progress_out_of_memory():
+    with FakeLogic2Server(capture_bytes_per_second=10 * 1024 * 1024) as server:
+        with saleae.automation.Manager.connect(port=server.port) as manager:
+            capture_mode = saleae.automation.TimedCaptureMode(duration_seconds=60.0)
+            with start_capture(manager, capture_mode, buffer_size_megabytes=2) as cap:
+                fills = []
+                with pytest.raises(saleae.automation.OutOfMemoryError):
+                    for update in cap.progress(interval_seconds=0.02):
+                        fills.append(update.buffer_fill)
+                with pytest.raises(saleae.automation.OutOfMemoryError):
+                    cap.wait()
+
+    assert len(fills) > 2
+    assert fills == sorted(fills)
+    assert fills[-1] > 0.5
+
+
+def test_progress_stop_early(fake_manager: saleae.automation.Manager, asset_path: str):
+    with start_capture(fake_manager, saleae.automation.ManualCaptureMode()) as cap:
+        for update in cap.progress(interval_seconds=0.01):
+            if update.elapsed_seconds > 0.05:
+                break
+        cap.stop()
+
+        updates = list(cap.progress())
+        assert len(updates) == 1 and updates[0].is_complete
+
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        updates = list(cap.progress())
+        assert len(updates) == 1 and updates[0].is_complete
+
+
+def test_async_progress(fake_server: FakeLogic2Server):
+    async def run():
+        async with await saleae.automation.AsyncManager.connect(port=fake_server.port) as manager:
+            cap = await manager.start_capture(
+                device_id=SIMULATION_LOGIC_PRO_8,
+                device_configuration=DEVICE_CONFIGURATION,
+                capture_configuration=saleae.automation.CaptureConfiguration(
+                    capture_mode=saleae.automation.TimedCaptureMode(duration_seconds=0.2)))
+            async with cap:
+                return [update async for update in cap.progress(interval_seconds=0.05)]
+
+    updates = asyncio.run(run())
+    assert updates[-1].is_complete
@@ -0,0 +1,46 @@
+import os
+import os.path
+import shutil
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+
+def test_reuse_loaded_captures(fake_server: FakeLogic2Server, asset_path: str, tmp_path):
+    filepath = str(tmp_path / 'cap1.sal')
+    shutil.copyfile(os.path.join(asset_path, 'cap1.sal'), filepath)
+
+    with saleae.automation.Manager.connect(port=fake_server.port, reuse_loaded_captures=True) as manager:
+        first = manager.load_capture(filepath)
+        second = manager.load_capture(filepath)
+        assert first is not second
+        assert first.capture_id == second.capture_id
+        assert fake_server.call_counts['LoadCapture'] == 1
+
+        # The capture stays open until every Capture object has been closed
+        first.close()
+        first.close()
+        assert 'CloseCapture' not in fake_server.call_counts
+        second.export_raw_data_csv(str(tmp_path / 'export'), digital_channels=[0])
+        second.close()
+        assert fake_server.call_counts['CloseCapture'] == 1
+
+        # Once closed, the file is loaded again
+        with manager.load_capture(filepath) as third:
+            assert third.capture_id != first.capture_id
+        assert fake_server.call_counts['LoadCapture'] == 2
+
+        # A modified file is loaded again, even while the earlier version is open
+        with manager.load_capture(filepath) as before:
+            with open(filepath, 'ab') as f:
+                f.write(b' ')
+            with manager.load_capture(filepath) as after:
+                assert after.capture_id != before.capture_id
+        assert fake_server.call_counts['LoadCapture'] == 4
+
+
+def test_reuse_is_opt_in(fake_server: FakeLogic2Server, fake_manager: saleae.automation.Manager, asset_path: str):
+    filepath = os.path.join(asset_path, 'cap1.sal')
+    with fake_manager.load_capture(filepath) as first, fake_manager.load_capture(filepath) as second:
+        assert first.capture_id != second.capture_id
+    assert fake_server.call_counts['LoadCapture'] == 2
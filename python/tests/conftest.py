@@ -29,3 +29,15 @@ def manager(request):
     else:
         with saleae.automation.Manager.launch(port=port) as mgr:
             yield mgr
+
+@pytest.fixture
+def fake_server():
+    from saleae.automation.fake_server import FakeLogic2Server
+
+    with FakeLogic2Server() as server:
+        yield server
+
+@pytest.fixture
+def fake_manager(fake_server):
+    with saleae.automation.Manager.connect(port=fake_server.port) as mgr:
+        yield mgr
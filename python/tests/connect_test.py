@@ -0,0 +1,29 @@
+import socket
+import time
+
+import grpc
+import pytest
+
+import saleae.automation
+
+
+def test_connect_latency(manager: saleae.automation.Manager, request):
+    port = request.config.getoption('--port') or 10430
+
+    with saleae.automation.Manager.connect(port=port) as mgr:
+        assert mgr.connect_latency_seconds >= 0
+        assert mgr.launch_latency_seconds is None
+
+
+def test_connect_timeout():
+    # Find a port that nothing is listening on
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    start_time = time.monotonic()
+    with pytest.raises(grpc.RpcError) as exc_info:
+        saleae.automation.Manager.connect(port=port, connect_timeout_seconds=0.5)
+
+    assert exc_info.value.code() == grpc.StatusCode.UNAVAILABLE
+    assert time.monotonic() - start_time < 5.0
@@ -0,0 +1,93 @@
+import csv
+import os.path
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from saleae.automation import csv_export
+
+
+def read_csv_rows(filepath: str):
+    with open(filepath) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        return header[1:], list(reader)
+
+
+@pytest.mark.parametrize('chunk_rows', [csv_export.DEFAULT_CSV_CHUNK_ROWS, 100, 1])
+def test_digital_matches_csv(chunk_rows: int, asset_path: str):
+    filepath = os.path.join(asset_path, 'cap1/all/digital.csv')
+    columns, rows = read_csv_rows(filepath)
+
+    chunks = list(csv_export.iter_raw_data_csv(filepath, chunk_rows=chunk_rows))
+    assert all(chunk.num_rows == chunk_rows for chunk in chunks[:-1])
+    assert [chunk.start_row for chunk in chunks] == list(range(0, len(rows), chunk_rows))
+
+    times = np.concatenate([chunk.times for chunk in chunks])
+    assert not chunks[0].iso8601_timestamp
+    assert times.tolist() == [float(row[0]) for row in rows]
+    for index, column in enumerate(columns):
+        values = np.concatenate([chunk.values[column] for chunk in chunks])
+        assert values.dtype == np.uint8
+        assert values.tolist() == [int(row[index + 1]) for row in rows]
+
+
+def test_analog_matches_csv(asset_path: str):
+    filepath = os.path.join(asset_path, 'cap1/analog_1_downsample4/analog.csv')
+    columns, rows = read_csv_rows(filepath)
+
+    export = csv_export.read_raw_data_csv(filepath)
+    assert list(export.values.keys()) == columns == ['Channel 1']
+    assert export.values['Channel 1'].dtype == np.float32
+    assert np.array_equal(export.values['Channel 1'], np.array([float(row[1]) for row in rows], dtype=np.float32))
+    assert np.array_equal(export.times, np.array([float(row[0]) for row in rows]))
+
+
+def test_iso8601_timestamps(asset_path: str):
+    relative = csv_export.read_raw_data_csv(os.path.join(asset_path, 'cap1/all/digital.csv'))
+    iso = csv_export.read_raw_data_csv(os.path.join(asset_path, 'cap1/all_isotimestamps/digital.csv'))
+
+    assert iso.iso8601_timestamp
+    assert iso.times.dtype == np.int64
+    assert str(iso.times.view('datetime64[ns]')[0]) == '2022-06-24T18:51:08.852112100'
+    assert np.array_equal(iso.times - iso.times[0], np.round(relative.times * 1e9).astype(np.int64))
+    assert np.array_equal(iso.values['Channel 1'], relative.values['Channel 1'])
+
+
+def test_utc_offsets(tmp_path):
+    filepath = str(tmp_path / 'digital.csv')
+    with open(filepath, 'w') as f:
+        f.write('Time [s],Channel 0\n'
+                '2022-06-24T18:51:08.000000001+00:00,0\n'
+                '2022-06-24T13:51:08.5-05:00,1\n'
+                '2022-06-24T20:21:09+01:30,0\n'
+                '2022-06-24T18:51:10Z,1')
+
+    export = csv_export.read_raw_data_csv(filepath)
+    assert export.times.view('datetime64[ns]').astype(str).tolist() == [
+        '2022-06-24T18:51:08.000000001',
+        '2022-06-24T18:51:08.500000000',
+        '2022-06-24T18:51:09.000000000',
+        '2022-06-24T18:51:10.000000000',
+    ]
+    assert export.values['Channel 0'].tolist() == [0, 1, 0, 1]
+
+
+def test_invalid_file(tmp_path):
+    filepath = str(tmp_path / 'analog.csv')
+    with open(filepath, 'w') as f:
+        f.write('Time [s],Channel 0\n0.0,1.5\n0.1,abc\n')
+
+    with pytest.raises(RuntimeError):
+        csv_export.read_raw_data_csv(filepath)
+
+    with open(filepath, 'w') as f:
+        f.write('Time [s],Channel 0\n')
+    export = csv_export.read_raw_data_csv(filepath)
+    assert export.num_rows == 0
+    assert export.values['Channel 0'].dtype == np.float32
+
+
+def test_invalid_chunk_rows(asset_path: str):
+    with pytest.raises(ValueError):
+        next(csv_export.iter_raw_data_csv(os.path.join(asset_path, 'cap1/all/digital.csv'), chunk_rows=0))
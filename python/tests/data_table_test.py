@@ -0,0 +1,65 @@
+import csv
+import os.path
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+import saleae.automation
+from saleae.automation import data_table
+
+
+def export_spi(manager: saleae.automation.Manager, asset_path: str, exports):
+    with manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        spi = cap.add_analyzer('SPI', label='SPI')
+        config = saleae.automation.DataTableExportConfiguration(spi, saleae.automation.RadixType.HEXADECIMAL)
+        for filepath, kwargs in exports:
+            cap.export_data_table(filepath, [config], **kwargs)
+
+
+@pytest.mark.parametrize('export_format, extension', [
+    (saleae.automation.DataTableExportFormat.ARROW_IPC, 'arrow'),
+    (saleae.automation.DataTableExportFormat.PARQUET, 'parquet'),
+])
+def test_columnar_export_matches_csv(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path,
+                                     export_format, extension):
+    csv_filepath = str(tmp_path / 'data_table.csv')
+    columnar_filepath = str(tmp_path / f'data_table.{extension}')
+    export_spi(fake_manager, asset_path, [(csv_filepath, {}), (columnar_filepath, dict(format=export_format))])
+
+    assert data_table.data_table_format(csv_filepath) == saleae.automation.DataTableExportFormat.CSV
+    assert data_table.data_table_format(columnar_filepath) == export_format
+
+    table = data_table.read_data_table(columnar_filepath)
+    assert table.column_names == ['name', 'type', 'start_time', 'duration', 'value']
+    assert table.schema.field('start_time').type == pa.float64()
+    assert table.schema.field('value').type == pa.int64()
+
+    with open(csv_filepath) as f:
+        rows = list(csv.reader(f))[1:]
+
+    assert table.num_rows == len(rows) > 0
+    assert table.column('start_time').to_pylist() == [float(row[2]) for row in rows]
+    # Values are numbers, not formatted with the analyzer's radix
+    assert table.column('value').to_pylist() == [int(row[4], 16) for row in rows]
+
+
+def test_read_columns(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    filepath = str(tmp_path / 'data_table.arrow')
+    export_spi(fake_manager, asset_path, [
+        (filepath, dict(format=saleae.automation.DataTableExportFormat.ARROW_IPC, iso8601_timestamp=True)),
+    ])
+
+    table = data_table.read_data_table(filepath, columns=['start_time', 'value'])
+    assert table.column_names == ['start_time', 'value']
+    assert table.schema.field('start_time').type == pa.timestamp('ns', tz='UTC')
+
+    # The columns refer to the memory-mapped file, so they can be viewed as NumPy arrays without copying
+    table.column('value').chunk(0).to_numpy(zero_copy_only=True)
+
+
+def test_read_csv(tmp_path):
+    filepath = tmp_path / 'data_table.csv'
+    filepath.write_text('name,type,start_time,duration,"value"\n')
+
+    with pytest.raises(RuntimeError):
+        data_table.read_data_table(str(filepath))
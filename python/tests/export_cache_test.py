@@ -0,0 +1,102 @@
+import os.path
+import shutil
+import time
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+
+def test_hit_and_miss(fake_server: FakeLogic2Server, fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    cache = saleae.automation.ExportCache(tmp_path / 'cache')
+    capture_filepath = os.path.join(asset_path, 'cap1.sal')
+
+    first = cache.export_raw_data_csv(fake_manager, capture_filepath, digital_channels=[0], analog_downsample_ratio=10)
+    assert os.listdir(first) == ['digital.csv']
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    second = cache.export_raw_data_csv(fake_manager, capture_filepath, digital_channels=[0], analog_downsample_ratio=10)
+    assert second == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert fake_server.call_counts['LoadCapture'] == 1
+
+    # A copy of the capture has the same contents, so it is a hit
+    copy_filepath = str(tmp_path / 'copy.sal')
+    shutil.copyfile(capture_filepath, copy_filepath)
+    assert cache.export_raw_data_csv(fake_manager, copy_filepath, digital_channels=[0], analog_downsample_ratio=10) == first
+
+    # Any change to the export parameters is a miss
+    assert cache.export_raw_data_csv(fake_manager, capture_filepath, digital_channels=[1], analog_downsample_ratio=10) != first
+    assert cache.export_raw_data_csv(fake_manager, capture_filepath, digital_channels=[0], start_time=0.01) != first
+    binary = cache.export_raw_data_binary(fake_manager, capture_filepath, digital_channels=[0])
+    assert os.listdir(binary) == ['digital_0.bin']
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert fake_server.call_counts['LoadCapture'] == 4
+
+    # The cache is persisted on disk
+    cache = saleae.automation.ExportCache(tmp_path / 'cache')
+    assert cache.export_raw_data_binary(fake_manager, capture_filepath, digital_channels=[0]) == binary
+    assert cache.num_entries == 4
+    assert fake_server.call_counts['LoadCapture'] == 4
+
+    cache.clear()
+    assert cache.num_entries == 0
+    assert cache.size_bytes == 0
+
+
+def test_lru_eviction(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    cache = saleae.automation.ExportCache(tmp_path / 'cache', max_entries=2)
+    capture_filepath = os.path.join(asset_path, 'cap1.sal')
+
+    def export(channel: int):
+        path = cache.export_raw_data_binary(fake_manager, capture_filepath, digital_channels=[channel])
+        # Make sure that the entries have distinct modification times
+        time.sleep(0.01)
+        return path
+
+    first = export(0)
+    second = export(1)
+    assert export(0) == first
+
+    # The second export is the least recently used
+    third = export(2)
+    assert sorted(os.listdir(tmp_path / 'cache/entries')) == sorted([first.name, third.name])
+    assert not second.exists()
+
+    cache.max_entries = None
+    cache.max_size_bytes = cache.size_bytes - 1
+    cache.evict()
+    assert cache.num_entries == 1
+    assert third.exists()
+
+
+def test_key_normalization(asset_path: str, tmp_path):
+    cache = saleae.automation.ExportCache(tmp_path / 'cache')
+    capture_filepath = os.path.join(asset_path, 'cap1.sal')
+
+    key = cache.key_raw_data_binary(capture_filepath, analog_channels=[1, 0], digital_channels=[2, 0])
+    assert key == cache.key_raw_data_binary(capture_filepath, analog_channels=[0, 1], digital_channels=[0, 2])
+
+    key = cache.key_raw_data_csv(capture_filepath, digital_channels=[0])
+    assert key == cache.key_raw_data_csv(capture_filepath, analog_channels=[], digital_channels=[0])
+
+
+def test_stale_temp_directories(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    cache = saleae.automation.ExportCache(tmp_path / 'cache')
+    temp_directory = tmp_path / 'cache/tmp'
+
+    # Left behind by a process that exited mid-export
+    stale = temp_directory / 'stale'
+    (stale / 'nested').mkdir(parents=True)
+    stale_time = time.time() - 2 * 24 * 60 * 60
+    os.utime(stale, (stale_time, stale_time))
+    # Possibly an export in progress in another process
+    recent = temp_directory / 'recent'
+    recent.mkdir()
+
+    saleae.automation.ExportCache(tmp_path / 'cache')
+    assert sorted(os.listdir(temp_directory)) == ['recent']
+
+    stale.mkdir()
+    os.utime(stale, (stale_time, stale_time))
+    cache.export_raw_data_binary(fake_manager, os.path.join(asset_path, 'cap1.sal'), digital_channels=[0])
+    assert sorted(os.listdir(temp_directory)) == ['recent']
@@ -263,3 +263,33 @@ def test_data_table_filtering(scenario: FilterScenario, manager: automation.Mana
         expected_filepath = os.path.join(asset_path, scenario.expected_filename)
 
         utils.assert_files_match(export_filepath, expected_filepath)
+
+
+def test_iter_data_table(manager: automation.Manager, asset_path: str, tmp_path):
+    import csv
+
+    path = os.path.join(asset_path, 'small_spi_capture.sal')
+
+    with manager.load_capture(path) as cap:
+        analyzer = cap.add_analyzer('SPI', label=f'My SPI', settings={
+            'MISO': 4,
+            'Clock': 3,
+            'Enable': 5,
+            'Bits per Transfer': '8 Bits per Transfer (Standard)'
+        })
+
+        export_filepath = os.path.join(tmp_path, 'data_table.csv')
+        cap.export_data_table(filepath=export_filepath, analyzers=[analyzer])
+
+        rows = list(cap.iter_data_table([analyzer], max_rows_per_reply=10))
+
+    with open(export_filepath) as f:
+        expected_rows = list(csv.DictReader(f))
+
+    assert len(rows) == len(expected_rows)
+    for row, expected in zip(rows, expected_rows):
+        assert row.analyzer == analyzer
+        assert row.type == expected['type']
+        assert row.start_time == pytest.approx(float(expected['start_time']))
+        assert row.duration == pytest.approx(float(expected['duration']))
+        assert set(row.values.keys()) == {'mosi', 'miso'}
@@ -0,0 +1,73 @@
+import asyncio
+import os.path
+import time
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+EXPORT_LATENCY_SECONDS = 0.2
+
+
+def test_export_many(asset_path: str, tmp_path):
+    method_latency_seconds = {
+        'ExportRawDataCsv': EXPORT_LATENCY_SECONDS,
+        'ExportRawDataBinary': EXPORT_LATENCY_SECONDS,
+        'ExportDataTableCsv': EXPORT_LATENCY_SECONDS,
+        'LegacyExportAnalyzer': EXPORT_LATENCY_SECONDS,
+    }
+    with FakeLogic2Server(method_latency_seconds=method_latency_seconds) as server:
+        with saleae.automation.Manager.connect(port=server.port) as manager:
+            with manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+                spi = cap.add_analyzer('SPI', label='SPI')
+                exports = [
+                    saleae.automation.RawDataCsvExport(directory=str(tmp_path / 'csv'), digital_channels=[0]),
+                    saleae.automation.RawDataBinaryExport(directory=str(tmp_path / 'bin'), digital_channels=[0, 1]),
+                    saleae.automation.DataTableCsvExport(
+                        filepath=str(tmp_path / 'data_table.csv'),
+                        analyzers=[saleae.automation.DataTableExportConfiguration(spi, saleae.automation.RadixType.HEXADECIMAL)]),
+                    saleae.automation.LegacyAnalyzerExport(filepath=str(tmp_path / 'legacy.txt'), analyzer=spi,
+                                                           radix=saleae.automation.RadixType.DECIMAL),
+                    saleae.automation.LegacyAnalyzerExport(filepath=str(tmp_path / 'missing.txt'),
+                                                           analyzer=saleae.automation.AnalyzerHandle(analyzer_id=12345),
+                                                           radix=saleae.automation.RadixType.DECIMAL),
+                ]
+
+                start_time = time.monotonic()
+                results = cap.export_many(exports, max_parallel_exports=len(exports))
+                elapsed = time.monotonic() - start_time
+
+        assert server.call_counts['ExportMany'] == 1
+        assert 'ExportRawDataCsv' not in server.call_counts
+
+    # The exports ran in parallel
+    assert elapsed < EXPORT_LATENCY_SECONDS * 3
+
+    assert [result.export for result in results] == exports
+    assert [result.succeeded for result in results] == [True, True, True, True, False]
+    assert isinstance(results[4].error, saleae.automation.InvalidRequestError)
+    for result in results:
+        assert result.duration_seconds >= EXPORT_LATENCY_SECONDS
+        assert result.queued_seconds >= 0.0
+
+    assert os.listdir(tmp_path / 'csv') == ['digital.csv']
+    assert sorted(os.listdir(tmp_path / 'bin')) == ['digital_0.bin', 'digital_1.bin']
+    assert os.path.exists(tmp_path / 'data_table.csv')
+    assert os.path.exists(tmp_path / 'legacy.txt')
+
+
+def test_export_many_limits_parallelism(fake_server: FakeLogic2Server, asset_path: str, tmp_path):
+    fake_server.method_latency_seconds['ExportRawDataBinary'] = 0.1
+
+    async def run():
+        async with await saleae.automation.AsyncManager.connect(port=fake_server.port) as manager:
+            async with await manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+                exports = [saleae.automation.RawDataBinaryExport(directory=str(tmp_path / f'bin_{i}'), digital_channels=[0])
+                           for i in range(3)]
+                return await cap.export_many(exports, max_parallel_exports=1)
+
+    results = asyncio.run(run())
+
+    # With one export at a time, each export waits for the previous ones
+    assert all(result.succeeded for result in results)
+    assert results[0].queued_seconds < results[1].queued_seconds < results[2].queued_seconds
+    assert results[2].queued_seconds >= 0.2
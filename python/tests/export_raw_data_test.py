@@ -325,3 +325,26 @@ def test_export_all(manager: saleae.automation.Manager, asset_path: str, tmp_pat
 
     with manager.load_capture(capture_path) as cap:
         cap.export_raw_data_csv(directory=export_directory)
+
+
+def test_iter_raw_data(manager: saleae.automation.Manager, asset_path: str):
+    np = pytest.importorskip('numpy')
+    from saleae.automation import binary_export
+
+    capture_path = os.path.join(asset_path, 'cap1.sal')
+    expected = binary_export.read_binary_export_directory(os.path.join(asset_path, 'cap1/all_bin'))
+
+    transitions = {0: [], 1: []}
+    samples = {0: [], 1: []}
+    with manager.load_capture(capture_path) as cap:
+        for chunk in cap.iter_raw_data(analog_channels=[0, 1], digital_channels=[0, 1], max_chunk_size=1000):
+            if isinstance(chunk, saleae.automation.DigitalDataChunk):
+                assert(len(chunk.transition_times) <= 1000)
+                transitions[chunk.channel_index].extend(chunk.transition_times)
+            else:
+                assert(len(chunk.samples) <= 1000)
+                samples[chunk.channel_index].extend(chunk.samples)
+
+    for channel in [0, 1]:
+        assert np.array_equal(transitions[channel], expected.digital[channel].transition_times)
+        assert np.array_equal(np.array(samples[channel], dtype=np.float32), expected.analog[channel].samples)
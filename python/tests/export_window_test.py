@@ -0,0 +1,111 @@
+import csv
+import datetime
+import os.path
+import pytest
+
+import saleae.automation
+
+START_TIME = 0.0123
+END_TIME = 0.0456
+
+
+def read_rows(filepath: str):
+    with open(filepath) as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_raw_data_csv_window(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        cap.export_raw_data_csv(str(tmp_path / 'all'))
+        cap.export_raw_data_csv(str(tmp_path / 'window'), start_time=START_TIME, end_time=END_TIME)
+
+    all_rows = read_rows(str(tmp_path / 'all/digital.csv'))
+    window_rows = read_rows(str(tmp_path / 'window/digital.csv'))
+
+    # The first row is the state of each channel at the start of the window
+    assert float(window_rows[0][0]) == pytest.approx(START_TIME)
+    state_at_start = [row for row in all_rows if float(row[0]) < START_TIME][-1]
+    assert window_rows[0][1:] == state_at_start[1:]
+    assert window_rows[1:] == [row for row in all_rows if START_TIME <= float(row[0]) < END_TIME]
+
+    all_analog = read_rows(str(tmp_path / 'all/analog.csv'))
+    window_analog = read_rows(str(tmp_path / 'window/analog.csv'))
+    assert 0 < len(window_analog) < len(all_analog)
+    assert window_analog == [row for row in all_analog if START_TIME <= float(row[0]) < END_TIME]
+
+
+def test_raw_data_binary_window(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    np = pytest.importorskip('numpy')
+    from saleae.automation import binary_export
+
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        cap.export_raw_data_binary(str(tmp_path / 'all'))
+        cap.export_raw_data_binary(str(tmp_path / 'window'), start_time=START_TIME, end_time=END_TIME)
+
+    all_export = binary_export.read_binary_export_directory(str(tmp_path / 'all'))
+    window_export = binary_export.read_binary_export_directory(str(tmp_path / 'window'))
+
+    for channel, digital in window_export.digital.items():
+        times = np.asarray(all_export.digital[channel].transition_times)
+        assert (digital.begin_time, digital.end_time) == (START_TIME, END_TIME)
+        assert digital.initial_state == np.count_nonzero(times < START_TIME) & 1
+        assert np.array_equal(digital.transition_times, times[(times >= START_TIME) & (times < END_TIME)])
+
+    for channel, analog in window_export.analog.items():
+        full = all_export.analog[channel]
+        first = int(round((analog.begin_time - full.begin_time) * full.effective_sample_rate))
+        assert START_TIME <= analog.begin_time < START_TIME + 1 / full.effective_sample_rate
+        assert np.array_equal(analog.samples, full.samples[first:first + analog.num_samples])
+        assert analog.begin_time + analog.num_samples / analog.effective_sample_rate == pytest.approx(END_TIME, abs=1e-5)
+
+
+def test_analyzer_export_window(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        spi = cap.add_analyzer('SPI', label='SPI')
+        cap.export_data_table(str(tmp_path / 'all.csv'), [spi])
+        cap.legacy_export_analyzer(str(tmp_path / 'all.txt'), spi, saleae.automation.RadixType.DECIMAL)
+
+        results = cap.export_many([
+            saleae.automation.DataTableCsvExport(filepath=str(tmp_path / 'window.csv'), analyzers=[spi],
+                                                 start_time=START_TIME, end_time=END_TIME),
+            saleae.automation.LegacyAnalyzerExport(filepath=str(tmp_path / 'window.txt'), analyzer=spi,
+                                                   radix=saleae.automation.RadixType.DECIMAL,
+                                                   start_time=START_TIME, end_time=END_TIME),
+        ])
+        assert all(result.succeeded for result in results)
+
+    all_rows = read_rows(str(tmp_path / 'all.csv'))
+    window_rows = read_rows(str(tmp_path / 'window.csv'))
+    assert len(window_rows) > 0
+    assert window_rows == [row for row in all_rows if START_TIME <= float(row[2]) < END_TIME]
+
+    all_rows = read_rows(str(tmp_path / 'all.txt'))
+    window_rows = read_rows(str(tmp_path / 'window.txt'))
+    assert len(window_rows) > 0
+    assert window_rows == [row for row in all_rows if START_TIME <= float(row[0]) < END_TIME]
+
+
+def test_absolute_window(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        cap.export_raw_data_csv(str(tmp_path / 'iso'), digital_channels=[0], iso8601_timestamp=True)
+
+        # e.g. 2022-01-01T00:00:00.123456789+00:00, truncated to microseconds for datetime
+        timestamp = read_rows(str(tmp_path / 'iso/digital.csv'))[0][0]
+        capture_start = datetime.datetime.fromisoformat(timestamp[:26] + timestamp[29:])
+
+        cap.export_raw_data_csv(str(tmp_path / 'relative'), digital_channels=[0],
+                                start_time=START_TIME, end_time=END_TIME)
+        cap.export_raw_data_csv(str(tmp_path / 'absolute'), digital_channels=[0],
+                                start_time=capture_start + datetime.timedelta(seconds=START_TIME),
+                                end_time=capture_start + datetime.timedelta(seconds=END_TIME))
+
+    relative_rows = read_rows(str(tmp_path / 'relative/digital.csv'))
+    absolute_rows = read_rows(str(tmp_path / 'absolute/digital.csv'))
+    assert [row[1:] for row in absolute_rows] == [row[1:] for row in relative_rows]
+    assert [float(row[0]) for row in absolute_rows[1:]] == [float(row[0]) for row in relative_rows[1:]]
+
+
+def test_invalid_window(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        with pytest.raises(saleae.automation.InvalidRequestError):
+            cap.export_raw_data_csv(str(tmp_path), start_time=END_TIME, end_time=START_TIME)
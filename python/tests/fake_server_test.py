@@ -0,0 +1,79 @@
+import os.path
+import time
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+SIMULATION_LOGIC_PRO_8 = 'F4244'
+
+
+def test_fake_server_devices(fake_manager: saleae.automation.Manager):
+    assert fake_manager.get_app_info().app_version == 'fake'
+    assert fake_manager.get_devices() == []
+    assert len(fake_manager.get_devices(include_simulation_devices=True)) == 3
+
+
+def test_fake_server_capture(fake_server: FakeLogic2Server, fake_manager: saleae.automation.Manager, tmp_path):
+    config = saleae.automation.LogicDeviceConfiguration(
+        enabled_digital_channels=[0, 3],
+        enabled_analog_channels=[1],
+        digital_sample_rate=500_000_000,
+        analog_sample_rate=50_000,
+    )
+    capture_configuration = saleae.automation.CaptureConfiguration(
+        capture_mode=saleae.automation.TimedCaptureMode(duration_seconds=0.1))
+
+    with fake_manager.start_capture(device_id=SIMULATION_LOGIC_PRO_8, device_configuration=config,
+                                    capture_configuration=capture_configuration) as cap:
+        cap.wait()
+
+        cap.export_raw_data_csv(directory=os.path.join(tmp_path, 'csv'))
+        with open(os.path.join(tmp_path, 'csv', 'digital.csv')) as f:
+            assert f.readline() == 'Time [s],Channel 0,Channel 3\n'
+        with open(os.path.join(tmp_path, 'csv', 'analog.csv')) as f:
+            assert f.readline() == 'Time [s],Channel 1\n'
+
+        cap.export_raw_data_binary(directory=os.path.join(tmp_path, 'bin'))
+        assert sorted(os.listdir(os.path.join(tmp_path, 'bin'))) == ['analog_1.bin', 'digital_0.bin', 'digital_3.bin']
+
+        spi = cap.add_analyzer('SPI', label='My SPI')
+        cap.export_data_table(filepath=os.path.join(tmp_path, 'data_table.csv'), analyzers=[spi])
+        with open(os.path.join(tmp_path, 'data_table.csv')) as f:
+            assert f.readline() == 'name,type,start_time,duration,"value"\n'
+            assert f.readline().startswith('"My SPI","result",')
+
+        save_path = os.path.join(tmp_path, 'capture.sal')
+        cap.save_capture(save_path)
+
+    with fake_manager.load_capture(save_path) as cap:
+        cap.export_raw_data_binary(directory=os.path.join(tmp_path, 'loaded'), digital_channels=[3])
+        assert os.listdir(os.path.join(tmp_path, 'loaded')) == ['digital_3.bin']
+
+    assert fake_server.num_open_captures == 0
+    assert fake_server.call_counts['ExportRawDataBinary'] == 2
+
+
+def test_fake_server_errors(fake_manager: saleae.automation.Manager, asset_path: str):
+    config = saleae.automation.LogicDeviceConfiguration(enabled_digital_channels=[0], digital_sample_rate=500_000_000)
+
+    with pytest.raises(saleae.automation.MissingDeviceError):
+        fake_manager.start_capture(device_configuration=config)
+
+    with pytest.raises(saleae.automation.LoadCaptureFailedError):
+        fake_manager.load_capture(os.path.join(asset_path, 'empty.sal'))
+
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        with pytest.raises(saleae.automation.InvalidRequestError):
+            cap.export_raw_data_binary(directory='unused', digital_channels=[15])
+
+
+def test_fake_server_latency():
+    with FakeLogic2Server(method_latency_seconds={'GetDevices': 0.2}) as server:
+        with saleae.automation.Manager.connect(port=server.port) as manager:
+            assert manager.connect_latency_seconds < 0.2
+
+            start_time = time.monotonic()
+            manager.get_devices()
+            assert time.monotonic() - start_time >= 0.2
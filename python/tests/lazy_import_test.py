@@ -0,0 +1,45 @@
+import json
+import subprocess
+import sys
+
+from saleae.grpc import saleae_pb2
+import saleae.automation
+
+# Modules that must not be imported by `import saleae.automation`
+_LAZY_MODULES = ['grpc', 'google.protobuf', 'saleae.grpc.saleae_pb2', 'saleae.grpc.saleae_pb2_grpc', 'asyncio']
+
+
+def _run(code: str):
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return json.loads(output)
+
+
+def test_import_is_lazy():
+    loaded = _run(f'''
+import json, sys
+import saleae.automation
+print(json.dumps([name for name in {_LAZY_MODULES!r} if name in sys.modules]))
+''')
+    assert loaded == [], f'Importing saleae.automation should not import: {", ".join(loaded)}'
+
+
+def test_public_names():
+    assert saleae.automation.AsyncManager.__name__ == 'AsyncManager'
+    assert saleae.automation.AsyncCapture.__name__ == 'AsyncCapture'
+    assert 'AsyncManager' in dir(saleae.automation)
+    assert saleae.automation.saleae_pb2.GetAppInfoRequest is saleae_pb2.GetAppInfoRequest
+
+
+def test_enum_values_match_proto():
+    enums = [
+        (saleae.automation.RadixType, 'RADIX_TYPE_'),
+        (saleae.automation.DeviceType, 'DEVICE_TYPE_'),
+        (saleae.automation.DigitalTriggerType, 'DIGITAL_TRIGGER_TYPE_'),
+        (saleae.automation.DigitalTriggerLinkedChannelState, 'DIGITAL_TRIGGER_LINKED_CHANNEL_STATE_'),
+        (saleae.automation.CaptureTriggerState, 'CAPTURE_TRIGGER_STATE_'),
+        (saleae.automation.DataTableExportFormat, 'DATA_TABLE_EXPORT_FORMAT_'),
+    ]
+
+    for enum_type, prefix in enums:
+        for member in enum_type:
+            assert member.value == getattr(saleae_pb2, prefix + member.name), f'{enum_type.__name__}.{member.name} does not match saleae.proto'
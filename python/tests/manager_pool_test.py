@@ -0,0 +1,56 @@
+import concurrent.futures
+import os.path
+import time
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+
+def test_manager_pool(manager: saleae.automation.Manager, asset_path: str, tmp_path, request):
+    port = request.config.getoption('--port') or 10430
+    path = os.path.join(asset_path, 'cap1.sal')
+
+    def export(cap: saleae.automation.Capture, index: int):
+        directory = os.path.join(tmp_path, f'export_{index}')
+        cap.export_raw_data_binary(directory=directory, digital_channels=[0, 1])
+        return sorted(os.listdir(directory))
+
+    # Two connections to the same instance still exercise the dispatching logic
+    with saleae.automation.ManagerPool.connect([port, port]) as pool:
+        assert pool.num_instances == 2
+
+        futures = [pool.submit_capture(path, export, index) for index in range(4)]
+        for future in futures:
+            assert future.result() == ['digital_0.bin', 'digital_1.bin']
+
+        assert pool.num_busy == 0
+
+
+def test_manager_pool_error(manager: saleae.automation.Manager, tmp_path, request):
+    port = request.config.getoption('--port') or 10430
+
+    with saleae.automation.ManagerPool.connect([port]) as pool:
+        future = pool.submit_capture(os.path.join(tmp_path, 'missing.sal'), lambda cap: None)
+
+        try:
+            future.result()
+            assert(False)
+        except saleae.automation.LoadCaptureFailedError:
+            pass
+
+
+def test_manager_pool_map_timeout(fake_server: FakeLogic2Server):
+    def job(manager: saleae.automation.Manager, seconds: float):
+        time.sleep(seconds)
+        return seconds
+
+    with saleae.automation.ManagerPool.connect([fake_server.port]) as pool:
+        assert list(pool.map(job, [0.0, 0.0])) == [0.0, 0.0]
+
+        # Each job finishes well within the timeout, but together they take longer
+        results = pool.map(job, [0.2, 0.2, 0.2], timeout=0.3)
+        assert next(results) == 0.2
+        with pytest.raises(concurrent.futures.TimeoutError):
+            list(results)
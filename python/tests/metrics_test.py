@@ -0,0 +1,73 @@
+import os.path
+import time
+import urllib.request
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+
+def test_metrics(fake_server: FakeLogic2Server, asset_path: str, tmp_path):
+    metrics = saleae.automation.ClientMetrics()
+
+    with saleae.automation.Manager.connect(port=fake_server.port, metrics=metrics) as manager:
+        assert manager.metrics is metrics
+
+        with manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+            chunks = list(cap.iter_raw_data(digital_channels=[0]))
+            assert len(chunks) > 0
+
+        with pytest.raises(saleae.automation.LoadCaptureFailedError):
+            manager.load_capture(os.path.join(tmp_path, 'missing.sal'))
+
+    snapshot = metrics.snapshot()
+
+    # The connection handshake is reported in connect_latency_seconds, not as an RPC
+    assert 'GetAppInfo' not in snapshot
+
+    load_capture = snapshot['LoadCapture']
+    assert load_capture.count == 2
+    assert load_capture.in_flight == 0
+    assert load_capture.errors == {'LoadCaptureFailedError': 1}
+    assert load_capture.bytes_sent > 0
+    assert load_capture.latency_buckets[-1][1] == 2
+
+    stream = snapshot['StreamRawData']
+    assert stream.count == 1
+    assert stream.errors == {}
+    assert stream.bytes_received > 0
+
+    text = metrics.to_prometheus_text()
+    assert 'saleae_automation_rpc_duration_seconds_count{method="LoadCapture"} 2' in text
+    assert 'saleae_automation_rpc_errors_total{method="LoadCapture",error="LoadCaptureFailedError"} 1' in text
+
+    server = metrics.start_http_server(0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as response:
+            assert response.read().decode('utf-8') == metrics.to_prometheus_text()
+    finally:
+        server.shutdown()
+
+    metrics.reset()
+    assert metrics.snapshot()['LoadCapture'].count == 0
+
+
+def test_metrics_cancelled_stream(fake_server: FakeLogic2Server, asset_path: str):
+    metrics = saleae.automation.ClientMetrics()
+
+    with saleae.automation.Manager.connect(port=fake_server.port, metrics=metrics) as manager:
+        with manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+            for _ in cap.iter_raw_data(digital_channels=[0], max_chunk_size=100):
+                break
+
+    # The stream is completed on a gRPC thread once it has been cancelled
+    deadline = time.monotonic() + 5.0
+    while metrics.snapshot()['StreamRawData'].in_flight > 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    stream = metrics.snapshot()['StreamRawData']
+    assert stream.count == 1
+    assert stream.cancelled == 1
+    assert stream.errors == {}
+    assert 'saleae_automation_rpc_cancelled_total{method="StreamRawData"} 1' in metrics.to_prometheus_text()
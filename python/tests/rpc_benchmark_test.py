@@ -0,0 +1,39 @@
+import json
+import os.path
+
+import saleae.automation
+from benchmarks import rpc_benchmark
+
+
+def test_percentile():
+    samples = [4.0, 1.0, 3.0, 2.0]
+    assert rpc_benchmark.percentile(samples, 0) == 1.0
+    assert rpc_benchmark.percentile(samples, 50) == 2.5
+    assert rpc_benchmark.percentile(samples, 100) == 4.0
+
+
+def test_run_benchmarks(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    results = rpc_benchmark.run_benchmarks(fake_manager, capture_path=os.path.join(asset_path, 'cap1.sal'),
+                                           iterations=3, warmup=0)
+
+    assert list(results) == rpc_benchmark.benchmark_names()
+    for summary in results.values():
+        assert summary['count'] == 3
+        assert summary['min'] <= summary['p50'] <= summary['p90'] <= summary['p99'] <= summary['max']
+
+    baseline_path = os.path.join(tmp_path, 'baseline.json')
+    rpc_benchmark.save_results(baseline_path, results, {'server': 'fake'})
+    with open(baseline_path) as f:
+        assert json.load(f)['metadata'] == {'server': 'fake'}
+    assert rpc_benchmark.load_results(baseline_path) == results
+
+
+def test_compare_to_baseline():
+    baseline = {'load_capture': rpc_benchmark.summarize([1.0]), 'close': rpc_benchmark.summarize([1.0])}
+    results = {'load_capture': rpc_benchmark.summarize([1.5]), 'close': rpc_benchmark.summarize([1.1]),
+               'stop': rpc_benchmark.summarize([9.0])}
+
+    regressions = rpc_benchmark.compare_to_baseline(results, baseline, threshold=0.2)
+
+    assert [r.name for r in regressions] == ['load_capture']
+    assert regressions[0].ratio == 1.5
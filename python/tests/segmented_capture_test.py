@@ -0,0 +1,86 @@
+import os.path
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+SIMULATION_LOGIC_PRO_8 = 'F4244'
+
+
+def start_segmented_capture(manager: saleae.automation.Manager, buffer_size_megabytes=None, **kwargs) -> saleae.automation.Capture:
+    return manager.start_capture(
+        device_id=SIMULATION_LOGIC_PRO_8,
+        device_configuration=saleae.automation.LogicDeviceConfiguration(enabled_digital_channels=[0, 1],
+                                                                        digital_sample_rate=500_000_000),
+        capture_configuration=saleae.automation.CaptureConfiguration(
+            buffer_size_megabytes=buffer_size_megabytes,
+            capture_mode=saleae.automation.SegmentedCaptureMode(**kwargs)))
+
+
+def test_segments_max_segments(fake_manager: saleae.automation.Manager, tmp_path):
+    with start_segmented_capture(fake_manager, directory=str(tmp_path), segment_duration_seconds=0.1,
+                                 max_segments=3) as cap:
+        segments = list(cap.iter_segments())
+        cap.wait()
+
+        # Segments that were already saved are returned again
+        assert list(cap.iter_segments()) == segments
+
+    assert [segment.index for segment in segments] == [0, 1, 2]
+    assert [os.path.basename(segment.filepath) for segment in segments] == ['segment_0000.sal', 'segment_0001.sal', 'segment_0002.sal']
+    assert segments[0].begin_time == 0.0
+    for previous, segment in zip(segments, segments[1:]):
+        assert segment.begin_time == previous.end_time
+        assert segment.end_time - segment.begin_time == pytest.approx(0.1)
+    for segment in segments:
+        assert os.path.getsize(segment.filepath) == segment.size_bytes
+
+    with fake_manager.load_capture(segments[1].filepath) as cap:
+        cap.export_raw_data_binary(directory=str(tmp_path / 'export'))
+        assert sorted(os.listdir(tmp_path / 'export')) == ['digital_0.bin', 'digital_1.bin']
+
+
+def test_segments_until_stopped(fake_manager: saleae.automation.Manager, tmp_path):
+    with start_segmented_capture(fake_manager, directory=str(tmp_path), segment_duration_seconds=0.05,
+                                 file_name_prefix='soak_') as cap:
+        with pytest.raises(saleae.automation.InvalidRequestError):
+            cap.wait()
+
+        for segment in cap.iter_segments():
+            if segment.index == 1:
+                break
+        cap.stop()
+
+        segments = list(cap.iter_segments())
+
+    # Stopping saves the remaining data as a final, shorter segment
+    assert len(segments) == 3
+    assert segments[2].begin_time == segments[1].end_time
+    assert segments[2].end_time > segments[2].begin_time
+    assert sorted(os.listdir(tmp_path)) == ['soak_0000.sal', 'soak_0001.sal', 'soak_0002.sal']
+
+
+def test_segments_by_size(tmp_path):
+    with FakeLogic2Server(capture_bytes_per_second=20 * 1024 * 1024) as server:
+        with saleae.automation.Manager.connect(port=server.port) as manager:
+            with start_segmented_capture(manager, directory=str(tmp_path), segment_size_megabytes=1,
+                                         max_segments=2) as cap:
+                segments = list(cap.iter_segments())
+
+                # The buffer only has to hold a single segment
+                with start_segmented_capture(manager, buffer_size_megabytes=1, directory=str(tmp_path / 'oom'),
+                                             segment_size_megabytes=4) as oom_cap:
+                    with pytest.raises(saleae.automation.OutOfMemoryError):
+                        list(oom_cap.iter_segments())
+
+    assert [segment.end_time for segment in segments] == pytest.approx([0.05, 0.1])
+
+
+def test_segments_invalid(fake_manager: saleae.automation.Manager, asset_path: str, tmp_path):
+    with pytest.raises(saleae.automation.InvalidRequestError):
+        start_segmented_capture(fake_manager, directory=str(tmp_path))
+
+    with fake_manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+        with pytest.raises(saleae.automation.InvalidRequestError):
+            list(cap.iter_segments())
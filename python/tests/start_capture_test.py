@@ -305,3 +305,38 @@ def test_glitch_filter(scenario: GlitchFilterScenario, manager: automation.Manag
         assert scenario.valid, 'Expected failure'
     except automation.SaleaeError as exc:
         assert not scenario.valid, f'Failure not expected: {exc}'
+
+
+def test_start_capture_group(manager: automation.Manager, tmp_path):
+    config = automation.LogicDeviceConfiguration(
+        enabled_digital_channels=[0, 1],
+        digital_sample_rate=10_000_000,
+    )
+    devices = [
+        automation.CaptureGroupDevice(device_id=SIMULATION_LOGIC_PRO_8, device_configuration=config),
+        automation.CaptureGroupDevice(device_id=SIMULATION_LOGIC_PRO_16, device_configuration=config),
+    ]
+    capture_configuration = automation.CaptureConfiguration(capture_mode=automation.TimedCaptureMode(duration_seconds=1.0))
+
+    with manager.start_capture_group(devices=devices, capture_configuration=capture_configuration) as group:
+        assert len(group) == 2
+        assert group.device_ids == [SIMULATION_LOGIC_PRO_8, SIMULATION_LOGIC_PRO_16]
+        assert min(group.start_offsets_seconds) == 0
+        group.wait()
+
+        for index, cap in enumerate(group):
+            cap.export_raw_data_csv(directory=os.path.join(tmp_path, f'export_{index}'), digital_channels=[0, 1])
+
+
+def test_start_capture_group_missing_device(manager: automation.Manager):
+    config = automation.LogicDeviceConfiguration(
+        enabled_digital_channels=[0, 1],
+        digital_sample_rate=10_000_000,
+    )
+    devices = [
+        automation.CaptureGroupDevice(device_id=SIMULATION_LOGIC_PRO_8, device_configuration=config),
+        automation.CaptureGroupDevice(device_id='NOT_A_DEVICE', device_configuration=config),
+    ]
+
+    with pytest.raises(automation.MissingDeviceError):
+        manager.start_capture_group(devices=devices)
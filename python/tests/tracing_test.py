@@ -0,0 +1,78 @@
+import json
+import os.path
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+from saleae.automation.tracing import format_server_timing, parse_server_timing
+
+
+def test_parse_server_timing():
+    phases = parse_server_timing('queue;dur=1.5, decode;dur=2, bad, disk_write ; dur = 0.25')
+    assert phases == [('queue', 0.0015), ('decode', 0.002), ('disk_write', 0.00025)]
+    assert parse_server_timing(format_server_timing(phases)) == phases
+
+
+def test_tracer_jobs(fake_server: FakeLogic2Server, asset_path: str, tmp_path):
+    tracer = saleae.automation.Tracer(output_directory=tmp_path / 'traces')
+
+    with saleae.automation.Manager.connect(port=fake_server.port, tracer=tracer) as manager:
+        assert manager.tracer is tracer
+
+        with tracer.job('job-1') as job:
+            with manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+                with tracer.span('export', kind='csv'):
+                    cap.export_raw_data_csv(directory=str(tmp_path / 'export'), digital_channels=[0])
+                list(cap.iter_raw_data(digital_channels=[0]))
+
+        with pytest.raises(saleae.automation.LoadCaptureFailedError):
+            manager.load_capture(os.path.join(tmp_path, 'missing.sal'))
+
+    assert job.path == tmp_path / 'traces' / 'job-1.json'
+    with open(job.path) as f:
+        trace = json.load(f)
+
+    events = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    names = [event['name'] for event in events]
+    assert names[0] == 'job-1'
+    for name in ['LoadCapture', 'ExportRawDataCsv', 'StreamRawData', 'CloseCapture', 'export']:
+        assert name in names
+
+    job_event = events[0]
+    for event in events[1:]:
+        assert job_event['ts'] <= event['ts']
+        assert event['ts'] + event['dur'] <= job_event['ts'] + job_event['dur'] + 1
+
+    # Server-side phases from the trailing metadata are children of the request
+    export = next(event for event in events if event['name'] == 'ExportRawDataCsv')
+    assert 'server.disk_write_ms' in export['args']
+    disk_write = next(event for event in events if event['name'] == 'disk_write' and event['cat'] == 'server')
+    assert export['ts'] <= disk_write['ts'] <= export['ts'] + export['dur']
+
+    assert any(event['name'] == 'thread_name' for event in trace['traceEvents'] if event['ph'] == 'M')
+
+    # Requests outside of a job are kept by the Tracer, except for the connection handshake
+    assert not any(event['name'] == 'GetAppInfo' for event in tracer.events)
+    failed = [event for event in tracer.events if event['cat'] == 'rpc' and event['name'] == 'LoadCapture']
+    assert failed[0]['args']['error'] == 'LoadCaptureFailedError'
+
+    tracer.write(tmp_path / 'rest.json')
+    with open(tmp_path / 'rest.json') as f:
+        assert len(json.load(f)['traceEvents']) > 0
+
+
+def test_tracer_cancelled_stream(fake_server: FakeLogic2Server, asset_path: str, tmp_path):
+    tracer = saleae.automation.Tracer(output_directory=tmp_path / 'traces')
+
+    with saleae.automation.Manager.connect(port=fake_server.port, tracer=tracer) as manager:
+        with manager.load_capture(os.path.join(asset_path, 'cap1.sal')) as cap:
+            with tracer.job('job-1') as job:
+                for _ in cap.iter_raw_data(digital_channels=[0], max_chunk_size=100):
+                    break
+
+    # The stream completes on a gRPC thread once it has been cancelled, but is still part of the written trace
+    with open(job.path) as f:
+        trace = json.load(f)
+    stream = next(event for event in trace['traceEvents'] if event['name'] == 'StreamRawData')
+    assert 'error' not in stream.get('args', {})
@@ -0,0 +1,88 @@
+import asyncio
+import concurrent.futures
+import queue
+import time
+
+import pytest
+
+import saleae.automation
+from saleae.automation.fake_server import FakeLogic2Server
+
+SIMULATION_LOGIC_PRO_8 = 'F4244'
+
+
+def start_timed_capture(manager: saleae.automation.Manager, duration_seconds: float) -> saleae.automation.Capture:
+    return manager.start_capture(
+        device_id=SIMULATION_LOGIC_PRO_8,
+        device_configuration=saleae.automation.LogicDeviceConfiguration(enabled_digital_channels=[0],
+                                                                        digital_sample_rate=500_000_000),
+        capture_configuration=saleae.automation.CaptureConfiguration(
+            capture_mode=saleae.automation.TimedCaptureMode(duration_seconds=duration_seconds)))
+
+
+def test_wait_timeout(fake_manager: saleae.automation.Manager):
+    with start_timed_capture(fake_manager, 60.0) as cap:
+        start_time = time.monotonic()
+        with pytest.raises(saleae.automation.WaitTimeoutError):
+            cap.wait(timeout=0.1)
+        assert time.monotonic() - start_time < 5.0
+
+        cap.stop()
+
+    with start_timed_capture(fake_manager, 0.05) as cap:
+        cap.wait(timeout=10.0)
+
+
+def test_wait_future(fake_manager: saleae.automation.Manager):
+    captures = [start_timed_capture(fake_manager, duration) for duration in [0.05, 0.1, 60.0]]
+    try:
+        futures = [cap.wait_future(timeout=0.5) for cap in captures]
+        done, not_done = concurrent.futures.wait(futures, timeout=10.0)
+        assert len(not_done) == 0
+
+        assert futures[0].result() is None
+        assert futures[1].result() is None
+        assert isinstance(futures[2].exception(), saleae.automation.WaitTimeoutError)
+
+        # Cancelling the future cancels the wait
+        future = captures[2].wait_future()
+        assert future.cancel()
+        assert future.cancelled()
+        captures[2].stop()
+    finally:
+        for cap in captures:
+            cap.close()
+
+
+def test_add_done_callback(fake_manager: saleae.automation.Manager):
+    completed = queue.Queue()
+    captures = [start_timed_capture(fake_manager, 0.05), start_timed_capture(fake_manager, 60.0)]
+    try:
+        for cap in captures:
+            cap.add_done_callback(lambda capture, error: completed.put((capture, error)), timeout=0.5)
+
+        results = [completed.get(timeout=10.0), completed.get(timeout=10.0)]
+        assert results[0] == (captures[0], None)
+        assert results[1][0] is captures[1]
+        assert isinstance(results[1][1], saleae.automation.WaitTimeoutError)
+        captures[1].stop()
+    finally:
+        for cap in captures:
+            cap.close()
+
+
+def test_async_wait_timeout(fake_server: FakeLogic2Server):
+    async def run():
+        async with await saleae.automation.AsyncManager.connect(port=fake_server.port) as manager:
+            cap = await manager.start_capture(
+                device_id=SIMULATION_LOGIC_PRO_8,
+                device_configuration=saleae.automation.LogicDeviceConfiguration(enabled_digital_channels=[0],
+                                                                                digital_sample_rate=500_000_000),
+                capture_configuration=saleae.automation.CaptureConfiguration(
+                    capture_mode=saleae.automation.TimedCaptureMode(duration_seconds=60.0)))
+            async with cap:
+                with pytest.raises(saleae.automation.WaitTimeoutError):
+                    await cap.wait(timeout=0.1)
+                await cap.stop()
+
+    asyncio.run(run())